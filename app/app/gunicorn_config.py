@@ -0,0 +1,164 @@
+"""
+Gunicorn configuration for production.
+
+Load with ``gunicorn -c python:app.gunicorn_config app.wsgi:application``.
+
+Worker and thread counts are derived from the CPU and memory limits of
+the container (cgroup v1 or v2) rather than the host, and can be
+overridden with the ``GUNICORN_*`` environment variables below.
+"""
+
+import gc
+import math
+import os
+import shutil
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+# cgroup v1 reports "no limit" as a very large number of bytes.
+_UNLIMITED_MEMORY = 1 << 60
+
+
+def _read(path):
+    """Return the stripped contents of a file or None."""
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cpu_limit(cgroup_root=CGROUP_ROOT):
+    """Return the number of CPUs this process may use."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    quota = period = None
+    cpu_max = _read(os.path.join(cgroup_root, "cpu.max"))
+    if cpu_max:
+        value, _, period_value = cpu_max.partition(" ")
+        if value != "max":
+            quota, period = int(value), int(period_value or 100000)
+    else:
+        value = _read(os.path.join(cgroup_root, "cpu", "cpu.cfs_quota_us"))
+        period_value = _read(
+            os.path.join(cgroup_root, "cpu", "cpu.cfs_period_us"))
+        if value and period_value and int(value) > 0:
+            quota, period = int(value), int(period_value)
+
+    if quota and period:
+        cpus = min(cpus, max(1, math.ceil(quota / period)))
+    return cpus
+
+
+def memory_limit(cgroup_root=CGROUP_ROOT):
+    """Return the memory limit in bytes, or None if unknown."""
+    for path in (
+            os.path.join(cgroup_root, "memory.max"),
+            os.path.join(cgroup_root, "memory", "memory.limit_in_bytes"),
+    ):
+        value = _read(path)
+        if value and value != "max" and int(value) < _UNLIMITED_MEMORY:
+            return int(value)
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def worker_count(cpus, memory, worker_memory):
+    """Return workers for `cpus`, capped by what fits in `memory`."""
+    workers = 2 * cpus + 1
+    if memory:
+        workers = min(workers, memory // worker_memory)
+    return max(1, workers)
+
+
+def thread_count(cpus, workers):
+    """Return threads per worker so total concurrency stays 2*cpus+1."""
+    return max(1, math.ceil((2 * cpus + 1) / workers))
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+_cpus = cpu_limit()
+_memory = memory_limit()
+_worker_memory = _env_int("GUNICORN_WORKER_MEMORY_MB", 150) * 1024 * 1024
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = _env_int("GUNICORN_WORKERS",
+                   worker_count(_cpus, _memory, _worker_memory))
+threads = _env_int("GUNICORN_THREADS", thread_count(_cpus, workers))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS",
+                              "gthread" if threads > 1 else "sync")
+# Import the app once in the master so workers share its pages
+# copy-on-write.
+preload_app = bool(_env_int("GUNICORN_PRELOAD", 1))
+# Recycle workers periodically to bound slow leaks; the jitter keeps
+# them from all restarting at once.
+max_requests = _env_int("GUNICORN_MAX_REQUESTS", 1000)
+max_requests_jitter = _env_int("GUNICORN_MAX_REQUESTS_JITTER",
+                               max(1, max_requests // 10))
+timeout = _env_int("GUNICORN_TIMEOUT", 30)
+graceful_timeout = _env_int("GUNICORN_GRACEFUL_TIMEOUT", 30)
+keepalive = _env_int("GUNICORN_KEEPALIVE", 5)
+accesslog = os.environ.get("GUNICORN_ACCESSLOG", "-")
+
+# Workers write their metrics to files here so /metrics can add them up.
+# gunicorn sets `raw_env` before it preloads the app, and with it
+# prometheus_client, which reads the variable at import.
+_metrics_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus")
+raw_env = [f"PROMETHEUS_MULTIPROC_DIR={_metrics_dir}"]
+
+
+def reset_metrics_dir(directory):
+    """Empty `directory` of metric files left over from a previous run."""
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+
+def describe():
+    """Return the effective settings as a dict."""
+    return {
+        "cpus": _cpus,
+        "memory_mb": _memory // (1024 * 1024) if _memory else None,
+        "bind": bind,
+        "workers": workers,
+        "threads": threads,
+        "worker_class": worker_class,
+        "preload_app": preload_app,
+        "max_requests": max_requests,
+        "max_requests_jitter": max_requests_jitter,
+        "timeout": timeout,
+    }
+
+
+def on_starting(server):
+    """Start with no metric files left over from a previous run.
+
+    Runs once in the master, before any worker is forked. Workers open
+    their own files, so the master's preloaded app loses nothing.
+    """
+    reset_metrics_dir(_metrics_dir)
+
+
+def child_exit(server, worker):
+    """Drop the live gauges of a worker that exited."""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def when_ready(server):
+    """Log the chosen settings once the master is ready."""
+    settings = ", ".join(f"{k}={v}" for k, v in describe().items())
+    server.log.info("Server configuration: %s", settings)
+    if preload_app:
+        # Move everything imported so far out of the GC's reach so
+        # collections in workers don't dirty the shared pages.
+        gc.freeze()
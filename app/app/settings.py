@@ -22,7 +22,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.getenv('DJANGO_SECRET_KEY', 'default-secret-key')
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.getenv("DJANGO_DEBUG", "1") == "1"
 
 ALLOWED_HOSTS = ["localhost", "127.0.0.1", "testserver"]
 
@@ -34,7 +34,6 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
-    "django_extensions",
     "core",
     "user",
     "recipe",
@@ -43,8 +42,22 @@ INSTALLED_APPS = [
     "drf_spectacular",
 ]
 
+# Development-only apps are left out of production to keep startup lean.
+if DEBUG:
+    INSTALLED_APPS.append("django_extensions")
+
+# Import the URLconf and fill the resolver caches in `CoreConfig.ready`
+# so the first request doesn't pay for it.
+WARM_URLCONF_ON_STARTUP = os.getenv("DJANGO_WARM_URLCONF",
+                                    "0" if DEBUG else "1") == "1"
+
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "core.log.RequestIDMiddleware",
+    "core.metrics.MetricsMiddleware",
+    "core.profiling.ProfilingMiddleware",
+    "core.slow_queries.SlowQueryMiddleware",
+    "core.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -138,7 +151,74 @@ AUTHENTICATION_BACKENDS = [
 
 AUTH_USER_MODEL = "core.User"
 
+# Responses smaller than this are sent uncompressed.
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_GZIP_LEVEL = 6
+# Brotli's higher qualities are too slow for dynamic responses.
+COMPRESSION_BROTLI_QUALITY = 4
+
+# JSON lines on stderr, written by a background thread; see core.log.
+# Tests assert on the logs they expect and are quiet otherwise.
+LOG_LEVEL = os.getenv("DJANGO_LOG_LEVEL",
+                      "CRITICAL" if "test" in sys.argv else "INFO")
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "filters": {
+        "request_id": {
+            "()": "core.log.RequestIDFilter"
+        },
+    },
+    "handlers": {
+        "queue": {
+            "()": "core.log.queue_handler",
+            "filters": ["request_id"],
+        },
+    },
+    "root": {
+        "handlers": ["queue"],
+        "level": LOG_LEVEL,
+    },
+    "loggers": {
+        "django": {
+            "handlers": ["queue"],
+            "level": LOG_LEVEL,
+            "propagate": False,
+        },
+    },
+}
+
+# Bearer token required to scrape /metrics. When empty, metrics are only
+# served in DEBUG.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Seconds of changes re-sent before a sync token, see recipe.sync. A
+# change is only guaranteed to reach clients if its transaction commits
+# within this long of its `updated_at`, and app server clocks agree to
+# within the same margin. The default covers the 30 s request timeout.
+SYNC_OVERLAP_SECONDS = float(os.getenv("SYNC_OVERLAP_SECONDS", "35"))
+
+# Queries slower than this many milliseconds are logged, see
+# core.slow_queries; an empty SLOW_QUERY_MS turns the log off.
+_slow_query_ms = os.getenv("SLOW_QUERY_MS", "200")
+SLOW_QUERY_MS = float(_slow_query_ms) if _slow_query_ms else None
+# JSON lines file read by `slow_query_report`.
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG") or None
+# Share of slow SELECTs to EXPLAIN (ANALYZE, BUFFERS).
+SLOW_QUERY_EXPLAIN_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_RATE", "0"))
+
+# Per-request profiling, see core.profiling. Requests are profiled when
+# sampled or when they send `X-Profile: <PROFILING_TOKEN>`.
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+# Directory for cProfile dumps of profiled requests; off when unset.
+PROFILING_DUMP_DIR = os.getenv("PROFILING_DUMP_DIR") or None
+
 REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": [
+        "core.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework_simplejwt.authentication.JWTAuthentication",
         # "rest_framework.authentication.TokenAuthentication",
@@ -158,6 +238,10 @@ SPECTACULAR_SETTINGS = {
     "COMPONENT_SPLIT_REQUEST": True,
 }
 
+# Written at build time by `manage.py render_schema` and served from memory.
+OPENAPI_SCHEMA_PATH = os.getenv("OPENAPI_SCHEMA_PATH",
+                                str(BASE_DIR / "openapi-schema.yml"))
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=5),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
@@ -14,29 +14,28 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 from django.contrib import admin
 from django.urls import path, include
 from user.views import APIRootView
-from rest_framework.routers import DefaultRouter
-from user import views as user_views
-from recipe import views as recipe_views
 from django.conf.urls.static import static
 from django.conf import settings
 
-app_name = "api"
+from core.metrics import metrics_view
+from core.schema import schema_view
+from core.startup import lazy_view
 
-router = DefaultRouter()
-router.register(r"users", user_views.UserViewSet, basename="user")
-router.register(r"recipes", recipe_views.RecipeViewSet, basename="recipe")
+app_name = "api"
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics", metrics_view, name="metrics"),
     path("api/", APIRootView.as_view(), name="api_root"),
-    path("api/schema/", SpectacularAPIView.as_view(), name="api_schema"),
+    path("api/schema/", schema_view, name="api_schema"),
+    # The schema tooling is only imported when the docs are requested.
     path(
         "api/docs/",
-        SpectacularSwaggerView.as_view(url_name="api_schema"),
+        lazy_view("drf_spectacular.views.SpectacularSwaggerView",
+                  url_name="api_schema"),
         name="api_docs",
     ),
     path("api/user/", include("user.urls")),
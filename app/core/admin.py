@@ -1,16 +1,150 @@
 """Django admin customization"""
 
-from django.contrib import admin  # noqa
+from django.contrib import admin, messages  # noqa
+from django.contrib.admin import helpers
+from django.contrib.admin.options import IS_POPUP_VAR
+from django.contrib.admin.templatetags.admin_urls import add_preserved_filters
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.http import HttpResponseRedirect
+from django.template.response import TemplateResponse
+from django.urls import reverse
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
-from core import models
+from core import bitsets, bulk, kitchen, models
+from core.deletion import request_deletion, request_deletions
 
+# Below this many rows an exact COUNT(*) is cheap enough.
+ESTIMATE_COUNT_THRESHOLD = 100000
 
-class UserAdmin(BaseUserAdmin):
+
+def estimated_count(queryset):
+    """Return the planner's row estimate for an unfiltered queryset.
+
+    Returns None when no estimate is available: on databases other than
+    PostgreSQL, for filtered querysets and for tables never analyzed.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql" or queryset.query.where:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [queryset.model._meta.db_table])
+        row = cursor.fetchone()
+    return row[0] if row and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator using the row estimate instead of COUNT(*) on big tables."""
+
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list)
+        if estimate is not None and estimate >= ESTIMATE_COUNT_THRESHOLD:
+            return estimate
+        return super().count
+
+
+class IndexedSearchMixin:
+    """Search with lookups that can use a b-tree index.
+
+    Unlike Django's default case-insensitive substring search, which
+    scans the whole table, matching is case-sensitive. A term with an
+    "@" is an email and matches the fields prefixed with "=" exactly;
+    any other term matches the remaining fields by prefix. Only fields
+    of one kind are ORed, so each search stays on one index instead of
+    an OR across a join.
+    """
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        exact = "@" in term
+        query = Q()
+        for field in self.get_search_fields(request):
+            if field.startswith("=") != exact:
+                continue
+            if exact:
+                query |= Q(**{field[1:]: term})
+            else:
+                query |= Q(**{f"{field}__startswith": term})
+        if not query:
+            return queryset.none(), False
+        return queryset.filter(query), False
+
+
+def format_counts(counts):
+    return ", ".join(f"{count} {name}" for name, count in counts.items())
+
+
+def bulk_action(operation, description):
+    """Return an admin action running a `core.bulk` operation.
+
+    The first submit shows a preview of the affected row counts; the
+    operation only runs once that page is confirmed.
+    """
+
+    def action(modeladmin, request, queryset):
+        if not request.POST.get("apply"):
+            try:
+                counts = operation(queryset, dry_run=True)
+            except bulk.MergeError as exc:
+                modeladmin.message_user(request, str(exc), messages.ERROR)
+                return None
+            return TemplateResponse(
+                request, "admin/core/bulk_confirmation.html", {
+                    **modeladmin.admin_site.each_context(request),
+                    "title": description,
+                    "opts": modeladmin.model._meta,
+                    "counts": counts,
+                    "action": operation.__name__,
+                    "action_checkbox_name": helpers.ACTION_CHECKBOX_NAME,
+                    "selected": request.POST.getlist(
+                        helpers.ACTION_CHECKBOX_NAME),
+                    "select_across": request.POST.get("select_across", 0),
+                })
+        try:
+            counts = operation(queryset)
+        except bulk.MergeError as exc:
+            modeladmin.message_user(request, str(exc), messages.ERROR)
+            return None
+        modeladmin.message_user(request,
+                                f"{description}: {format_counts(counts)}.",
+                                messages.SUCCESS)
+        return None
+
+    action.__name__ = operation.__name__
+    action.short_description = description
+    return action
+
+
+class LargeTableAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    """Admin for tables with millions of rows."""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_select_related = ["user"]
+    autocomplete_fields = ["user"]
+    actions = [bulk_action(bulk.delete_owned, _("Delete selected (bulk)"))]
+
+
+class UserAdmin(IndexedSearchMixin, BaseUserAdmin):
     """Define the admin pages for users"""
 
     ordering = ["id"]
     list_display = ["email", "name"]
+    # Email is unique, so an exact match uses its index.
+    search_fields = ["=email"]
+    actions = [
+        bulk_action(bulk.deactivate_users, _("Deactivate selected users")),
+        bulk_action(bulk.delete_users, _("Delete selected users (bulk)")),
+        bulk_action(request_deletions,
+                    _("Queue selected users for deletion")),
+    ]
     fieldsets = (
         (None, {
             "fields": ("email", "password")
@@ -46,8 +180,124 @@ class UserAdmin(BaseUserAdmin):
         },
     ), )
 
+    def get_deleted_objects(self, objs, request):
+        """Summarise what will be deleted with counts.
+
+        The default collects every related row, which does not scale to
+        users with large recipe collections.
+        """
+        users = list(objs)
+        model_count = {
+            model._meta.verbose_name_plural:
+            model.objects.filter(user__in=users).count()
+            for model in (models.Recipe, models.Tag, models.Ingredient)
+        }
+        model_count[models.User._meta.verbose_name_plural] = len(users)
+        return [str(user) for user in users], model_count, set(), []
+
+    def get_actions(self, request):
+        """Replace "delete selected" by queueing the users for deletion."""
+        actions = super().get_actions(request)
+        actions.pop("delete_selected", None)
+        return actions
+
+    def delete_model(self, request, obj):
+        """Queue the user for deletion by `delete_user --pending`."""
+        request_deletion(obj)
+
+    def delete_queryset(self, request, queryset):
+        for user in queryset:
+            request_deletion(user)
+
+    def response_delete(self, request, obj_display, obj_id):
+        """Say the deletion was queued rather than done."""
+        if IS_POPUP_VAR in request.POST:
+            return super().response_delete(request, obj_display, obj_id)
+        self.message_user(
+            request,
+            _("The deletion of “%s” was queued.") % obj_display,
+            messages.SUCCESS)
+        opts = self.model._meta
+        post_url = reverse(
+            f"admin:{opts.app_label}_{opts.model_name}_changelist",
+            current_app=self.admin_site.name)
+        return HttpResponseRedirect(
+            add_preserved_filters(
+                {
+                    "preserved_filters": self.get_preserved_filters(request),
+                    "opts": opts
+                }, post_url))
+
+
+class RecipeIngredientInline(admin.TabularInline):
+    """Ingredients with their amounts, edited on the recipe page."""
+
+    model = models.RecipeIngredient
+    fields = ["ingredient", "quantity", "unit"]
+    autocomplete_fields = ["ingredient"]
+    extra = 1
+
+
+class RecipeAdmin(LargeTableAdmin):
+    """Admin pages for recipes."""
+
+    inlines = [RecipeIngredientInline]
+
+    list_display = ["title", "user", "time_minutes", "price", "updated_at"]
+    search_fields = ["title", "=user__email"]
+    autocomplete_fields = ["user", "tags"]
+
+    def save_related(self, request, form, formsets, change):
+        """Save the inlines, then the bitsets and stats of the links.
+
+        The inline writes `RecipeIngredient` rows directly, so the
+        `m2m_changed` handlers do not see them.
+        """
+        recipe = form.instance
+        links = models.RecipeIngredient.objects.filter(recipe=recipe)
+        before = set(links.values_list("ingredient_id", flat=True))
+        super().save_related(request, form, formsets, change)
+        after = set(links.values_list("ingredient_id", flat=True))
+        if before != after:
+            bitsets.refresh([recipe.pk])
+            kitchen.record(recipe.user_id,
+                           ingredients={
+                               **dict.fromkeys(after - before, 1),
+                               **dict.fromkeys(before - after, -1)
+                           })
+
+
+class TagAdmin(LargeTableAdmin):
+    """Admin pages for tags."""
+
+    actions = LargeTableAdmin.actions + [
+        bulk_action(bulk.merge, _("Merge selected into the oldest")),
+    ]
+
+    list_display = ["name", "user", "updated_at"]
+    search_fields = ["name", "=user__email"]
+
+
+class NutritionProfileInline(admin.StackedInline):
+    """Nutrition facts edited on the ingredient page."""
+
+    model = models.NutritionProfile
+
+
+class IngredientAdmin(LargeTableAdmin):
+    """Admin pages for ingredients."""
+
+    inlines = [NutritionProfileInline]
+
+    actions = LargeTableAdmin.actions + [
+        bulk_action(bulk.merge, _("Merge selected into the oldest")),
+    ]
+
+    list_display = ["name", "user", "updated_at"]
+    search_fields = ["name", "=user__email"]
+
 
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Recipe)
-admin.site.register(models.Tag)
-admin.site.register(models.Ingredient)
+admin.site.register(models.Recipe, RecipeAdmin)
+admin.site.register(models.Tag, TagAdmin)
+admin.site.register(models.Ingredient, IngredientAdmin)
@@ -1,6 +1,22 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        """Connect signal handlers and warm startup caches."""
+        from django.db.backends.signals import connection_created
+
+        from core import bitsets, metrics, query_hooks, signals  # noqa: F401
+
+        connection_created.connect(bitsets.connection_created)
+        connection_created.connect(metrics.connection_created)
+        connection_created.connect(query_hooks.connection_created)
+
+        if getattr(settings, "WARM_URLCONF_ON_STARTUP", False):
+            from core.startup import warm_url_resolver
+
+            warm_url_resolver()
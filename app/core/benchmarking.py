@@ -0,0 +1,106 @@
+"""
+Query-count, latency and memory measurements compared to a baseline.
+
+Query counts are deterministic, so they are always checked. Wall time
+and allocated memory depend on the machine and are only checked when
+the BENCHMARK environment variable is set. Set BENCHMARK_UPDATE=1 to
+write the current results as the new baseline instead of comparing.
+
+Environment variables:
+
+- BENCHMARK: also check time and memory.
+- BENCHMARK_UPDATE: rewrite the baseline file.
+- BENCHMARK_THRESHOLD: allowed relative increase of time and memory
+  (default 0.25, i.e. 25%).
+- BENCHMARK_QUERY_TOLERANCE: extra queries allowed (default 0).
+"""
+
+import json
+import os
+import time
+import tracemalloc
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def env_flag(name):
+    return os.getenv(name, "") not in ("", "0")
+
+
+def measure(func, repeat=5):
+    """Return queries, best wall time and peak allocation of `func()`."""
+    with CaptureQueriesContext(connection) as queries:
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    # Read now: later requests reset the query log the capture points at.
+    num_queries = len(queries)
+    # Timed separately: tracing allocations slows everything down.
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return {
+        "queries": num_queries,
+        "time_ms": round(best * 1000, 3),
+        "memory_kb": round(peak / 1024, 1),
+    }
+
+
+class Baseline:
+    """Benchmark results stored in a JSON file, keyed by name."""
+
+    def __init__(self, path):
+        self.path = path
+        self.update = env_flag("BENCHMARK_UPDATE")
+        self.check_timing = env_flag("BENCHMARK")
+        self.threshold = float(os.getenv("BENCHMARK_THRESHOLD", "0.25"))
+        self.query_tolerance = int(os.getenv("BENCHMARK_QUERY_TOLERANCE",
+                                             "0"))
+        try:
+            with open(path) as stream:
+                self.results = json.load(stream)
+        except FileNotFoundError:
+            self.results = {}
+
+    def save(self):
+        with open(self.path, "w") as stream:
+            json.dump(self.results, stream, indent=2, sort_keys=True)
+            stream.write("\n")
+
+    def compare(self, name, result):
+        """Return a list of regressions of `result` against the baseline.
+
+        When updating, the result is recorded instead and nothing is
+        reported.
+        """
+        if self.update:
+            previous = self.results.get(name, {})
+            if not self.check_timing:
+                # Keep recorded timings unless they were measured too.
+                result = dict(result,
+                              time_ms=previous.get("time_ms"),
+                              memory_kb=previous.get("memory_kb"))
+            self.results[name] = result
+            return []
+        expected = self.results.get(name)
+        if expected is None:
+            return [f"{name}: no baseline, run with BENCHMARK_UPDATE=1"]
+
+        problems = []
+        if result["queries"] > expected["queries"] + self.query_tolerance:
+            problems.append(f"{name}: {result['queries']} queries, "
+                            f"baseline {expected['queries']}")
+        if self.check_timing:
+            for key in ("time_ms", "memory_kb"):
+                limit = (expected.get(key) or 0) * (1 + self.threshold)
+                if expected.get(key) and result[key] > limit:
+                    problems.append(f"{name}: {key} {result[key]}, "
+                                    f"baseline {expected[key]}")
+        return problems
@@ -0,0 +1,176 @@
+"""
+Recipe ingredient sets as bitsets.
+
+Each ingredient has a `bit_index` unique among its owner's
+ingredients, and each recipe stores the set of its ingredients in
+`Recipe.ingredient_bits` as a little-endian integer with those bits set.
+A user's pantry becomes one integer too, and "uses all of", "uses only"
+and "uses any of" are a bitwise AND/OR per recipe over one narrow
+column, instead of joins and GROUP BY over the link table. `Matches`
+runs that test in the WHERE clause of the recipe query itself.
+
+Bitsets are kept in step by the `m2m_changed` handlers in
+`core.signals`; code writing `RecipeIngredient` rows directly calls
+`refresh()` or sets the bits itself.
+"""
+
+from functools import reduce
+from operator import or_
+
+from django.db import NotSupportedError
+from django.db.models import BooleanField, Func
+
+from core.models import Recipe, Ingredient, RecipeIngredient
+
+BATCH_SIZE = 1000
+SQLITE_FUNCTION = "bitset_matches"
+
+ANY, ALL, ONLY = "any", "all", "only"
+MATCHES = (ANY, ALL, ONLY)
+
+
+def to_int(bit_indexes):
+    """Return the bitset of the bit indexes as an integer."""
+    return reduce(or_, (1 << index for index in bit_indexes), 0)
+
+
+def encode(bits):
+    """Return the bytes stored for a bitset integer."""
+    return bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+
+
+def decode(data):
+    """Return the bitset integer of stored bytes."""
+    return int.from_bytes(data, "little")
+
+
+def refresh(recipe_ids):
+    """Recompute the bitsets of the recipes from their links.
+
+    Returns {recipe_id: stored bytes}.
+    """
+    recipe_ids = list(recipe_ids)
+    result = {}
+    for start in range(0, len(recipe_ids), BATCH_SIZE):
+        batch = recipe_ids[start:start + BATCH_SIZE]
+        indexes = {pk: [] for pk in batch}
+        links = RecipeIngredient.objects.filter(
+            recipe_id__in=batch).values_list("recipe_id",
+                                             "ingredient__bit_index")
+        for recipe_id, bit_index in links:
+            indexes[recipe_id].append(bit_index)
+        data = {pk: encode(to_int(bits)) for pk, bits in indexes.items()}
+        Recipe.objects.bulk_update(
+            [Recipe(id=pk, ingredient_bits=value)
+             for pk, value in data.items()], ["ingredient_bits"])
+        result.update(data)
+    return result
+
+
+def matches(bits, mask, match):
+    """Return whether a recipe's bitset matches a pantry mask."""
+    if match == ALL:
+        return bits & mask == mask
+    if match == ONLY:
+        # Recipes without ingredients are not worth suggesting.
+        return bits != 0 and bits | mask == mask
+    return bits & mask != 0
+
+
+class Matches(Func):
+    """Whether a bitset column matches a pantry mask, in SQL.
+
+    PostgreSQL compares the bytes as fixed-width bit strings; SQLite
+    calls `matches()` through the function registered by
+    `connection_created()`.
+    """
+
+    output_field = BooleanField()
+
+    def __init__(self, expression, mask, match):
+        if match not in MATCHES:
+            raise ValueError(f"Unknown match {match!r}.")
+        self.mask, self.match = mask, match
+        super().__init__(expression)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError(
+            f"Bitset matching is not supported on {connection.vendor}.")
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.get_source_expressions()[0])
+        return (f"{SQLITE_FUNCTION}({sql}, %s, %s)",
+                [*params, encode(self.mask), self.match])
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.get_source_expressions()[0])
+        data = encode(self.mask)
+        # Bytes in order, each most significant bit first, as the column
+        # is cast below. Casting bit strings to bit(n) zero-pads or
+        # truncates them, but text must have exactly n bits.
+        width = max(len(data), 1) * 8
+        zero = "0" * width
+        mask = "".join(f"{byte:08b}" for byte in data) or zero
+        bits = (f"CAST(CAST('x' || encode({sql}, 'hex') AS varbit) "
+                f"AS bit({width}))")
+        cast = f"CAST(%s AS bit({width}))"
+        if self.match == ALL:
+            return (f"({bits} & {cast}) = {cast}", [*params, mask, mask])
+        if self.match == ANY:
+            return (f"({bits} & {cast}) <> {cast}", [*params, mask, zero])
+        # Stored bytes have no trailing zeros, so a longer value has a
+        # bit outside the mask.
+        return (f"(octet_length({sql}) BETWEEN 1 AND {width // 8} "
+                f"AND ({bits} | {cast}) = {cast})",
+                [*params, *params, mask, mask])
+
+
+def _sqlite_matches(data, mask, match):
+    return matches(decode(data), decode(mask), match)
+
+
+def connection_created(sender, connection, **kwargs):
+    """Register the SQLite function of `Matches`; connected in `CoreConfig`."""
+    if connection.vendor == "sqlite":
+        connection.connection.create_function(SQLITE_FUNCTION,
+                                              3,
+                                              _sqlite_matches,
+                                              deterministic=True)
+
+
+def pantry_mask(user_id, ingredient_ids, match):
+    """Return the mask of the user's ingredients.
+
+    Returns None when no recipe can match: ALL with an unknown
+    ingredient, or ANY and ONLY without known ingredients.
+    """
+    ingredient_ids = set(ingredient_ids)
+    bit_indexes = list(
+        Ingredient.objects.filter(
+            user_id=user_id, id__in=ingredient_ids).values_list("bit_index",
+                                                                flat=True))
+    if match == ALL and len(bit_indexes) < len(ingredient_ids):
+        return None
+    if match != ALL and not bit_indexes:
+        return None
+    return to_int(bit_indexes)
+
+
+def filter_matching(queryset, user_id, ingredient_ids, match):
+    """Filter recipes to those matching the user's ingredients.
+
+    With ALL a recipe must use every ingredient, with ONLY it must use
+    nothing else, and with ANY at least one of them. The test is a
+    predicate of the query, so no IDs leave the database.
+    """
+    mask = pantry_mask(user_id, ingredient_ids, match)
+    if mask is None:
+        return queryset.none()
+    return queryset.filter(Matches("ingredient_bits", mask, match))
+
+
+def matching_ids(user_id, ingredient_ids, match):
+    """Return IDs of the user's recipes matching the ingredients."""
+    return list(
+        filter_matching(Recipe.objects.filter(user_id=user_id), user_id,
+                        ingredient_ids, match).values_list("id", flat=True))
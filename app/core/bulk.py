@@ -0,0 +1,258 @@
+"""
+Set-based bulk operations behind the admin actions.
+
+Each operation runs a fixed number of UPDATE, DELETE and
+INSERT ... SELECT statements in one transaction, however many rows are
+selected, instead of loading and saving objects one at a time. Signals
+do not fire, so tombstones and outbox events are written with
+INSERT ... SELECT as well, the ingredient bitsets and kitchen stats
+affected are rebuilt, and image files of deleted recipes are removed
+once the transaction commits. With `dry_run=True` the rows that would be
+affected are only counted.
+
+Querysets passed in must not filter on the through tables, since those
+rows are deleted before the selected rows.
+"""
+
+from functools import partial
+from itertools import groupby
+
+from django.db import connections, transaction
+from django.db.models import F, Min, Value, DateTimeField
+from django.db.models.functions import JSONObject
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from core import bitsets, kitchen, outbox
+from core.deletion import THROUGH_TABLES, delete_files
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+    Tombstone,
+    OutboxEvent,
+    normalize_name,
+)
+from core.signals import SYNC_MODELS
+
+
+def insert_select(model, queryset, columns):
+    """Insert a `model` row per row of `queryset` with one statement.
+
+    `columns` maps field names of `model` to expressions evaluated
+    against `queryset`. Returns the number of rows inserted.
+    """
+    connection = connections[queryset.db]
+    aliases = {f"_insert_{name}": value for name, value in columns.items()}
+    query = queryset.order_by().annotate(**aliases).values(*aliases).query
+    sql, params = query.get_compiler(queryset.db).as_sql()
+    quote = connection.ops.quote_name
+    names = ", ".join(
+        quote(model._meta.get_field(name).column) for name in columns)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {quote(model._meta.db_table)} ({names}) {sql}",
+            params)
+        return cursor.rowcount
+
+
+def _now():
+    return Value(timezone.now(), output_field=DateTimeField())
+
+
+def _record_events(queryset, event_type, user_id=F("user_id")):
+    """Add an outbox event for every row of `queryset`.
+
+    The payload is `{"id": ...}`, as `outbox.record()` writes by default.
+    """
+    insert_select(
+        OutboxEvent, queryset, {
+            "aggregate": Value(queryset.model._meta.model_name),
+            "aggregate_id": F("id"),
+            "event_type": Value(event_type),
+            "user_id": user_id,
+            "payload": JSONObject(id=F("id")),
+            "created_at": _now(),
+        })
+
+
+def _record_deletions(queryset):
+    """Add tombstones and outbox events for rows about to be deleted."""
+    insert_select(
+        Tombstone, queryset, {
+            "user_id": F("user_id"),
+            "model": Value(SYNC_MODELS[queryset.model]),
+            "object_id": F("id"),
+            "deleted_at": _now(),
+        })
+    _record_events(queryset, outbox.DELETED)
+
+
+def _delete_rows(queryset):
+    """Delete rows and their through rows, returning the row count."""
+    ids = queryset.values("id")
+    for through, column in THROUGH_TABLES[queryset.model]:
+        through.objects.filter(**{
+            f"{column}__in": ids
+        })._raw_delete(queryset.db)
+    return queryset.model.objects.filter(id__in=ids)._raw_delete(queryset.db)
+
+
+def _delete_images_on_commit(queryset):
+    """Delete the image files of recipes about to be deleted on commit."""
+    if queryset.model is not Recipe:
+        return
+    names = [
+        name for name in queryset.values_list("image", flat=True) if name
+    ]
+    if names:
+        storage = Recipe._meta.get_field("image").storage
+        transaction.on_commit(partial(delete_files, storage, names),
+                              using=queryset.db)
+
+
+def _ingredient_recipe_ids(queryset):
+    """Return IDs of recipes whose bitsets change with the rows."""
+    if queryset.model is not Ingredient:
+        return []
+    return list(
+        Recipe.ingredients.through.objects.filter(
+            ingredient__in=queryset.values("id")).values_list(
+                "recipe_id", flat=True).distinct())
+
+
+def _count_owned(user_ids):
+    return {
+        model._meta.verbose_name_plural:
+        model.objects.filter(user__in=user_ids).count()
+        for model in (Recipe, Tag, Ingredient)
+    }
+
+
+def deactivate_users(queryset, dry_run=False):
+    """Deactivate users and revoke their API tokens."""
+    active = queryset.filter(is_active=True)
+    tokens = Token.objects.filter(user__in=queryset.values("pk"))
+    if dry_run:
+        return {"users": active.count(), "tokens": tokens.count()}
+    with transaction.atomic():
+        return {
+            "tokens": tokens._raw_delete(tokens.db),
+            "users": active.update(is_active=False),
+        }
+
+
+def delete_users(queryset, dry_run=False):
+    """Delete users with their recipes, tags and ingredients."""
+    user_ids = queryset.values("pk")
+    if dry_run:
+        return {"users": queryset.count(), **_count_owned(user_ids)}
+    counts = {}
+    with transaction.atomic():
+        _delete_images_on_commit(Recipe.objects.filter(user__in=user_ids))
+        for model in (Recipe, Tag, Ingredient):
+            counts[model._meta.verbose_name_plural] = _delete_rows(
+                model.objects.filter(user__in=user_ids))
+        Tombstone.objects.filter(user__in=user_ids)._raw_delete(queryset.db)
+        _record_events(queryset, outbox.DELETED, user_id=F("pk"))
+        # Only small relations are left for the collector.
+        _, deleted = queryset.model.objects.filter(pk__in=user_ids).delete()
+        counts["users"] = deleted.get(queryset.model._meta.label, 0)
+    return counts
+
+
+def delete_owned(queryset, dry_run=False):
+    """Delete recipes, tags or ingredients, leaving tombstones."""
+    name = queryset.model._meta.verbose_name_plural
+    if dry_run:
+        return {name: queryset.count()}
+    with transaction.atomic():
+        user_ids = list(
+            queryset.order_by().values_list("user_id", flat=True).distinct())
+        recipe_ids = _ingredient_recipe_ids(queryset)
+        _delete_images_on_commit(queryset)
+        _record_deletions(queryset)
+        deleted = _delete_rows(queryset)
+        bitsets.refresh(recipe_ids)
+        kitchen.rebuild(user_ids)
+    return {name: deleted}
+
+
+class MergeError(ValueError):
+    """The selected rows cannot be merged."""
+
+
+def merge(queryset, dry_run=False, rebuild_stats=True):
+    """Merge tags or ingredients into the one with the lowest ID.
+
+    Recipes linked to a merged row are relinked to the kept row unless
+    they already link to it; other through columns are copied from the
+    recipe's first link. All rows must belong to the same user. Callers
+    merging many groups pass `rebuild_stats=False` and rebuild the
+    owners' kitchen stats once at the end.
+    """
+    model = queryset.model
+    through, column = THROUGH_TABLES[model][0]
+    keep = queryset.order_by("id").values_list("id", "user_id").first()
+    if keep is None or queryset.values("user_id").distinct().count() > 1:
+        raise MergeError("Select rows belonging to a single user.")
+    keep_id, user_id = keep
+    others = queryset.exclude(id=keep_id).values("id")
+    links = through.objects.filter(**{f"{column}__in": others})
+    already_linked = through.objects.filter(**{
+        column: keep_id
+    }).values("recipe_id")
+    relink = links.exclude(recipe_id__in=already_linked)
+    name = model._meta.verbose_name_plural
+    if dry_run:
+        return {
+            name: queryset.exclude(id=keep_id).count(),
+            "recipe links moved":
+            relink.values("recipe_id").distinct().count(),
+            "recipes": links.values("recipe_id").distinct().count(),
+        }
+
+    with transaction.atomic():
+        recipe_ids = _ingredient_recipe_ids(queryset.exclude(id=keep_id))
+        recipes = Recipe.objects.filter(id__in=links.values("recipe_id"))
+        _record_events(recipes, outbox.UPDATED)
+        touched = recipes.update(updated_at=timezone.now())
+
+        first_links = relink.values("recipe_id").annotate(
+            first=Min("id")).values("first")
+        columns = {
+            field.attname: F(field.attname)
+            for field in through._meta.concrete_fields
+            if field.attname not in ("id", column)
+        }
+        columns[column] = Value(keep_id)
+        moved = insert_select(through,
+                              through.objects.filter(id__in=first_links),
+                              columns)
+
+        merged = queryset.exclude(id=keep_id)
+        _record_deletions(merged)
+        deleted = _delete_rows(merged)
+        bitsets.refresh(recipe_ids)
+        if rebuild_stats:
+            kitchen.rebuild([user_id])
+    return {name: deleted, "recipe links moved": moved, "recipes": touched}
+
+
+def duplicate_clusters(model):
+    """Yield (user_id, ids) for rows sharing an owner and normalized name.
+
+    Rows are read once in (user, id) order and hashed by their
+    normalized name one user at a time, so memory is bounded by the
+    largest user. Names are normalized afresh, catching rows whose stored
+    key is stale. Each list of IDs is ordered oldest first.
+    """
+    rows = model.objects.order_by("user_id", "id").values_list(
+        "user_id", "id", "name").iterator(chunk_size=2000)
+    for user_id, user_rows in groupby(rows, key=lambda row: row[0]):
+        clusters = {}
+        for _, pk, name in user_rows:
+            clusters.setdefault(normalize_name(name), []).append(pk)
+        for ids in clusters.values():
+            if len(ids) > 1:
+                yield user_id, ids
@@ -0,0 +1,151 @@
+"""
+Batched deletion of users and everything they own.
+
+`User.delete()` goes through Django's collector, which loads every
+related row into memory, sends signals for each and deletes it all in one
+long transaction. `delete_user()` instead deletes recipes, tags and
+ingredients in bounded batches, each in its own short transaction, with
+single-table DELETEs that skip the collector and signals. Image files are
+removed once each batch has committed.
+
+Deleting a large account takes longer than a request may, so the API
+and the admin only call `request_deletion()`, which deactivates the
+user, revokes their tokens and marks them; `delete_pending()` (the
+`delete_user --pending` command) deletes marked users later.
+Deactivation comes first in `delete_user()` too, so a run that is
+interrupted can simply be repeated.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db import router, transaction
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+    NutritionProfile,
+    Tombstone,
+    OutboxEvent,
+)
+
+BATCH_SIZE = 500
+
+# Tables pointing at the user's objects, keyed by model, as
+# (model, column pointing at that model).
+THROUGH_TABLES = {
+    Recipe: [
+        (Recipe.tags.through, "recipe_id"),
+        (Recipe.ingredients.through, "recipe_id"),
+    ],
+    Tag: [(Recipe.tags.through, "tag_id")],
+    # The recipe links come first, see `bulk.merge`.
+    Ingredient: [
+        (Recipe.ingredients.through, "ingredient_id"),
+        (NutritionProfile, "ingredient_id"),
+    ],
+}
+
+
+def delete_files(storage, names):
+    """Delete files from storage, ignoring ones already gone."""
+    for name in names:
+        storage.delete(name)
+
+
+def _delete_batch(model, ids, using):
+    """Delete rows of `model` and their through rows without signals."""
+    for through, column in THROUGH_TABLES[model]:
+        through.objects.filter(**{f"{column}__in": ids})._raw_delete(using)
+    return model.objects.filter(id__in=ids)._raw_delete(using)
+
+
+def _delete_owned(model, user, batch_size, using, progress, cleanup_files):
+    """Delete the user's `model` rows in batches and return the count."""
+    image_field = model._meta.get_field("image") if model is Recipe else None
+    deleted = 0
+    while True:
+        with transaction.atomic(using=using):
+            queryset = model.objects.using(using).filter(
+                user=user).order_by("id")
+            columns = ["id", "image"] if image_field else ["id"]
+            rows = list(queryset.values_list(*columns)[:batch_size])
+            if not rows:
+                return deleted
+            deleted += _delete_batch(model, [row[0] for row in rows], using)
+            images = [row[1] for row in rows if image_field and row[1]]
+            if images:
+                transaction.on_commit(
+                    lambda images=images: cleanup_files(
+                        image_field.storage, images),
+                    using=using)
+        if progress:
+            progress(model._meta.verbose_name_plural, deleted)
+
+
+def _deactivate(user, using, **fields):
+    with transaction.atomic(using=using):
+        type(user).objects.using(using).filter(pk=user.pk).update(
+            is_active=False, **fields)
+        Token.objects.using(using).filter(user=user).delete()
+
+
+def request_deletion(user):
+    """Deactivate the user and queue them for `delete_pending()`."""
+    using = router.db_for_write(type(user), instance=user)
+    _deactivate(user, using, deletion_requested_at=timezone.now())
+
+
+def request_deletions(queryset, dry_run=False):
+    """Queue the users for deletion; run as a `core.admin` bulk action."""
+    if dry_run:
+        return {"users": queryset.count()}
+    users = list(queryset)
+    for user in users:
+        request_deletion(user)
+    return {"users": len(users)}
+
+
+def delete_user(user,
+                batch_size=BATCH_SIZE,
+                progress=None,
+                cleanup_files=delete_files):
+    """Delete a user with their recipes, tags and ingredients.
+
+    `progress(name, deleted)` is called after every batch. Returns the
+    number of rows deleted per model.
+    """
+    using = router.db_for_write(type(user), instance=user)
+    _deactivate(user, using)
+
+    counts = {}
+    for model in (Recipe, Tag, Ingredient):
+        counts[model._meta.model_name] = _delete_owned(
+            model, user, batch_size, using, progress, cleanup_files)
+
+    with transaction.atomic(using=using):
+        Tombstone.objects.using(using).filter(user=user)._raw_delete(using)
+        OutboxEvent.objects.using(using).create(aggregate="user",
+                                                aggregate_id=user.pk,
+                                                event_type="deleted",
+                                                user_id=user.pk,
+                                                payload={"id": user.pk})
+        # Only small relations (groups, permissions, admin log) remain.
+        user.delete()
+    return counts
+
+
+def delete_pending(batch_size=BATCH_SIZE, progress=None):
+    """Delete the users who asked to be deleted, oldest request first.
+
+    Returns the emails of the deleted users.
+    """
+    users = get_user_model().objects.filter(
+        deletion_requested_at__isnull=False).order_by(
+            "deletion_requested_at")
+    deleted = []
+    for user in users:
+        delete_user(user, batch_size=batch_size, progress=progress)
+        deleted.append(user.email)
+    return deleted
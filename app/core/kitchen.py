@@ -0,0 +1,176 @@
+"""
+Per-user kitchen statistics.
+
+`KitchenStats` keeps one row per user with their recipe count, price
+and time totals, and how many recipes use each tag and ingredient, so
+the dashboard reads a single row by primary key instead of scanning the
+user's recipes.
+
+Users start with an empty row, and the handlers in `core.signals` pass
+the difference each change makes to `record()`, which applies it once
+the transaction commits. Writes that skip signals (bulk operations,
+seeding) call `rebuild()` for the users they touch, and the
+`rebuild_kitchen_stats` command recomputes every row in batches, for
+users created before the stats existed or should the totals drift.
+"""
+
+import heapq
+from decimal import Decimal
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from core.models import Recipe, Tag, Ingredient, KitchenStats
+
+BATCH_SIZE = 500
+TOP = 5
+
+# Stats field and through table column of each linked model.
+LINKS = {
+    Tag: ("tags", Recipe.tags.through, "tag"),
+    Ingredient: ("ingredients", Recipe.ingredients.through, "ingredient"),
+}
+
+
+def _add_counts(counts, changes, model):
+    """Add {id: change} to {"<id>": [name, count]}, dropping zeros."""
+    new = [pk for pk, n in changes.items() if str(pk) not in counts and n > 0]
+    names = {}
+    if new:
+        names = dict(
+            model.objects.filter(pk__in=new).values_list("id", "name"))
+    for pk, n in changes.items():
+        name, count = counts.get(str(pk), (names.get(pk), 0))
+        if name is not None and count + n > 0:
+            counts[str(pk)] = [name, count + n]
+        else:
+            counts.pop(str(pk), None)
+
+
+def apply(user_id, recipes=0, price=0, time=0, tags=None, ingredients=None):
+    """Add a change to the user's stats.
+
+    `tags` and `ingredients` map IDs to the change in the number of
+    recipes using them. Users without a stats row are skipped: they have
+    been deleted, or predate the stats and are counted by `rebuild()`.
+    """
+    with transaction.atomic():
+        stats = KitchenStats.objects.select_for_update().filter(
+            user_id=user_id).first()
+        if stats is None:
+            return
+        stats.recipe_count += recipes
+        stats.price_total += Decimal(price)
+        stats.time_total += time
+        _add_counts(stats.tags, tags or {}, Tag)
+        _add_counts(stats.ingredients, ingredients or {}, Ingredient)
+        stats.save()
+
+
+def rename(model, user_id, pk, name):
+    """Rename a tag/ingredient in its owner's stats, or drop it if None."""
+    field = LINKS[model][0]
+    with transaction.atomic():
+        stats = KitchenStats.objects.select_for_update().filter(
+            user_id=user_id).first()
+        counts = getattr(stats, field, {})
+        if str(pk) not in counts or counts[str(pk)][0] == name:
+            return
+        if name is None:
+            del counts[str(pk)]
+        else:
+            counts[str(pk)][0] = name
+        stats.save(update_fields=[field, "updated_at"])
+
+
+def record(user_id, **change):
+    """Apply a change to the user's stats once the transaction commits.
+
+    Rolled back changes are never applied, and the stats row is only
+    locked briefly after the commit rather than for the whole request.
+    """
+    transaction.on_commit(partial(apply, user_id, **change))
+
+
+def record_rename(model, user_id, pk, name):
+    """Rename a tag/ingredient in the stats once the transaction commits."""
+    transaction.on_commit(partial(rename, model, user_id, pk, name))
+
+
+def _rebuild_batch(user_ids):
+    stats = {pk: KitchenStats(user_id=pk) for pk in user_ids}
+    totals = Recipe.objects.filter(user_id__in=user_ids).values(
+        "user_id").annotate(count=Count("id"),
+                            price=Sum("price"),
+                            time=Sum("time_minutes")).order_by()
+    for row in totals:
+        row_stats = stats[row["user_id"]]
+        row_stats.recipe_count = row["count"]
+        row_stats.price_total = row["price"]
+        row_stats.time_total = row["time"]
+    for field, through, column in LINKS.values():
+        links = through.objects.filter(
+            recipe__user_id__in=user_ids).values_list(
+                "recipe__user_id", f"{column}_id",
+                f"{column}__name").annotate(count=Count("id")).order_by()
+        for user_id, pk, name, count in links:
+            getattr(stats[user_id], field)[str(pk)] = [name, count]
+    KitchenStats.objects.filter(user_id__in=user_ids).delete()
+    # A concurrent rebuild may insert a missing row first; it was counted
+    # from the same links, so keeping either row is right.
+    KitchenStats.objects.bulk_create(stats.values(), ignore_conflicts=True)
+
+
+def rebuild(user_ids=None, batch_size=BATCH_SIZE, progress=None):
+    """Recompute stats from scratch, `batch_size` users per transaction.
+
+    Every user is rebuilt when `user_ids` is None. `progress(count)` is
+    called with the number of users done after every batch. Returns the
+    number of users rebuilt.
+    """
+    users = get_user_model().objects.order_by("id")
+    if user_ids is not None:
+        users = users.filter(id__in=user_ids)
+    done, last = 0, 0
+    while True:
+        batch = list(
+            users.filter(id__gt=last).values_list("id",
+                                                  flat=True)[:batch_size])
+        if not batch:
+            return done
+        with transaction.atomic():
+            _rebuild_batch(batch)
+        done, last = done + len(batch), batch[-1]
+        if progress:
+            progress(done)
+        if len(batch) < batch_size:
+            return done
+
+
+def top(counts, limit=TOP):
+    """Return the most used of {"<id>": [name, count]}, most used first."""
+    items = heapq.nsmallest(limit,
+                            counts.items(),
+                            key=lambda item: (-item[1][1], item[1][0]))
+    return [{
+        "id": int(pk),
+        "name": name,
+        "recipes": count
+    } for pk, (name, count) in items]
+
+
+def summary(stats):
+    """Return the dashboard figures of a `KitchenStats` row."""
+    count = stats.recipe_count
+    return {
+        "recipe_count": count,
+        "average_price": (stats.price_total /
+                          count).quantize(Decimal("0.01")) if count else None,
+        "average_time_minutes": round(stats.time_total /
+                                      count, 1) if count else None,
+        "top_tags": top(stats.tags),
+        "top_ingredients": top(stats.ingredients),
+        "updated_at": stats.updated_at,
+    }
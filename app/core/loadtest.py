@@ -0,0 +1,167 @@
+"""HTTP load driver shared by the benchmark commands."""
+
+import http.client
+import json
+import random
+import socket
+import threading
+import time
+from collections import defaultdict, namedtuple
+from urllib.parse import urlsplit
+
+# One kind of request in a scenario, picked in proportion to `weight`.
+Step = namedtuple("Step", "name method path body weight")
+
+
+def percentile(sorted_values, pct):
+    """Return the `pct` percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1,
+                max(0, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class LoadResult:
+    """Latencies and error counts collected during a load run."""
+
+    def __init__(self, latencies, errors, elapsed, by_name=None):
+        self.latencies = sorted(latencies)
+        self.errors = errors
+        self.elapsed = elapsed
+        self.by_name = by_name or {}
+
+    @property
+    def requests(self):
+        return len(self.latencies)
+
+    @property
+    def throughput(self):
+        """Successful requests per second."""
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        """Return throughput and p50/p95/p99 latency in milliseconds."""
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "rps": round(self.throughput, 1),
+            "p50_ms": round(percentile(self.latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(self.latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(self.latencies, 99) * 1000, 2),
+        }
+
+    def breakdown(self):
+        """Return a summary per request name."""
+        return {
+            name: LoadResult(latencies, errors, self.elapsed).summary()
+            for name, (latencies, errors) in sorted(self.by_name.items())
+        }
+
+
+def _worker(base, next_step, headers, deadline, out, lock):
+    """Issue requests over one keep-alive connection until the deadline."""
+    conn_cls = (http.client.HTTPSConnection
+                if base.scheme == "https" else http.client.HTTPConnection)
+    conn = conn_cls(base.hostname, base.port, timeout=30)
+    results = defaultdict(lambda: [[], 0])
+    while time.perf_counter() < deadline:
+        step = next_step()
+        body = None
+        request_headers = headers
+        if step.body is not None:
+            body = json.dumps(step.body)
+            request_headers = dict(headers,
+                                   **{"Content-Type": "application/json"})
+        start = time.perf_counter()
+        try:
+            conn.request(step.method, step.path, body, request_headers)
+            response = conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            results[step.name][1] += 1
+            conn.close()
+            continue
+        if response.status >= 400:
+            results[step.name][1] += 1
+        else:
+            results[step.name][0].append(time.perf_counter() - start)
+    conn.close()
+    with lock:
+        for name, (latencies, errors) in results.items():
+            out[name][0].extend(latencies)
+            out[name][1] += errors
+
+
+def _drive(base_url, workers, duration):
+    """Run (next_step, headers) workers in parallel and collect results."""
+    base = urlsplit(base_url)
+    out = defaultdict(lambda: [[], 0])
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=_worker,
+                         args=(base, next_step, headers, deadline, out, lock))
+        for next_step, headers in workers
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return LoadResult(
+        [latency for latencies, _ in out.values() for latency in latencies],
+        sum(errors for _, errors in out.values()), elapsed, dict(out))
+
+
+def _cycle(steps, offset):
+    position = [offset]
+
+    def next_step():
+        step = steps[position[0] % len(steps)]
+        position[0] += 1
+        return step
+
+    return next_step
+
+
+def _weighted(steps, rng):
+    weights = [step.weight for step in steps]
+
+    def next_step():
+        return rng.choices(steps, weights)[0]
+
+    return next_step
+
+
+def run(base_url, paths, headers=None, concurrency=8, duration=10.0):
+    """Drive GET requests against `paths` and return a `LoadResult`."""
+    steps = [Step(path, "GET", path, None, 1) for path in paths]
+    return _drive(base_url,
+                  [(_cycle(steps, n), headers or {})
+                   for n in range(concurrency)], duration)
+
+
+def run_scenario(base_url, sessions, duration=10.0, seed=0):
+    """Drive a weighted mix of requests and return a `LoadResult`.
+
+    `sessions` holds one (steps, headers) pair per concurrent client,
+    usually one per user. Each client picks its steps with its own
+    random generator seeded from `seed`, so a run can be repeated.
+    """
+    workers = [(_weighted(steps, random.Random(seed * 1000003 + n)), headers)
+               for n, (steps, headers) in enumerate(sessions)]
+    return _drive(base_url, workers, duration)
+
+
+def wait_for_port(host, port, timeout=30.0):
+    """Block until something accepts connections on host:port."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
@@ -0,0 +1,153 @@
+"""
+Structured, non-blocking logging.
+
+Records are put on an in-memory queue by `QueueHandler` and written as
+JSON lines by a `QueueListener` thread, so request threads never wait on
+I/O. `RequestIDMiddleware` tags each request with an ID, taken from a
+well-formed `X-Request-ID` header or generated, that `RequestIDFilter`
+adds to every record logged while the request is handled.
+
+The listener is restarted in forked children such as gunicorn workers,
+since the thread does not survive the fork.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from core.middleware import HybridMiddleware
+
+request_id = ContextVar("request_id", default=None)
+
+REQUEST_ID_HEADER = "X-Request-ID"
+_valid_request_id = re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+# Attributes every LogRecord has; anything else was passed as `extra`.
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {
+    "message", "asctime", "request_id"
+}
+
+
+class JSONFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record):
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, default=str)
+
+    def formatTime(self, record, datefmt=None):
+        return datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+            timespec="milliseconds")
+
+
+class RequestIDFilter(logging.Filter):
+    """Add the current request ID to records as `request_id`."""
+
+    def filter(self, record):
+        record.request_id = request_id.get()
+        return True
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """Queue records with their message and traceback rendered."""
+
+    _formatter = logging.Formatter()
+
+    def prepare(self, record):
+        # Rendered now: arguments may change once the caller moves on.
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._formatter.formatException(
+                record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listeners = []
+
+
+def _start(handler, target):
+    handler.queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(handler.queue,
+                                              target,
+                                              respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def _restart_after_fork():
+    for index, (handler, target, _) in enumerate(_listeners):
+        _listeners[index] = (handler, target, _start(handler, target))
+
+
+def _stop_all():
+    for _, _, listener in _listeners:
+        listener.stop()
+
+
+os.register_at_fork(after_in_child=_restart_after_fork)
+atexit.register(_stop_all)
+
+
+def queue_handler(stream=None, formatter=None):
+    """Return a `QueueHandler` feeding a JSON stream handler thread.
+
+    Used as a handler factory in the LOGGING setting.
+    """
+    target = logging.StreamHandler(stream or sys.stderr)
+    target.setFormatter(formatter or JSONFormatter())
+    handler = QueueHandler(None)
+    _listeners.append((handler, target, _start(handler, target)))
+    return handler
+
+
+class RequestIDMiddleware(HybridMiddleware):
+    """Set the request ID for logging and echo it in the response."""
+
+    @contextmanager
+    def identify(self, request):
+        value = request.META.get("HTTP_X_REQUEST_ID", "")
+        if not _valid_request_id.fullmatch(value):
+            value = uuid.uuid4().hex
+        request.request_id = value
+        token = request_id.set(value)
+        try:
+            yield value
+        finally:
+            request_id.reset(token)
+
+    def call(self, request):
+        with self.identify(request) as value:
+            response = self.get_response(request)
+        response[REQUEST_ID_HEADER] = value
+        return response
+
+    async def acall(self, request):
+        with self.identify(request) as value:
+            response = await self.get_response(request)
+        response[REQUEST_ID_HEADER] = value
+        return response
@@ -0,0 +1,107 @@
+"""
+Django command measuring the logging overhead a request pays with
+synchronous and queued handlers, and with eager and lazy formatting.
+"""
+
+import logging
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import log
+
+
+class SlowStream:
+    """File wrapper whose writes stall, like a pipe under backpressure."""
+
+    def __init__(self, stream, delay):
+        self.stream = stream
+        self.delay = delay
+
+    def write(self, text):
+        time.sleep(self.delay)
+        self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def per_request_us(logger, requests, records):
+    """Return the mean wall microseconds of logging `records` lines."""
+    start = time.perf_counter()
+    for i in range(requests):
+        for j in range(records):
+            logger.info("Handled step %s of request %s", j, i,
+                        extra={"view": "recipe:recipe-list"})
+    return (time.perf_counter() - start) * 1e6 / requests
+
+
+class Command(BaseCommand):
+    """Compare logging handlers and message formatting."""
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--records",
+                            type=int,
+                            default=5,
+                            help="Log records per request.")
+        parser.add_argument("--stall-us",
+                            type=float,
+                            default=100,
+                            help="Write delay of the slow stream.")
+
+    def compare(self, logger, stream, requests, records):
+        """Print the per-request cost of each handler writing to stream."""
+        target = logging.StreamHandler(stream)
+        target.setFormatter(log.JSONFormatter())
+        target.addFilter(log.RequestIDFilter())
+        logger.handlers = [target]
+        us = per_request_us(logger, requests, records)
+        self.stdout.write(f"    {'synchronous':<20}{us:9.1f} us")
+
+        handler = log.QueueHandler(None)
+        handler.addFilter(log.RequestIDFilter())
+        listener = log._start(handler, target)
+        logger.handlers = [handler]
+        us = per_request_us(logger, requests, records)
+        start = time.perf_counter()
+        listener.stop()
+        drain = (time.perf_counter() - start) * 1e6 / requests
+        logger.handlers = []
+        self.stdout.write(f"    {'queued':<20}{us:9.1f} us "
+                          f"(then {drain:.1f} us draining)")
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        requests, records = options["requests"], options["records"]
+        logger = logging.getLogger("bench_logging")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+
+        self.stdout.write(f"Per request, logging {records} JSON records:")
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "bench.log"), "a") as stream:
+                self.stdout.write("  to a local file")
+                self.compare(logger, stream, requests, records)
+                self.stdout.write(f"  to a stream stalling "
+                                  f"{options['stall_us']:g} us per write")
+                slow = SlowStream(stream, options["stall_us"] / 1e6)
+                self.compare(logger, slow, requests, records)
+
+        self.stdout.write("Disabled debug call with a dict argument:")
+        payload = {"email": "user@example.com", "name": "User", "tags": []}
+        iterations = requests * records
+        start = time.perf_counter()
+        for _ in range(iterations):
+            logger.debug(f"Create user response from: {payload}")
+        eager = (time.perf_counter() - start) * 1e9 / iterations
+        start = time.perf_counter()
+        for _ in range(iterations):
+            logger.debug("Create user response from: %s", payload)
+        lazy = (time.perf_counter() - start) * 1e9 / iterations
+        self.stdout.write(f"  {'f-string':<22}{eager:9.0f} ns")
+        self.stdout.write(f"  {'lazy %s':<22}{lazy:9.0f} ns")
@@ -0,0 +1,80 @@
+"""
+Django command benchmarking JSON rendering and response compression on a
+recipe list payload.
+"""
+
+import time
+from collections import OrderedDict
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from core import middleware
+from core.renderers import FastJSONRenderer
+
+
+def recipe_payload(num_recipes):
+    """Return a list shaped like `RecipeSerializer(many=True).data`."""
+    recipes = []
+    for i in range(num_recipes):
+        recipes.append(
+            OrderedDict([
+                ("id", i + 1),
+                ("title", f"Sample recipe {i}"),
+                ("time_minutes", 10 + i % 50),
+                ("price", f"{5 + i % 20}.{i % 100:02d}"),
+                ("link", f"http://example.com/recipes/{i}.pdf"),
+                ("tags", [
+                    OrderedDict([("id", t), ("name", f"Tag {t}")])
+                    for t in range(i % 4)
+                ]),
+                ("ingredients", [
+                    OrderedDict([("id", n), ("name", f"Ingredient {n}")])
+                    for n in range(i % 7)
+                ]),
+                ("description", "A sample recipe description. " * 3),
+                ("image", None),
+            ]))
+    return recipes
+
+
+def cpu_time(func, iterations):
+    """Return the mean CPU milliseconds of `func()` and its last result."""
+    start = time.process_time()
+    for _ in range(iterations):
+        result = func()
+    return (time.process_time() - start) * 1000 / iterations, result
+
+
+class Command(BaseCommand):
+    """Compare renderers and content encodings for a recipe list."""
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=1000)
+        parser.add_argument("--iterations", type=int, default=50)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        data = recipe_payload(options["recipes"])
+        iterations = options["iterations"]
+
+        self.stdout.write(f"Rendering {options['recipes']} recipes:")
+        body = None
+        for renderer in (JSONRenderer(), FastJSONRenderer()):
+            ms, body = cpu_time(lambda: renderer.render(data), iterations)
+            self.stdout.write(f"  {type(renderer).__name__:<20}"
+                              f"{ms:8.2f} ms CPU {len(body):>9} bytes")
+
+        self.stdout.write("Compression of the rendered payload:")
+        self.stdout.write(f"  {'identity':<20}{0:8.2f} ms CPU "
+                          f"{len(body):>9} bytes")
+        encodings = ["gzip"] + (["br"] if middleware.brotli else [])
+        for encoding in encodings:
+            ms, compressed = cpu_time(
+                lambda: middleware.compress(body, encoding), iterations)
+            self.stdout.write(f"  {encoding:<20}{ms:8.2f} ms CPU "
+                              f"{len(compressed):>9} bytes")
+        if not middleware.brotli:
+            self.stdout.write("  br skipped: Brotli is not installed.")
@@ -0,0 +1,103 @@
+"""
+Django command benchmarking recipe list serialization per 1k rows.
+
+Rows are created inside a transaction that is rolled back at the end.
+"""
+
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core import bitsets
+from core.models import Recipe, Tag, Ingredient
+from core.renderers import FastJSONRenderer
+from recipe.fast_serializers import RecipeListSerializer
+from recipe.serializers import RecipeSerializer
+
+
+def create_dataset(num_recipes):
+    """Bulk create a user with recipes, tags and ingredients."""
+    user = get_user_model().objects.create_user(
+        email="bench-serializers@example.com", password=None)
+    Tag.objects.bulk_create(
+        [Tag(user=user, name=f"bench-serializers-tag-{i}") for i in range(10)])
+    Ingredient.objects.bulk_create([
+        Ingredient(user=user, name=f"bench-ingredient-{i}", bit_index=i)
+        for i in range(20)
+    ])
+    Recipe.objects.bulk_create([
+        Recipe(user=user,
+               title=f"Recipe {i}",
+               time_minutes=5 + i % 60,
+               price=Decimal(f"{1 + i % 30}.{i % 100:02d}"),
+               description="Benchmark recipe.") for i in range(num_recipes)
+    ])
+    # Not every backend returns primary keys from bulk_create.
+    tags = list(Tag.objects.filter(user=user).order_by("id"))
+    ingredients = list(Ingredient.objects.filter(user=user).order_by("id"))
+    recipes = list(Recipe.objects.filter(user=user).order_by("id"))
+    tag_through = Recipe.tags.through
+    ingredient_through = Recipe.ingredients.through
+    tag_through.objects.bulk_create([
+        tag_through(recipe_id=recipe.id, tag_id=tags[(i + j) % 10].id)
+        for i, recipe in enumerate(recipes) for j in range(2)
+    ])
+    ingredient_through.objects.bulk_create([
+        ingredient_through(recipe_id=recipe.id,
+                           ingredient_id=ingredients[(i + j) % 20].id)
+        for i, recipe in enumerate(recipes) for j in range(4)
+    ])
+    bitsets.refresh(recipe.id for recipe in recipes)
+    return user
+
+
+class Command(BaseCommand):
+    """Compare RecipeSerializer and RecipeListSerializer."""
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def _time(self, func, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        num = options["recipes"]
+        with transaction.atomic():
+            user = create_dataset(num)
+            queryset = Recipe.objects.filter(user=user).order_by("-id")
+
+            drf_time, drf_data = self._time(
+                lambda: RecipeSerializer(queryset.prefetch_related(
+                    "tags", "ingredients"),
+                                         many=True).data, options["repeat"])
+            fast_time, fast_data = self._time(
+                lambda: RecipeListSerializer(queryset).data,
+                options["repeat"])
+            transaction.set_rollback(True)
+
+        renderer = FastJSONRenderer()
+        if renderer.render(drf_data) != renderer.render(fast_data):
+            raise CommandError("Serializer outputs differ.")
+
+        per_1k = 1000.0 / num * 1000
+        self.stdout.write(f"Serializing {num} recipes (best of "
+                          f"{options['repeat']}, incl. queries):")
+        self.stdout.write(f"  RecipeSerializer     "
+                          f"{drf_time * per_1k:8.2f} ms per 1k rows")
+        self.stdout.write(f"  RecipeListSerializer "
+                          f"{fast_time * per_1k:8.2f} ms per 1k rows")
+        self.stdout.write(
+            self.style.SUCCESS("Outputs are byte-identical."))
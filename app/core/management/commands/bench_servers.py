@@ -0,0 +1,135 @@
+"""
+Django command comparing gunicorn-sync, gunicorn-gthread and uvicorn
+throughput on the same recipe dataset.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework.authtoken.models import Token
+
+from core import loadtest
+from core.models import Recipe, Tag, Ingredient
+
+BENCH_EMAIL = "bench@example.com"
+
+
+class Command(BaseCommand):
+    """Benchmark the recipe read endpoints under different servers."""
+
+    help = ("Start each application server in turn and measure throughput "
+            "of the recipe read endpoints. Uses the configured database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=200)
+        parser.add_argument("--duration", type=float, default=10.0)
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument("--workers", type=int, default=2)
+        parser.add_argument("--threads", type=int, default=4)
+        parser.add_argument("--port", type=int, default=8100)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        token = self._ensure_dataset(options["recipes"])
+        headers = {"Authorization": f"Token {token.key}"}
+        bind = f"127.0.0.1:{options['port']}"
+        workers = str(options["workers"])
+
+        sync_paths = [
+            "/api/recipe/recipes/",
+            "/api/recipe/tags/",
+            "/api/recipe/ingredients/",
+        ]
+        async_paths = [
+            "/api/recipe/async/recipes/",
+            "/api/recipe/async/tags/",
+            "/api/recipe/async/ingredients/",
+        ]
+        servers = [
+            ("gunicorn-sync", "gunicorn", [
+                "-b", bind, "-w", workers, "-k", "sync",
+                "app.wsgi:application"
+            ], [("sync", sync_paths)]),
+            ("gunicorn-gthread", "gunicorn", [
+                "-b", bind, "-w", workers, "-k", "gthread", "--threads",
+                str(options["threads"]), "app.wsgi:application"
+            ], [("sync", sync_paths)]),
+            ("uvicorn", "uvicorn", [
+                "--host", "127.0.0.1", "--port",
+                str(options["port"]), "--workers", workers, "--log-level",
+                "warning", "app.asgi:application"
+            ], [("sync", sync_paths), ("async", async_paths)]),
+        ]
+
+        self.stdout.write(f"{'server':<18}{'views':<7}{'rps':>9}"
+                          f"{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}")
+        for name, executable, server_args, runs in servers:
+            if shutil.which(executable) is None:
+                self.stdout.write(
+                    self.style.WARNING(f"{name}: {executable} not installed, "
+                                       "skipping."))
+                continue
+            for label, paths in runs:
+                result = self._bench(executable, server_args, options, paths,
+                                     headers)
+                if result is None:
+                    self.stderr.write(f"{name}: server failed to start.")
+                    break
+                stats = result.summary()
+                self.stdout.write(f"{name:<18}{label:<7}{stats['rps']:>9}"
+                                  f"{stats['p50_ms']:>9}{stats['p99_ms']:>9}"
+                                  f"{stats['errors']:>8}")
+
+    def _bench(self, executable, server_args, options, paths, headers):
+        """Run one server process and drive load against it."""
+        env = dict(os.environ, PYTHONPATH=str(settings.BASE_DIR))
+        process = subprocess.Popen([executable] + server_args,
+                                   cwd=settings.BASE_DIR,
+                                   env=env,
+                                   stdout=subprocess.DEVNULL,
+                                   stderr=sys.stderr)
+        try:
+            if not loadtest.wait_for_port("127.0.0.1", options["port"]):
+                return None
+            base_url = f"http://127.0.0.1:{options['port']}"
+            # Warm up imports and connections before measuring.
+            loadtest.run(base_url, paths, headers, options["concurrency"], 1)
+            return loadtest.run(base_url, paths, headers,
+                                options["concurrency"], options["duration"])
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    def _ensure_dataset(self, num_recipes):
+        """Create the benchmark user and recipes if missing."""
+        user, created = get_user_model().objects.get_or_create(
+            email=BENCH_EMAIL, defaults={"name": "Bench User"})
+        if created:
+            user.set_password(None)
+            user.save()
+        tags = [
+            Tag.objects.get_or_create(user=user, name=f"bench-tag-{i}")[0]
+            for i in range(5)
+        ]
+        ingredients = [
+            Ingredient.objects.get_or_create(user=user,
+                                             name=f"bench-ingredient-{i}")[0]
+            for i in range(10)
+        ]
+        existing = Recipe.objects.filter(user=user).count()
+        for i in range(existing, num_recipes):
+            recipe = Recipe.objects.create(user=user,
+                                           title=f"Bench recipe {i}",
+                                           time_minutes=10 + i % 50,
+                                           price=Decimal("4.50"),
+                                           description="Benchmark recipe.")
+            recipe.tags.set(tags[i % 5:i % 5 + 2])
+            recipe.ingredients.set(ingredients[i % 10:i % 10 + 3])
+        token, _ = Token.objects.get_or_create(user=user)
+        return token
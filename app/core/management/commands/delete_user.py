@@ -0,0 +1,48 @@
+"""Django command deleting a user and their data in batches."""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.deletion import BATCH_SIZE, delete_user, delete_pending
+
+
+class Command(BaseCommand):
+    """Delete a user with their recipes, tags and ingredients."""
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument("email", nargs="?")
+        parser.add_argument("--pending",
+                            action="store_true",
+                            help="Delete every user who asked for their "
+                            "account to be deleted.")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    def _progress(self, name, deleted):
+        self.stdout.write(f"  {name}: {deleted} deleted")
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if options["pending"]:
+            deleted = delete_pending(batch_size=options["batch_size"],
+                                     progress=self._progress)
+            self.stdout.write(
+                self.style.SUCCESS(f"Deleted {len(deleted)} users."))
+            return
+        if not options["email"]:
+            raise CommandError("Give an email or --pending.")
+
+        User = get_user_model()
+        try:
+            user = User.objects.get(email=options["email"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {options['email']}.")
+
+        counts = delete_user(user,
+                             batch_size=options["batch_size"],
+                             progress=self._progress)
+        summary = ", ".join(f"{count} {name}s"
+                            for name, count in counts.items())
+        self.stdout.write(
+            self.style.SUCCESS(f"Deleted {options['email']} ({summary})."))
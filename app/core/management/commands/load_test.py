@@ -0,0 +1,112 @@
+"""
+Django command running a reproducible load-test scenario against a
+running server, using users created by `seed_data`.
+"""
+
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from core import loadtest
+from core.loadtest import Step
+from core.models import Recipe, Tag
+
+
+def user_steps(user, num_ids=50):
+    """Return the weighted requests one user makes in the scenario."""
+    recipe_ids = list(
+        Recipe.objects.filter(user=user).order_by("id").values_list(
+            "id", flat=True)[:num_ids])
+    tag_ids = list(
+        Tag.objects.filter(user=user).order_by("id").values_list(
+            "id", flat=True)[:num_ids])
+    steps = [
+        Step("recipe list", "GET", "/api/recipe/recipes/", None, 20),
+        Step("recipe list sparse", "GET",
+             "/api/recipe/recipes/?fields=id,title", None, 10),
+        Step("tag list", "GET", "/api/recipe/tags/", None, 10),
+        Step("ingredient list", "GET", "/api/recipe/ingredients/", None, 10),
+        Step("me", "GET", "/api/user/me/", None, 5),
+    ]
+    steps += [
+        Step("recipe detail", "GET", f"/api/recipe/recipes/{pk}/", None,
+             30 / len(recipe_ids)) for pk in recipe_ids
+    ]
+    steps += [
+        Step("recipe update", "PATCH", f"/api/recipe/recipes/{pk}/",
+             {"time_minutes": 30}, 5 / len(recipe_ids)) for pk in recipe_ids
+    ]
+    steps += [
+        Step("recipe list by tag", "GET", f"/api/recipe/recipes/?tags={pk}",
+             None, 10 / len(tag_ids)) for pk in tag_ids
+    ]
+    return steps
+
+
+class Command(BaseCommand):
+    """Drive a weighted mix of recipe and user API requests."""
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--prefix",
+                            default="seed",
+                            help="Email prefix of the seeded users.")
+        parser.add_argument("--concurrency",
+                            type=int,
+                            default=8,
+                            help="Number of clients, one seeded user each.")
+        parser.add_argument("--duration", type=float, default=30.0)
+        parser.add_argument("--warmup", type=float, default=2.0)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--json",
+                            action="store_true",
+                            help="Print the results as JSON.")
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        users = list(
+            get_user_model().objects.filter(
+                email__startswith=f"{options['prefix']}-",
+                recipe__isnull=False,
+                tag__isnull=False).distinct().order_by("id")
+            [:options["concurrency"]])
+        if len(users) < options["concurrency"]:
+            raise CommandError(
+                f"Need {options['concurrency']} users with recipes and tags "
+                f"named {options['prefix']}-<n>@example.com; run seed_data.")
+
+        sessions = []
+        for user in users:
+            token, _ = Token.objects.get_or_create(user=user)
+            sessions.append((user_steps(user), {
+                "Authorization": f"Token {token.key}"
+            }))
+
+        if options["warmup"]:
+            loadtest.run_scenario(options["base_url"], sessions,
+                                  options["warmup"], options["seed"])
+        result = loadtest.run_scenario(options["base_url"], sessions,
+                                       options["duration"], options["seed"])
+
+        if options["json"]:
+            self.stdout.write(
+                json.dumps({
+                    "total": result.summary(),
+                    "requests": result.breakdown()
+                },
+                           indent=2))
+            return
+        self.stdout.write(f"{'request':<22}{'count':>8}{'rps':>9}"
+                          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+                          f"{'errors':>8}")
+        rows = list(result.breakdown().items())
+        rows.append(("total", result.summary()))
+        for name, stats in rows:
+            self.stdout.write(f"{name:<22}{stats['requests']:>8}"
+                              f"{stats['rps']:>9}{stats['p50_ms']:>9}"
+                              f"{stats['p95_ms']:>9}{stats['p99_ms']:>9}"
+                              f"{stats['errors']:>8}")
@@ -0,0 +1,49 @@
+"""Django command merging duplicate tags and ingredients."""
+
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from core import bulk, kitchen
+from core.models import Tag, Ingredient
+
+MODELS = {"tags": Tag, "ingredients": Ingredient}
+
+
+class Command(BaseCommand):
+    """Merge each user's tags/ingredients that share a normalized name."""
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model",
+                            choices=sorted(MODELS),
+                            action="append",
+                            help="Limit to tags or ingredients.")
+        parser.add_argument("--dry-run",
+                            action="store_true",
+                            help="Only report what would be merged.")
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        user_ids = set()
+        for name in options["model"] or sorted(MODELS):
+            model = MODELS[name]
+            totals = Counter()
+            # Clusters are collected first so merging does not disturb
+            # the rows still being read.
+            clusters = list(bulk.duplicate_clusters(model))
+            for _, ids in clusters:
+                totals.update(
+                    bulk.merge(model.objects.filter(id__in=ids),
+                               dry_run=options["dry_run"],
+                               rebuild_stats=False))
+            user_ids.update(user_id for user_id, _ in clusters)
+            verb = "Would merge" if options["dry_run"] else "Merged"
+            self.stdout.write(
+                f"{name}: {len(clusters)} duplicate groups. {verb} "
+                f"{totals[name]} {name}, moving "
+                f"{totals['recipe links moved']} recipe links.")
+        # Stats are rebuilt once per user rather than once per group.
+        if user_ids and not options["dry_run"]:
+            kitchen.rebuild(sorted(user_ids))
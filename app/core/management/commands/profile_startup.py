@@ -0,0 +1,156 @@
+"""
+Django command to profile application startup.
+
+Reports the slowest imports (``python -X importtime``), the time spent
+in each ``AppConfig.ready()`` and the time to serve a first request in
+a fresh interpreter.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Runs in a fresh interpreter: times every AppConfig.ready() and serves
+# one request through the WSGI handler.
+CHILD_SCRIPT = """
+import json
+import sys
+import time
+
+start = time.perf_counter()
+
+from django.apps.config import AppConfig
+
+ready_ms = {}
+_create = AppConfig.create.__func__
+
+
+def create(cls, entry):
+    config = _create(cls, entry)
+    ready = config.ready
+
+    def timed_ready():
+        t = time.perf_counter()
+        ready()
+        ready_ms[config.label] = (time.perf_counter() - t) * 1000
+
+    config.ready = timed_ready
+    return config
+
+
+AppConfig.create = classmethod(create)
+
+import django
+
+django.setup()
+setup_done = time.perf_counter()
+
+from wsgiref.util import setup_testing_defaults
+from django.core.handlers.wsgi import WSGIHandler
+
+environ = {"PATH_INFO": sys.argv[1]}
+setup_testing_defaults(environ)
+statuses = []
+b"".join(WSGIHandler()(environ, lambda s, h, e=None: statuses.append(s)))
+done = time.perf_counter()
+
+print(json.dumps({
+    "setup_ms": (setup_done - start) * 1000,
+    "first_request_ms": (done - setup_done) * 1000,
+    "status": statuses[0],
+    "ready_ms": ready_ms,
+}))
+"""
+
+
+def parse_importtime(stderr):
+    """Return {module: (self_us, cumulative_us, depth)} from -X importtime."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return modules
+
+
+class Command(BaseCommand):
+    """Profile imports, app ready() hooks and time-to-first-request."""
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default="/api/")
+        parser.add_argument("--runs", type=int, default=3)
+        parser.add_argument("--top", type=int, default=15)
+        parser.add_argument(
+            "--production",
+            action="store_true",
+            help="Profile with DJANGO_DEBUG=0 (lean app list, warm URLs).",
+        )
+
+    def _run_child(self, path, env, importtime=False):
+        args = [sys.executable]
+        if importtime:
+            args += ["-X", "importtime"]
+        start = time.perf_counter()
+        result = subprocess.run(args + ["-c", CHILD_SCRIPT, path],
+                                cwd=settings.BASE_DIR,
+                                env=env,
+                                capture_output=True,
+                                text=True,
+                                check=True)
+        wall_ms = (time.perf_counter() - start) * 1000
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        report["wall_ms"] = wall_ms
+        return report, result.stderr
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        env = dict(os.environ,
+                   DJANGO_SETTINGS_MODULE=os.environ.get(
+                       "DJANGO_SETTINGS_MODULE", "app.settings"),
+                   PYTHONPATH=str(settings.BASE_DIR))
+        if options["production"]:
+            env["DJANGO_DEBUG"] = "0"
+
+        _, stderr = self._run_child(options["path"], env, importtime=True)
+        modules = parse_importtime(stderr)
+        top_level = sorted(
+            ((name, values) for name, values in modules.items()
+             if values[2] == 0),
+            key=lambda item: item[1][1],
+            reverse=True,
+        )
+        total_us = sum(values[1] for _, values in top_level)
+        self.stdout.write(f"Imports: {len(modules)} modules, "
+                          f"{total_us / 1000:.1f} ms cumulative")
+        for name, (self_us, cumulative_us, _) in top_level[:options["top"]]:
+            self.stdout.write(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+        reports = [
+            self._run_child(options["path"], env)[0]
+            for _ in range(max(1, options["runs"]))
+        ]
+        self.stdout.write("AppConfig.ready():")
+        ready_ms = reports[-1]["ready_ms"]
+        for label, ms in sorted(ready_ms.items(), key=lambda i: -i[1]):
+            self.stdout.write(f"  {ms:8.2f} ms  {label}")
+
+        def median(key):
+            return statistics.median(r[key] for r in reports)
+
+        self.stdout.write(
+            f"Time to first request ({options['path']}, "
+            f"status {reports[-1]['status']}, median of {len(reports)}):")
+        self.stdout.write(f"  setup:         {median('setup_ms'):8.1f} ms")
+        self.stdout.write(
+            f"  first request: {median('first_request_ms'):8.1f} ms")
+        self.stdout.write(f"  process total: {median('wall_ms'):8.1f} ms")
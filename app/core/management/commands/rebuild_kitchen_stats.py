@@ -0,0 +1,31 @@
+"""Django command recomputing the per-user kitchen stats."""
+
+from django.core.management.base import BaseCommand
+
+from core import kitchen
+
+
+class Command(BaseCommand):
+    """Recompute every user's kitchen stats from their recipes."""
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user",
+                            type=int,
+                            action="append",
+                            dest="user_ids",
+                            help="Only rebuild the user with this ID.")
+        parser.add_argument("--batch-size",
+                            type=int,
+                            default=kitchen.BATCH_SIZE,
+                            help="Users rebuilt per transaction.")
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        done = kitchen.rebuild(
+            options["user_ids"],
+            batch_size=options["batch_size"],
+            progress=lambda count: self.stdout.write(
+                f"{count} users rebuilt..."))
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {done} users."))
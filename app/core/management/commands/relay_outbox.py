@@ -0,0 +1,62 @@
+"""Django command relaying outbox events to a sink."""
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core import outbox
+
+
+class Command(BaseCommand):
+    """Tail the outbox table and deliver events in batches."""
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sink",
+            default="stdout",
+            help='"stdout", "file:<path>" or an http(s) URL.')
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--interval",
+                            type=float,
+                            default=1.0,
+                            help="Seconds to sleep when the outbox is empty.")
+        parser.add_argument("--keep-days",
+                            type=int,
+                            default=7,
+                            help="Delete delivered events older than this.")
+        parser.add_argument("--once",
+                            action="store_true",
+                            help="Exit once the outbox is drained.")
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        try:
+            sink = outbox.get_sink(options["sink"])
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        delivered = 0
+        while True:
+            try:
+                sent = outbox.relay(sink, options["batch_size"])
+            except OSError as exc:
+                if options["once"]:
+                    raise CommandError(f"Delivery failed: {exc}")
+                self.stderr.write(f"Delivery failed, retrying: {exc}")
+                time.sleep(options["interval"])
+                continue
+            delivered += sent
+            if sent:
+                continue
+
+            outbox.purge_delivered(timezone.now() -
+                                   timedelta(days=options["keep_days"]))
+            if options["once"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stderr.write(f"Delivered {delivered} events.")
@@ -0,0 +1,30 @@
+"""Django command to render the OpenAPI schema to a file at build time."""
+
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.schema import render_schema
+
+
+class Command(BaseCommand):
+    """Render the OpenAPI schema served by `core.schema.schema_view`."""
+
+    help = "Render the OpenAPI schema to OPENAPI_SCHEMA_PATH."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--file",
+                            default=None,
+                            help="Output path (default OPENAPI_SCHEMA_PATH).")
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        path = str(options["file"] or settings.OPENAPI_SCHEMA_PATH)
+        content = render_schema()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {len(content)} bytes to {path}"))
@@ -0,0 +1,61 @@
+"""Django command generating synthetic users, recipes, tags and ingredients."""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from core import seeding
+
+
+class Command(BaseCommand):
+    """Generate data for load and performance testing."""
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--recipes-per-user", type=int, default=50)
+        parser.add_argument("--tags-per-user", type=int, default=10)
+        parser.add_argument("--ingredients-per-user", type=int, default=30)
+        parser.add_argument("--tags-per-recipe", type=int, default=2)
+        parser.add_argument("--ingredients-per-recipe", type=int, default=5)
+        parser.add_argument("--users-per-batch", type=int, default=100)
+        parser.add_argument("--prefix",
+                            default="seed",
+                            help="Users are named <prefix>-<n>@example.com.")
+        parser.add_argument("--password", default="seedpass123")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def _progress(self, totals):
+        elapsed = time.perf_counter() - self.start
+        rows = sum(totals.values())
+        self.stdout.write(f"  {totals['users']} users, {rows} rows "
+                          f"({rows / elapsed:,.0f} rows/s)")
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        self.start = time.perf_counter()
+        try:
+            totals = seeding.seed(
+                options["users"],
+                recipes_per_user=options["recipes_per_user"],
+                tags_per_user=options["tags_per_user"],
+                ingredients_per_user=options["ingredients_per_user"],
+                tags_per_recipe=options["tags_per_recipe"],
+                ingredients_per_recipe=options["ingredients_per_recipe"],
+                prefix=options["prefix"],
+                password=options["password"],
+                random_seed=options["seed"],
+                users_per_batch=options["users_per_batch"],
+                progress=self._progress)
+        except ValueError as exc:
+            raise CommandError(exc)
+        except IntegrityError:
+            raise CommandError(f"Users with prefix {options['prefix']!r} "
+                               "already exist; pick another --prefix.")
+        elapsed = time.perf_counter() - self.start
+        summary = ", ".join(f"{count} {name}"
+                            for name, count in totals.items())
+        self.stdout.write(
+            self.style.SUCCESS(f"Created {summary} in {elapsed:.1f}s."))
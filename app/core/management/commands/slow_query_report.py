@@ -0,0 +1,50 @@
+"""Django command summarizing slow-query logs by fingerprint."""
+
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import slow_queries
+
+
+class Command(BaseCommand):
+    """Report the slowest query shapes recorded in SLOW_QUERY_LOG."""
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths",
+                            nargs="*",
+                            help="Log files; defaults to SLOW_QUERY_LOG.")
+        parser.add_argument("--limit", type=int, default=20)
+        parser.add_argument("--json",
+                            action="store_true",
+                            help="Print the report as JSON.")
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        paths = options["paths"] or [settings.SLOW_QUERY_LOG]
+        if not all(paths):
+            raise CommandError("Pass a log file or set SLOW_QUERY_LOG.")
+        try:
+            groups = slow_queries.aggregate(slow_queries.read(paths))
+        except (OSError, ValueError, KeyError) as exc:
+            raise CommandError(f"Could not read the log: {exc}")
+        groups = groups[:options["limit"]]
+
+        if options["json"]:
+            self.stdout.write(json.dumps(groups, indent=2))
+            return
+        for rank, group in enumerate(groups, 1):
+            self.stdout.write(
+                f"{rank}. {group['fingerprint']}  count={group['count']} "
+                f"total={group['total_ms']}ms mean={group['mean_ms']}ms "
+                f"max={group['max_ms']}ms")
+            self.stdout.write(f"   views: {', '.join(group['views']) or '-'}")
+            self.stdout.write(f"   {group['sql']}")
+            for frame in group["stack"]:
+                self.stdout.write(f"     at {frame}")
+            if group["explain"]:
+                for line in group["explain"].splitlines():
+                    self.stdout.write(f"   | {line}")
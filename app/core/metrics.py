@@ -0,0 +1,170 @@
+"""
+Prometheus metrics for the API, served at `/metrics`.
+
+Metric values live in `prometheus_client` counters: a lock and a float
+per label set, written to memory-mapped files per process when
+PROMETHEUS_MULTIPROC_DIR is set (as the gunicorn config does). The
+endpoint then sums the files of all workers, live and dead.
+
+Views are labelled with their URL name, never the raw path, to keep the
+number of series bounded.
+"""
+
+import hmac
+import os
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_safe
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+
+from core import query_hooks
+from core.middleware import HybridMiddleware
+
+# Decided at import, as prometheus_client decides where values live.
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+if MULTIPROCESS:
+    # Values open their files as soon as they are created.
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+UNRESOLVED = "<unresolved>"
+
+REQUESTS = Counter("http_requests_total", "HTTP requests.",
+                   ["view", "method", "status"])
+LATENCY = Histogram("http_request_duration_seconds",
+                    "Time to build the HTTP response.", ["view", "method"],
+                    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1,
+                             2.5, 5, 10))
+DB_QUERIES = Histogram("db_queries_per_request",
+                       "SQL queries run by a request.", ["view"],
+                       buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250))
+DB_TIME = Histogram("db_time_per_request_seconds",
+                    "Time a request spent waiting on SQL.", ["view"],
+                    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                             0.25, 0.5, 1, 5))
+CACHE = Counter("http_cache_requests_total",
+                "Conditional requests, a hit being a 304 response.",
+                ["view", "result"])
+DB_CONNECTIONS_OPENED = Counter("db_connections_opened_total",
+                                "Database connections opened.", ["alias"])
+DB_CONNECTIONS = Gauge("db_connections_open",
+                       "Database connections open after the last request.",
+                       ["alias"],
+                       multiprocess_mode="livesum")
+IMAGE_BYTES = Histogram("image_upload_bytes", "Size of uploaded images.",
+                        buckets=(1 << 14, 1 << 16, 1 << 18, 1 << 20, 1 << 21,
+                                 1 << 22, 1 << 23, 1 << 24))
+IMAGE_DURATION = Histogram("image_upload_duration_seconds",
+                           "Time to validate and store an uploaded image.",
+                           buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5,
+                                    5, 10))
+
+
+class _QueryTimer:
+    """`execute_wrapper` counting queries and their time."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.start = time.perf_counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+def connection_created(sender, connection, **kwargs):
+    """Count new database connections; connected in `CoreConfig`."""
+    DB_CONNECTIONS_OPENED.labels(connection.alias).inc()
+
+
+def view_name(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match else UNRESOLVED
+
+
+class MetricsMiddleware(HybridMiddleware):
+    """Record request, SQL and HTTP cache metrics for every request."""
+
+    def call(self, request):
+        timer = _QueryTimer()
+        with query_hooks.hook(timer):
+            response = self.get_response(request)
+        self.record(request, response, timer)
+        return response
+
+    async def acall(self, request):
+        timer = _QueryTimer()
+        with query_hooks.hook(timer):
+            response = await self.get_response(request)
+        self.record(request, response, timer)
+        return response
+
+    def record(self, request, response, timer):
+        elapsed = time.perf_counter() - timer.start
+        view = view_name(request)
+        method = request.method if request.method in METHODS else "other"
+        REQUESTS.labels(view, method, response.status_code).inc()
+        LATENCY.labels(view, method).observe(elapsed)
+        DB_QUERIES.labels(view).observe(timer.count)
+        DB_TIME.labels(view).observe(timer.seconds)
+        if ("HTTP_IF_NONE_MATCH" in request.META
+                or "HTTP_IF_MODIFIED_SINCE" in request.META):
+            result = "hit" if response.status_code == 304 else "miss"
+            CACHE.labels(view, result).inc()
+        for connection in connections.all():
+            DB_CONNECTIONS.labels(connection.alias).set(
+                connection.connection is not None)
+
+
+@contextmanager
+def image_upload(size):
+    """Record a successful upload of an image of `size` bytes."""
+    start = time.perf_counter()
+    yield
+    IMAGE_BYTES.observe(size)
+    IMAGE_DURATION.observe(time.perf_counter() - start)
+
+
+def registry():
+    """Return the registry to expose, merging workers when needed."""
+    if not MULTIPROCESS:
+        return REGISTRY
+    merged = CollectorRegistry()
+    multiprocess.MultiProcessCollector(merged)
+    return merged
+
+
+@require_safe
+def metrics_view(request):
+    """Expose metrics in the Prometheus text format.
+
+    METRICS_TOKEN must be sent as a bearer token. Without one configured
+    metrics are only served in DEBUG.
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponseForbidden()
+    elif not hmac.compare_digest(
+            request.META.get("HTTP_AUTHORIZATION", "").encode(),
+            f"Bearer {token}".encode()):
+        return HttpResponseForbidden()
+    return HttpResponse(generate_latest(registry()),
+                        content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,129 @@
+"""Middleware for the API."""
+
+import gzip
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+# Only API payloads are compressed. HTML pages such as the admin and the
+# browsable API reflect request data next to CSRF tokens, and
+# compressing those makes the tokens guessable from response sizes
+# (BREACH). Media is already compressed and gains nothing.
+_COMPRESS_CONTENT_TYPES = ("application/json", "application/problem+json",
+                           "application/vnd.oai.openapi", "text/plain")
+
+
+def parse_accept_encoding(header):
+    """Return {coding: q} for an Accept-Encoding header."""
+    codings = {}
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[coding.strip().lower()] = q
+    return codings
+
+
+def choose_encoding(header):
+    """Return "br", "gzip" or None for the client's Accept-Encoding."""
+    codings = parse_accept_encoding(header)
+    wildcard = codings.get("*", 0.0)
+    candidates = ["gzip"]
+    if brotli is not None:
+        candidates.insert(0, "br")
+    best, best_q = None, 0.0
+    for coding in candidates:
+        q = codings.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(content, encoding):
+    """Compress `content` with the given encoding."""
+    if encoding == "br":
+        return brotli.compress(content,
+                               quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(content,
+                         compresslevel=settings.COMPRESSION_GZIP_LEVEL,
+                         mtime=0)
+
+
+class HybridMiddleware:
+    """Base for middleware running in the mode of the handler it wraps.
+
+    Django calls async-capable middleware from async code under ASGI
+    rather than adapting it to sync, which would cost a thread hop per
+    middleware and request. Subclasses implement `call(request)` and
+    `acall(request)`, awaiting `get_response` in the latter.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.acall(request)
+        return self.call(request)
+
+    def call(self, request):
+        raise NotImplementedError
+
+    async def acall(self, request):
+        raise NotImplementedError
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress responses with brotli or gzip above a size threshold."""
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+        content_type = response.get("Content-Type", "").partition(";")[0]
+        if content_type.strip().lower() not in _COMPRESS_CONTENT_TYPES:
+            return response
+        if settings.CSRF_COOKIE_NAME in response.cookies:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding", ))
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        encoding = choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING",
+                                                    ""))
+        if encoding is None:
+            return response
+
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        response["Content-Encoding"] = encoding
+        # The body is no longer byte-identical to what a strong ETag
+        # describes.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        return response
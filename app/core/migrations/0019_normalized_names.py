@@ -0,0 +1,71 @@
+# Generated by Django 3.2.25 on 2026-10-19 09:26
+
+from django.db import migrations, models
+
+
+def _singular(word):
+    # Frozen copy of core.models._singular as of this migration.
+    if len(word) <= 3 or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "sses", "xes", "zes")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def normalize_name(name):
+    return " ".join(_singular(word) for word in name.casefold().split())
+
+
+def fill_normalized_names(apps, schema_editor):
+    """Compute normalized names for existing tags and ingredients."""
+    for model_name in ("Tag", "Ingredient"):
+        model = apps.get_model("core", model_name)
+        batch = []
+        for obj in model.objects.only("id", "name").iterator(chunk_size=2000):
+            obj.normalized_name = normalize_name(obj.name)
+            batch.append(obj)
+            if len(batch) == 2000:
+                model.objects.bulk_update(batch, ["normalized_name"])
+                batch = []
+        model.objects.bulk_update(batch, ["normalized_name"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0018_admin_search_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ingredient",
+            name="normalized_name",
+            field=models.CharField(default="", editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="tag",
+            name="normalized_name",
+            field=models.CharField(default="", editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_normalized_names, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="ingredient",
+            index=models.Index(
+                fields=["user", "normalized_name"],
+                name="core_ingred_user_id_5bb389_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tag",
+            index=models.Index(
+                fields=["user", "normalized_name"],
+                name="core_tag_user_id_e86b15_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,115 @@
+# Generated by Django 3.2.25 on 2026-10-19 09:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0019_normalized_names"),
+    ]
+
+    operations = [
+        # Adopt the implicit many-to-many table as RecipeIngredient
+        # without touching the database, then add the new columns.
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.CreateModel(
+                name="RecipeIngredient",
+                fields=[
+                    ("id", models.BigAutoField(primary_key=True,
+                                               serialize=False)),
+                    (
+                        "ingredient",
+                        models.ForeignKey(
+                            on_delete=django.db.models.deletion.CASCADE,
+                            to="core.ingredient",
+                        ),
+                    ),
+                    (
+                        "recipe",
+                        models.ForeignKey(
+                            on_delete=django.db.models.deletion.CASCADE,
+                            to="core.recipe",
+                        ),
+                    ),
+                ],
+                options={
+                    "db_table": "core_recipe_ingredients",
+                    "unique_together": {("recipe", "ingredient")},
+                },
+            ),
+            migrations.AlterField(
+                model_name="recipe",
+                name="ingredients",
+                field=models.ManyToManyField(through="core.RecipeIngredient",
+                                             to="core.Ingredient"),
+            ),
+        ]),
+        migrations.AddField(
+            model_name="recipeingredient",
+            name="quantity",
+            field=models.DecimalField(blank=True,
+                                      decimal_places=2,
+                                      max_digits=8,
+                                      null=True),
+        ),
+        migrations.AddField(
+            model_name="recipeingredient",
+            name="unit",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("", "piece"),
+                    ("g", "gram"),
+                    ("kg", "kilogram"),
+                    ("mg", "milligram"),
+                    ("oz", "ounce"),
+                    ("lb", "pound"),
+                    ("ml", "millilitre"),
+                    ("l", "litre"),
+                    ("tsp", "teaspoon"),
+                    ("tbsp", "tablespoon"),
+                    ("cup", "cup"),
+                ],
+                default="",
+                max_length=8,
+            ),
+        ),
+        migrations.CreateModel(
+            name="NutritionProfile",
+            fields=[
+                (
+                    "ingredient",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="nutrition",
+                        serialize=False,
+                        to="core.ingredient",
+                    ),
+                ),
+                ("calories", models.FloatField(default=0)),
+                ("protein", models.FloatField(default=0)),
+                ("fat", models.FloatField(default=0)),
+                ("carbohydrates", models.FloatField(default=0)),
+                (
+                    "price",
+                    models.DecimalField(decimal_places=2,
+                                        default=0,
+                                        max_digits=8),
+                ),
+                (
+                    "density",
+                    models.FloatField(default=1,
+                                      help_text="Grams per millilitre."),
+                ),
+                (
+                    "piece_weight",
+                    models.FloatField(blank=True,
+                                      help_text="Grams per piece.",
+                                      null=True),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 3.2.25 on 2026-10-19 09:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0020_recipe_ingredient_nutrition"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="KitchenStats",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="kitchen_stats",
+                        serialize=False,
+                        to="core.user",
+                    ),
+                ),
+                ("recipe_count", models.IntegerField(default=0)),
+                (
+                    "price_total",
+                    models.DecimalField(
+                        decimal_places=2, default=0, max_digits=14
+                    ),
+                ),
+                ("time_total", models.BigIntegerField(default=0)),
+                ("tags", models.JSONField(default=dict)),
+                ("ingredients", models.JSONField(default=dict)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name_plural": "kitchen stats",
+            },
+        ),
+    ]
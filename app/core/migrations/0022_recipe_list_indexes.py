@@ -0,0 +1,40 @@
+# Generated by Django 3.2.25 on 2026-10-19 09:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0021_kitchen_stats"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["user", "id"], name="core_recipe_user_id_bf8313_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["user", "price", "id"],
+                name="core_recipe_user_id_4dae59_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["user", "time_minutes", "id"],
+                name="core_recipe_user_id_93b1a9_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["user", "title", "id"],
+                name="core_recipe_user_id_6248a0_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,74 @@
+from itertools import groupby
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def fill_recipe_bits(apps, schema_editor):
+    Recipe = apps.get_model("core", "Recipe")
+    RecipeIngredient = apps.get_model("core", "RecipeIngredient")
+    links = (
+        RecipeIngredient.objects.using(schema_editor.connection.alias)
+        .order_by("recipe_id")
+        .values_list("recipe_id", "ingredient__bit_index")
+        .iterator()
+    )
+    batch = []
+    for recipe_id, rows in groupby(links, key=lambda row: row[0]):
+        bits = 0
+        for _, bit_index in rows:
+            bits |= 1 << bit_index
+        data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+        batch.append(Recipe(id=recipe_id, ingredient_bits=data))
+        if len(batch) == BATCH_SIZE:
+            Recipe.objects.bulk_update(batch, ["ingredient_bits"])
+            batch = []
+    Recipe.objects.bulk_update(batch, ["ingredient_bits"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0022_recipe_list_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ingredient",
+            name="bit_index",
+            field=models.IntegerField(editable=False, null=True),
+        ),
+        # Number each user's ingredients from 0 in ID order.
+        migrations.RunSQL(
+            """
+            UPDATE core_ingredient SET bit_index = numbered.n
+            FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY user_id ORDER BY id
+                ) - 1 AS n
+                FROM core_ingredient
+            ) AS numbered
+            WHERE numbered.id = core_ingredient.id
+            """,
+            migrations.RunSQL.noop,
+        ),
+        migrations.AlterField(
+            model_name="ingredient",
+            name="bit_index",
+            field=models.IntegerField(editable=False),
+        ),
+        migrations.AddConstraint(
+            model_name="ingredient",
+            constraint=models.UniqueConstraint(
+                fields=("user", "bit_index"),
+                name="core_ingredient_user_bit_index",
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="ingredient_bits",
+            field=models.BinaryField(default=b"", editable=False),
+        ),
+        migrations.RunPython(fill_recipe_bits, migrations.RunPython.noop),
+    ]
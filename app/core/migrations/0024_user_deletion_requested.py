@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-19 10:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0023_ingredient_bitsets"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="deletion_requested_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,69 @@
+from django.db import migrations
+
+BATCH_SIZE = 2000
+
+# "cookies" and "pies" used to become "cooky" and "py".
+IE_NOUNS = frozenset(
+    {
+        "brownie",
+        "calorie",
+        "cookie",
+        "hoagie",
+        "smoothie",
+        "veggie",
+        "wheatie",
+        "zombie",
+    }
+)
+
+
+def _singular(word):
+    # Frozen copy of core.models._singular as of this migration.
+    if len(word) <= 3 or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies"):
+        if len(word) == 4 or word[:-1] in IE_NOUNS:
+            return word[:-1]
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "sses", "xes", "zes")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def normalize_name(name):
+    return " ".join(_singular(word) for word in name.casefold().split())
+
+
+def renormalize_names(apps, schema_editor):
+    """Recompute normalized names of names ending in -ies."""
+    for model_name in ("Tag", "Ingredient"):
+        model = apps.get_model("core", model_name)
+        rows = (
+            model.objects.using(schema_editor.connection.alias)
+            .filter(name__icontains="ies")
+            .only("id", "name", "normalized_name")
+            .iterator(chunk_size=BATCH_SIZE)
+        )
+        batch = []
+        for obj in rows:
+            normalized = normalize_name(obj.name)
+            if normalized != obj.normalized_name:
+                obj.normalized_name = normalized
+                batch.append(obj)
+            if len(batch) == BATCH_SIZE:
+                model.objects.bulk_update(batch, ["normalized_name"])
+                batch = []
+        model.objects.bulk_update(batch, ["normalized_name"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0024_user_deletion_requested"),
+    ]
+
+    operations = [
+        migrations.RunPython(renormalize_names, migrations.RunPython.noop),
+    ]
@@ -3,7 +3,7 @@
 import uuid
 import os
 
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.contrib.auth.models import (
     AbstractBaseUser,
@@ -25,6 +25,38 @@ def recipe_image_file_path(instance, filename):
     return os.path.join("uploads", "recipe", filename)
 
 
+# Nouns ending in -ie, whose plural -ies must not become -y.
+_IE_NOUNS = frozenset({
+    "brownie", "calorie", "cookie", "hoagie", "smoothie", "veggie",
+    "wheatie", "zombie",
+})
+
+
+def _singular(word):
+    """Strip a simple English plural ending from a word."""
+    if len(word) <= 3 or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies"):
+        # "pies" and "ties" keep their -ie, "berries" becomes "berry".
+        if len(word) == 4 or word[:-1] in _IE_NOUNS:
+            return word[:-1]
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "sses", "xes", "zes")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def normalize_name(name):
+    """Return the key under which tag/ingredient names are deduplicated.
+
+    Case is folded, whitespace collapsed and plural words made singular,
+    so "Tomato", "tomatoes" and " tomato " share a key.
+    """
+    return " ".join(_singular(word) for word in name.casefold().split())
+
+
 class UserManager(BaseUserManager):
     """Manager for users."""
 
@@ -58,6 +90,11 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True, null=True, blank=True)
     is_staff = models.BooleanField(default=False, null=True, blank=True)
+    # Set when the user asked for their account to be deleted; the
+    # `delete_user --pending` job does the actual deletion.
+    deletion_requested_at = models.DateTimeField(null=True,
+                                                 blank=True,
+                                                 editable=False)
 
     objects = UserManager()
 
@@ -79,33 +116,269 @@ class Recipe(models.Model):
     price = models.DecimalField(max_digits=5, decimal_places=2)
     link = models.CharField(max_length=255, blank=True)
     tags = models.ManyToManyField("Tag")
-    ingredients = models.ManyToManyField("Ingredient")
+    ingredients = models.ManyToManyField("Ingredient",
+                                         through="RecipeIngredient")
     description = models.TextField(blank=True, null=True)
+    # Bit `Ingredient.bit_index` is set for every ingredient linked, see
+    # `core.bitsets`.
+    ingredient_bits = models.BinaryField(default=b"", editable=False)
     image = models.ImageField(null=True,
                               upload_to=recipe_image_file_path,
                               blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "updated_at"]),
+            # Sorted, filtered and keyset paginated recipe lists.
+            models.Index(fields=["user", "id"]),
+            models.Index(fields=["user", "price", "id"]),
+            models.Index(fields=["user", "time_minutes", "id"]),
+            models.Index(fields=["user", "title", "id"]),
+            # Prefix searches from the admin (PostgreSQL only).
+            models.Index(fields=["title"],
+                         name="core_recipe_title_like",
+                         opclasses=["varchar_pattern_ops"]),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            # The bits are only written by `core.bitsets`, so saving a
+            # stale copy of a recipe can't undo link changes.
+            deferred = self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in deferred
+                and field.name != "ingredient_bits"
+            ]
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Saved values, so kitchen stats can apply just the difference.
+        instance._stats_loaded = tuple(
+            instance.__dict__.get(name)
+            for name in ("user_id", "price", "time_minutes"))
+        return instance
+
+
+class NormalizedNameModel(models.Model):
+    """Model keeping `normalized_name` in step with `name`."""
+
+    normalized_name = models.CharField(max_length=255, editable=False)
+
+    class Meta:
+        abstract = True
 
-class Tag(models.Model):
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_name(self.name)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "name" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "normalized_name"}
+        super().save(*args, **kwargs)
+
+
+class Tag(NormalizedNameModel):
     """Tag for filtering recipes."""
 
     name = models.CharField(max_length=255, unique=True)
     user = models.ForeignKey(settings.AUTH_USER_MODEL,
                              on_delete=models.CASCADE)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "updated_at"]),
+            models.Index(fields=["user", "normalized_name"]),
+            models.Index(fields=["name"],
+                         name="core_tag_name_like",
+                         opclasses=["varchar_pattern_ops"]),
+        ]
 
     def __str__(self):
         return self.name
 
 
-class Ingredient(models.Model):
+class Ingredient(NormalizedNameModel):
     """Ingredient for recipes."""
 
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL,
                              on_delete=models.CASCADE)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Position in the owner's recipe ingredient bitsets.
+    bit_index = models.IntegerField(editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "bit_index"],
+                                    name="core_ingredient_user_bit_index"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "updated_at"]),
+            models.Index(fields=["user", "normalized_name"]),
+            models.Index(fields=["name"],
+                         name="core_ingredient_name_like",
+                         opclasses=["varchar_pattern_ops"]),
+        ]
 
     def __str__(self):
         return self.name
+
+    @classmethod
+    def allocate_bits(cls, user_id, count):
+        """Return `count` unused bit indexes for the user's ingredients.
+
+        Call in a transaction: the owner's row stays locked until it
+        ends, so concurrent callers get different bits.
+        """
+        list(
+            User.objects.select_for_update().filter(pk=user_id).values_list(
+                "pk"))
+        last = cls.objects.filter(user_id=user_id).aggregate(
+            last=models.Max("bit_index"))["last"]
+        start = 0 if last is None else last + 1
+        return range(start, start + count)
+
+    def save(self, *args, **kwargs):
+        if self.bit_index is None:
+            with transaction.atomic():
+                self.bit_index = self.allocate_bits(self.user_id, 1)[0]
+                super().save(*args, **kwargs)
+        else:
+            super().save(*args, **kwargs)
+
+
+class RecipeIngredient(models.Model):
+    """Ingredient used in a recipe, with the amount used."""
+
+    class Unit(models.TextChoices):
+        PIECE = "", "piece"
+        GRAM = "g", "gram"
+        KILOGRAM = "kg", "kilogram"
+        MILLIGRAM = "mg", "milligram"
+        OUNCE = "oz", "ounce"
+        POUND = "lb", "pound"
+        MILLILITRE = "ml", "millilitre"
+        LITRE = "l", "litre"
+        TEASPOON = "tsp", "teaspoon"
+        TABLESPOON = "tbsp", "tablespoon"
+        CUP = "cup", "cup"
+
+    # The table was created for the implicit many-to-many relation, with
+    # the app's default BigAutoField key.
+    id = models.BigAutoField(primary_key=True)
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE)
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE)
+    quantity = models.DecimalField(max_digits=8,
+                                   decimal_places=2,
+                                   null=True,
+                                   blank=True)
+    unit = models.CharField(max_length=8,
+                            choices=Unit.choices,
+                            blank=True,
+                            default=Unit.PIECE)
+
+    class Meta:
+        db_table = "core_recipe_ingredients"
+        unique_together = [("recipe", "ingredient")]
+
+    def __str__(self):
+        return f"{self.quantity or ''} {self.unit} {self.ingredient_id}"
+
+
+class NutritionProfile(models.Model):
+    """Nutrition facts and price of an ingredient, per 100 g."""
+
+    ingredient = models.OneToOneField(Ingredient,
+                                      on_delete=models.CASCADE,
+                                      primary_key=True,
+                                      related_name="nutrition")
+    calories = models.FloatField(default=0)
+    protein = models.FloatField(default=0)
+    fat = models.FloatField(default=0)
+    carbohydrates = models.FloatField(default=0)
+    price = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    # Converts volumes and pieces to grams.
+    density = models.FloatField(default=1, help_text="Grams per millilitre.")
+    piece_weight = models.FloatField(null=True,
+                                     blank=True,
+                                     help_text="Grams per piece.")
+
+    def __str__(self):
+        return f"Nutrition of {self.ingredient_id}"
+
+
+class KitchenStats(models.Model):
+    """Summary of a user's recipes, maintained by `core.kitchen`."""
+
+    user = models.OneToOneField(settings.AUTH_USER_MODEL,
+                                on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name="kitchen_stats")
+    recipe_count = models.IntegerField(default=0)
+    price_total = models.DecimalField(max_digits=14,
+                                      decimal_places=2,
+                                      default=0)
+    time_total = models.BigIntegerField(default=0)
+    # {"<id>": [name, number of recipes]} of every tag/ingredient used.
+    tags = models.JSONField(default=dict)
+    ingredients = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "kitchen stats"
+
+    def __str__(self):
+        return f"Kitchen stats of {self.user_id}"
+
+
+class Tombstone(models.Model):
+    """Record of a deleted recipe, tag or ingredient for syncing clients."""
+
+    # No database constraint: tombstones are written while a user's rows
+    # are being cascade-deleted and are cleaned up separately.
+    user = models.ForeignKey(settings.AUTH_USER_MODEL,
+                             on_delete=models.DO_NOTHING,
+                             db_constraint=False,
+                             related_name="+")
+    model = models.CharField(max_length=32)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "id"]),
+            models.Index(fields=["user", "deleted_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id}"
+
+
+class OutboxEvent(models.Model):
+    """Change to a recipe, tag or ingredient waiting to be relayed."""
+
+    aggregate = models.CharField(max_length=32)
+    aggregate_id = models.BigIntegerField()
+    event_type = models.CharField(max_length=32)
+    user_id = models.BigIntegerField()
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Keeps tailing cheap however many delivered rows are kept.
+            models.Index(fields=["id"],
+                         condition=models.Q(delivered_at__isnull=True),
+                         name="core_outbox_pending_idx"),
+            models.Index(fields=["delivered_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.aggregate} {self.aggregate_id} {self.event_type}"
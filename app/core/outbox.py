@@ -0,0 +1,125 @@
+"""
+Transactional outbox for recipe, tag and ingredient changes.
+
+Views call `record()` inside the transaction that makes the change, so an
+event exists if and only if the change was committed. `relay()` hands
+pending events to a sink in ID order and marks them delivered. Rows are
+claimed with `SELECT ... FOR UPDATE SKIP LOCKED` so several relays can run
+side by side. Delivery is at-least-once: consumers should dedupe on the
+event ID.
+"""
+
+import json
+import sys
+import urllib.request
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import OutboxEvent
+
+CREATED = "created"
+UPDATED = "updated"
+DELETED = "deleted"
+
+
+def record(instance, event_type, payload=None):
+    """Add an outbox event for a change to `instance`."""
+    return OutboxEvent.objects.create(
+        aggregate=instance._meta.model_name,
+        aggregate_id=instance.pk,
+        event_type=event_type,
+        user_id=instance.user_id,
+        payload=payload if payload is not None else {"id": instance.pk},
+    )
+
+
+def event_to_dict(event):
+    """Return the JSON representation sent to sinks."""
+    return {
+        "id": event.id,
+        "aggregate": event.aggregate,
+        "aggregate_id": event.aggregate_id,
+        "event_type": event.event_type,
+        "user_id": event.user_id,
+        "payload": event.payload,
+        "created_at": event.created_at.isoformat(),
+    }
+
+
+class StdoutSink:
+    """Write events to a stream as JSON lines."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send(self, events):
+        for event in events:
+            self.stream.write(json.dumps(event, default=str) + "\n")
+        self.stream.flush()
+
+
+class FileSink(StdoutSink):
+    """Append events to a file as JSON lines."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, events):
+        with open(self.path, "a", encoding="utf-8") as stream:
+            StdoutSink(stream).send(events)
+
+
+class HttpSink:
+    """POST each batch of events to a URL as a JSON array."""
+
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, events):
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(events, default=str).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        # Non-2xx responses raise HTTPError, leaving the batch pending.
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+def get_sink(spec):
+    """Return a sink for "stdout", "file:<path>" or an http(s) URL."""
+    if spec == "stdout":
+        return StdoutSink()
+    if spec.startswith("file:"):
+        return FileSink(spec[len("file:"):])
+    if spec.startswith(("http://", "https://")):
+        return HttpSink(spec)
+    raise ValueError(f"Unknown outbox sink: {spec}")
+
+
+def relay(sink, batch_size=100):
+    """Deliver one batch of pending events and return how many were sent.
+
+    If the sink raises, the transaction rolls back and the batch stays
+    pending for the next attempt.
+    """
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True).filter(
+                delivered_at__isnull=True).order_by("id")[:batch_size])
+        if not events:
+            return 0
+        sink.send([event_to_dict(event) for event in events])
+        OutboxEvent.objects.filter(id__in=[e.id for e in events]).update(
+            delivered_at=timezone.now())
+    return len(events)
+
+
+def purge_delivered(older_than):
+    """Delete events delivered before `older_than`."""
+    deleted, _ = OutboxEvent.objects.filter(
+        delivered_at__lt=older_than).delete()
+    return deleted
@@ -0,0 +1,191 @@
+"""
+Per-request profiling of SQL, serialization, rendering and CPU time.
+
+Profiling is off by default and costs a context variable lookup when
+off. A request is profiled when it is sampled (PROFILING_SAMPLE_RATE)
+or sends an `X-Profile` header matching PROFILING_TOKEN (any value when
+DEBUG is on). Profiled responses carry a `Server-Timing` header and are
+logged to the `core.profiling` logger. With PROFILING_DUMP_DIR set, a
+cProfile dump of each profiled request is written there too.
+
+Requests served async share the event loop thread with others, so for
+them CPU time is not measured and no cProfile dump is written.
+"""
+
+import cProfile
+import hmac
+import logging
+import os
+import random
+import re
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+from core import query_hooks
+from core.middleware import HybridMiddleware
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar("profile", default=None)
+
+# Order of the Server-Timing entries.
+TIMINGS = ("sql", "serialize", "render", "cpu", "total")
+
+
+class Profile:
+    """Timings collected for one request, in seconds."""
+
+    def __init__(self):
+        self.timings = defaultdict(float)
+        self.sql_count = 0
+        self._active = set()
+
+    def as_dict(self):
+        """Return the timings in milliseconds and the query count."""
+        data = {
+            f"{name}_ms": round(self.timings[name] * 1000, 2)
+            for name in TIMINGS
+        }
+        data["sql_count"] = self.sql_count
+        return data
+
+    def server_timing(self):
+        """Return the value of a `Server-Timing` header."""
+        entries = []
+        for name in TIMINGS:
+            entry = f"{name};dur={self.timings[name] * 1000:.2f}"
+            if name == "sql":
+                entry += f';desc="{self.sql_count} queries"'
+            entries.append(entry)
+        return ", ".join(entries)
+
+
+def current():
+    """Return the profile of the current request, or None."""
+    return _current.get()
+
+
+@contextmanager
+def section(name):
+    """Add the time spent in the block to the current profile.
+
+    Nested sections with the same name are only counted once.
+    """
+    profile = _current.get()
+    if profile is None or name in profile._active:
+        yield
+        return
+    profile._active.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.timings[name] += time.perf_counter() - start
+        profile._active.discard(name)
+
+
+class ProfiledSerializerMixin:
+    """Count serializer `to_representation` time as "serialize"."""
+
+    def to_representation(self, instance):
+        if _current.get() is None:
+            return super().to_representation(instance)
+        with section("serialize"):
+            return super().to_representation(instance)
+
+
+def _record_sql(execute, sql, params, many, context):
+    profile = _current.get()
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if profile is not None:
+            profile.sql_count += 1
+            profile.timings["sql"] += time.perf_counter() - start
+
+
+def should_profile(request):
+    """Return whether to profile `request`."""
+    header = request.META.get("HTTP_X_PROFILE")
+    if header:
+        token = getattr(settings, "PROFILING_TOKEN", "")
+        if token:
+            if hmac.compare_digest(header.encode(), token.encode()):
+                return True
+        elif settings.DEBUG:
+            return True
+    rate = getattr(settings, "PROFILING_SAMPLE_RATE", 0.0)
+    return rate > 0 and random.random() < rate
+
+
+def dump_path(directory, request):
+    """Return a file path for the cProfile dump of `request`."""
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", request.path).strip("-")[:80]
+    name = f"{time.time_ns()}-{request.method}-{slug or 'root'}.prof"
+    return os.path.join(directory, name)
+
+
+@contextmanager
+def _profiled():
+    """Collect a `Profile` of the block, timing SQL and the total."""
+    profile = Profile()
+    token = _current.set(profile)
+    start = time.perf_counter()
+    try:
+        with query_hooks.hook(_record_sql):
+            yield profile
+    finally:
+        _current.reset(token)
+        profile.timings["total"] = time.perf_counter() - start
+
+
+def _report(request, response, profile):
+    response["Server-Timing"] = profile.server_timing()
+    data = profile.as_dict()
+    logger.info("%s %s %s %s",
+                request.method,
+                request.path,
+                response.status_code,
+                " ".join(f"{key}={value}" for key, value in data.items()),
+                extra={"profile": data})
+
+
+class ProfilingMiddleware(HybridMiddleware):
+    """Profile sampled requests; see the module docstring."""
+
+    def call(self, request):
+        if not should_profile(request):
+            return self.get_response(request)
+
+        dump_dir = getattr(settings, "PROFILING_DUMP_DIR", None)
+        profiler = cProfile.Profile() if dump_dir else None
+        with _profiled() as profile:
+            cpu_start = time.thread_time()
+            if profiler:
+                profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                if profiler:
+                    profiler.disable()
+            profile.timings["cpu"] = time.thread_time() - cpu_start
+
+        _report(request, response, profile)
+        if profiler:
+            os.makedirs(dump_dir, exist_ok=True)
+            profiler.dump_stats(dump_path(dump_dir, request))
+        return response
+
+    async def acall(self, request):
+        if not should_profile(request):
+            return await self.get_response(request)
+
+        with _profiled() as profile:
+            response = await self.get_response(request)
+        _report(request, response, profile)
+        return response
@@ -0,0 +1,52 @@
+"""
+Per-request wrappers around database queries, for sync and async views.
+
+`connection.execute_wrapper()` only wraps the calling thread's
+connection, but under ASGI the queries of async views run in a
+`sync_to_async` thread. Instead every connection gets one wrapper when it
+is opened, which runs the wrappers of the current context.
+`sync_to_async` carries the context into its thread, so `hook()` entered
+by a middleware on the event loop still sees the request's queries.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from django.db import connections
+
+_hooks = ContextVar("query_hooks", default=())
+
+
+def _run_hooks(execute, sql, params, many, context):
+    for wrapper in reversed(_hooks.get()):
+        execute = partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+def install(connection):
+    """Add the hook runner to `connection` if it is missing."""
+    if _run_hooks not in connection.execute_wrappers:
+        # First, so `execute_wrapper()` blocks still pop their own.
+        connection.execute_wrappers.insert(0, _run_hooks)
+
+
+def connection_created(sender, connection, **kwargs):
+    """Install the runner on new connections; connected in `CoreConfig`."""
+    install(connection)
+
+
+@contextmanager
+def hook(wrapper):
+    """Run `wrapper(execute, sql, params, many, context)` around queries.
+
+    Applies to the queries of the current context, including those run
+    through `sync_to_async`; the first hook entered is the outermost.
+    """
+    for connection in connections.all():
+        install(connection)
+    token = _hooks.set(_hooks.get() + (wrapper, ))
+    try:
+        yield
+    finally:
+        _hooks.reset(token)
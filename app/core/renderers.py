@@ -0,0 +1,47 @@
+"""Renderers for the API."""
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+from core import profiling
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised by patching in tests
+    orjson = None
+
+# Types orjson can't serialize natively (Decimal, lazy strings, ...) are
+# converted the same way DRF's encoder does, straight to JSON values.
+_default = encoders.JSONEncoder().default
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSON renderer using orjson, falling back to DRF's stdlib renderer.
+
+    Output matches `JSONRenderer` for compact responses; indented output
+    (e.g. `Accept: application/json; indent=4`) is left to DRF.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render `data` into JSON, returning a bytestring."""
+        with profiling.section("render"):
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type, renderer_context):
+        if data is None:
+            return b""
+        if orjson is None or self.get_indent(accepted_media_type,
+                                             renderer_context or {}):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+
+        ret = orjson.dumps(data,
+                           default=_default,
+                           option=orjson.OPT_NON_STR_KEYS
+                           | orjson.OPT_PASSTHROUGH_DATETIME)
+        # Escape the JavaScript line terminators like DRF does.
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8",
+                              b"\\u2028").replace(b"\xe2\x80\xa9",
+                                                  b"\\u2029")
+        return ret
@@ -0,0 +1,79 @@
+"""
+Serve the OpenAPI schema rendered at build time by `render_schema`.
+
+The file is read once per process and kept in memory together with a
+gzip'd copy and an ETag. A missing file is not cached, so workers pick
+the schema up as soon as it is rendered. In DEBUG the schema is always
+generated live, so changes to serializers show up without re-rendering.
+"""
+
+import functools
+import gzip
+import hashlib
+import re
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_safe
+
+from core.startup import lazy_view
+
+SCHEMA_CONTENT_TYPE = "application/vnd.oai.openapi; charset=utf-8"
+
+_accepts_gzip = re.compile(r"\bgzip\b")
+
+_live_schema_view = lazy_view("drf_spectacular.views.SpectacularAPIView")
+
+
+def render_schema():
+    """Generate the schema and return it rendered as YAML bytes."""
+    from drf_spectacular.generators import SchemaGenerator
+    from drf_spectacular.renderers import OpenApiYamlRenderer
+
+    schema = SchemaGenerator().get_schema(request=None, public=True)
+    return OpenApiYamlRenderer().render(schema, renderer_context={})
+
+
+class RenderedSchema:
+    """A rendered schema with its gzip'd variant and ETag."""
+
+    def __init__(self, content):
+        self.content = content
+        self.gzipped = gzip.compress(content, mtime=0)
+        self.etag = f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+
+
+@functools.lru_cache(maxsize=None)
+def load_schema(path):
+    """Return the `RenderedSchema` stored at path.
+
+    Raises FileNotFoundError, which `lru_cache` does not remember.
+    """
+    with open(path, "rb") as f:
+        return RenderedSchema(f.read())
+
+
+@require_safe
+def schema_view(request):
+    """Return the pre-rendered OpenAPI schema, or the live one in DEBUG."""
+    if settings.DEBUG:
+        return _live_schema_view(request)
+    try:
+        schema = load_schema(str(settings.OPENAPI_SCHEMA_PATH))
+    except FileNotFoundError:
+        return JsonResponse(
+            {"detail": "The API schema has not been rendered."}, status=503)
+
+    if schema.etag in request.META.get("HTTP_IF_NONE_MATCH", ""):
+        response = HttpResponseNotModified()
+    elif _accepts_gzip.search(request.META.get("HTTP_ACCEPT_ENCODING", "")):
+        response = HttpResponse(schema.gzipped,
+                                content_type=SCHEMA_CONTENT_TYPE)
+        response["Content-Encoding"] = "gzip"
+    else:
+        response = HttpResponse(schema.content,
+                                content_type=SCHEMA_CONTENT_TYPE)
+    response["ETag"] = schema.etag
+    patch_vary_headers(response, ("Accept-Encoding", ))
+    return response
@@ -0,0 +1,228 @@
+"""
+Synthetic data for load and performance testing.
+
+`seed()` creates users, each with their own tags, ingredients with
+nutrition profiles, and recipes linked to them with amounts, a batch of
+users at a time so memory stays flat however many rows are generated.
+Rows are written with PostgreSQL COPY where available and `bulk_create`
+elsewhere. Output is reproducible for a given seed and prefix.
+"""
+
+import csv
+import io
+import random
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, models, transaction
+
+from core import bitsets, kitchen
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+    NutritionProfile,
+    normalize_name,
+)
+
+ADJECTIVES = [
+    "Smoky", "Spicy", "Creamy", "Crispy", "Roasted", "Grilled", "Fresh",
+    "Sweet", "Tangy", "Hearty", "Zesty", "Garlic", "Herbed", "Lemon",
+    "Honey", "Chilli", "Ginger", "Toasted", "Braised", "Pickled",
+]
+NOUNS = [
+    "Tomato", "Chicken", "Beef", "Tofu", "Salmon", "Rice", "Lentil",
+    "Potato", "Mushroom", "Spinach", "Carrot", "Onion", "Pepper", "Bean",
+    "Noodle", "Cheese", "Egg", "Apple", "Pumpkin", "Chickpea", "Cabbage",
+    "Aubergine", "Courgette", "Pork", "Prawn",
+]
+DISHES = [
+    "Soup", "Stew", "Curry", "Salad", "Pie", "Bake", "Stir Fry", "Risotto",
+    "Tacos", "Bowl", "Pasta", "Burger", "Wrap", "Tart", "Gratin",
+]
+INGREDIENTS = [f"{adjective} {noun}" for adjective in ADJECTIVES
+               for noun in NOUNS]
+TAGS = [
+    "Vegan", "Vegetarian", "Quick", "Dinner", "Lunch", "Breakfast",
+    "Dessert", "Gluten Free", "Spicy", "Comfort", "Budget", "Party",
+]
+
+# Written for NULL so that empty strings stay empty strings.
+NULL = r"\N"
+
+
+def _csv_value(field, value):
+    if isinstance(field, models.BinaryField) and value is not None:
+        # bytea hex input; backslashes are not special in CSV.
+        return "\\x" + bytes(value).hex()
+    value = field.get_db_prep_save(value, connection)
+    return NULL if value is None else value
+
+
+def _copy(model, objs):
+    """Load unsaved objects with COPY ... FROM STDIN."""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if not isinstance(field, models.AutoField)
+    ]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for obj in objs:
+        writer.writerow(
+            _csv_value(field, field.pre_save(obj, True)) for field in fields)
+    buffer.seek(0)
+    quote = connection.ops.quote_name
+    columns = ", ".join(quote(field.column) for field in fields)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {quote(model._meta.db_table)} ({columns}) "
+            f"FROM STDIN WITH (FORMAT csv, NULL '{NULL}')", buffer)
+
+
+def load(model, objs, batch_size=5000):
+    """Insert unsaved objects as fast as the database allows."""
+    if connection.vendor == "postgresql":
+        _copy(model, objs)
+    else:
+        model.objects.bulk_create(objs, batch_size=batch_size)
+
+
+def _ids_by_user(model, user_ids):
+    """Return {user_id: [ids]} for the users' rows of `model`."""
+    ids = {user_id: [] for user_id in user_ids}
+    rows = model.objects.filter(user_id__in=user_ids).order_by("id")
+    for pk, user_id in rows.values_list("id", "user_id").iterator():
+        ids[user_id].append(pk)
+    return ids
+
+
+def _seed_batch(rng, prefix, start, count, password, options):
+    """Create `count` users starting at index `start` with their data."""
+    User = get_user_model()
+    emails = [f"{prefix}-{i}@example.com" for i in range(start, start + count)]
+    load(User, [
+        User(email=email,
+             name=f"Seed User {start + n}",
+             password=password,
+             is_active=True,
+             is_staff=False,
+             is_superuser=False) for n, email in enumerate(emails)
+    ])
+    user_ids = list(
+        User.objects.filter(email__in=emails).order_by("id").values_list(
+            "id", flat=True))
+
+    tags, ingredients, recipes = [], [], []
+    for user_id in user_ids:
+        for j in range(options["tags_per_user"]):
+            # Tag names are unique across all users.
+            name = f"{TAGS[j % len(TAGS)]} {user_id}-{j}"
+            tags.append(
+                Tag(user_id=user_id,
+                    name=name,
+                    normalized_name=normalize_name(name)))
+        names = rng.sample(INGREDIENTS, options["ingredients_per_user"])
+        ingredients.extend(
+            Ingredient(user_id=user_id,
+                       name=name,
+                       normalized_name=normalize_name(name),
+                       bit_index=bit_index)
+            for bit_index, name in enumerate(names))
+        for _ in range(options["recipes_per_user"]):
+            recipes.append(
+                Recipe(user_id=user_id,
+                       title=(f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} "
+                              f"{rng.choice(DISHES)}"),
+                       time_minutes=rng.randint(5, 180),
+                       price=Decimal(rng.randint(100, 9999)) / 100,
+                       description="Generated recipe.",
+                       link=""))
+    load(Tag, tags)
+    load(Ingredient, ingredients)
+    load(Recipe, recipes)
+
+    tag_ids = _ids_by_user(Tag, user_ids)
+    ingredient_ids = _ids_by_user(Ingredient, user_ids)
+    load(NutritionProfile, [
+        NutritionProfile(ingredient_id=pk,
+                         calories=rng.randint(10, 900),
+                         protein=rng.randint(0, 30),
+                         fat=rng.randint(0, 60),
+                         carbohydrates=rng.randint(0, 80),
+                         price=Decimal(rng.randint(5, 400)) / 100)
+        for ids in ingredient_ids.values() for pk in ids
+    ])
+    tag_links, ingredient_links = [], []
+    TagLink, IngredientLink = Recipe.tags.through, Recipe.ingredients.through
+    recipe_rows = Recipe.objects.filter(user_id__in=user_ids).order_by("id")
+    for recipe_id, user_id in recipe_rows.values_list("id",
+                                                      "user_id").iterator():
+        tag_links.extend(
+            TagLink(recipe_id=recipe_id, tag_id=tag_id)
+            for tag_id in rng.sample(
+                tag_ids[user_id],
+                min(options["tags_per_recipe"], len(tag_ids[user_id]))))
+        ingredient_links.extend(
+            IngredientLink(recipe_id=recipe_id,
+                           ingredient_id=ingredient_id,
+                           quantity=rng.randint(1, 50) * 10,
+                           unit=IngredientLink.Unit.GRAM)
+            for ingredient_id in rng.sample(
+                ingredient_ids[user_id],
+                min(options["ingredients_per_recipe"],
+                    len(ingredient_ids[user_id]))))
+    load(TagLink, tag_links)
+    load(IngredientLink, ingredient_links)
+    bitsets.refresh(
+        Recipe.objects.filter(user_id__in=user_ids).values_list("id",
+                                                                flat=True))
+    kitchen.rebuild(user_ids)
+    return {
+        "users": len(user_ids),
+        "tags": len(tags),
+        "ingredients": len(ingredients),
+        "recipes": len(recipes),
+        "links": len(tag_links) + len(ingredient_links),
+    }
+
+
+def seed(users,
+         recipes_per_user=50,
+         tags_per_user=10,
+         ingredients_per_user=30,
+         tags_per_recipe=2,
+         ingredients_per_recipe=5,
+         prefix="seed",
+         password="seedpass123",
+         random_seed=0,
+         users_per_batch=100,
+         progress=None):
+    """Create `users` users with generated data and return row counts.
+
+    Users are named `<prefix>-<n>@example.com` and all share `password`.
+    `progress(counts)` is called with running totals after every batch.
+    """
+    if ingredients_per_user > len(INGREDIENTS):
+        raise ValueError("Too many ingredients per user.")
+    options = {
+        "recipes_per_user": recipes_per_user,
+        "tags_per_user": tags_per_user,
+        "ingredients_per_user": ingredients_per_user,
+        "tags_per_recipe": tags_per_recipe,
+        "ingredients_per_recipe": ingredients_per_recipe,
+    }
+    rng = random.Random(random_seed)
+    # Hashing is deliberately slow, so do it once for every user.
+    password = make_password(password)
+    totals = dict.fromkeys(
+        ["users", "tags", "ingredients", "recipes", "links"], 0)
+    for start in range(0, users, users_per_batch):
+        count = min(users_per_batch, users - start)
+        with transaction.atomic():
+            counts = _seed_batch(rng, prefix, start, count, password, options)
+        for name, value in counts.items():
+            totals[name] += value
+        if progress:
+            progress(totals)
+    return totals
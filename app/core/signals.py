@@ -0,0 +1,205 @@
+"""Signal handlers keeping derived sync state and stats up to date."""
+
+from django.db.models.signals import (
+    pre_save,
+    post_save,
+    pre_delete,
+    post_delete,
+    m2m_changed,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core import bitsets, kitchen
+from core.models import (
+    User,
+    Recipe,
+    Tag,
+    Ingredient,
+    KitchenStats,
+    Tombstone,
+)
+
+# Name used for each model in tombstones and the sync payload.
+SYNC_MODELS = {Recipe: "recipes", Tag: "tags", Ingredient: "ingredients"}
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def record_tombstone(sender, instance, **kwargs):
+    """Remember deleted objects so clients can drop them."""
+    Tombstone.objects.create(user_id=instance.user_id,
+                             model=SYNC_MODELS[sender],
+                             object_id=instance.pk)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def touch_recipes(sender, instance, action, reverse, pk_set, **kwargs):
+    """Bump `updated_at` of recipes whose tags/ingredients changed."""
+    if not reverse:
+        if action not in ("post_add", "post_remove", "post_clear"):
+            return
+        recipe_ids = [instance.pk]
+    elif action in ("post_add", "post_remove"):
+        recipe_ids = list(pk_set)
+    elif action == "pre_clear":
+        # The affected recipes are only known before the rows go.
+        recipe_ids = sender.objects.filter(**{
+            instance._meta.model_name: instance
+        }).values("recipe_id")
+    else:
+        return
+    Recipe.objects.filter(pk__in=recipe_ids).update(
+        updated_at=timezone.now())
+
+
+@receiver(post_save, sender=User)
+def create_kitchen_stats(sender, instance, created, raw=False, **kwargs):
+    """Start new users with empty stats for changes to be added to."""
+    if created and not raw:
+        KitchenStats.objects.create(user=instance)
+
+
+def _price(value):
+    return Recipe._meta.get_field("price").to_python(value or 0)
+
+
+def _recipe_change(recipe, values, sign):
+    """Return the change adding (sign 1) or removing (-1) a recipe.
+
+    `values` are the recipe's (user_id, price, time_minutes).
+    """
+    _, price, time = values
+    links = {
+        field: dict.fromkeys(
+            through.objects.filter(recipe=recipe).values_list(
+                f"{column}_id", flat=True), sign)
+        for field, through, column in kitchen.LINKS.values()
+    }
+    return {
+        "recipes": sign,
+        "price": sign * _price(price),
+        "time": sign * int(time or 0),
+        **links
+    }
+
+
+@receiver(pre_save, sender=Recipe)
+def load_saved_recipe(sender, instance, **kwargs):
+    """Look up the saved values of recipes not loaded from the database."""
+    if instance.pk is not None and not hasattr(instance, "_stats_loaded"):
+        instance._stats_loaded = sender.objects.filter(
+            pk=instance.pk).values_list("user_id", "price",
+                                        "time_minutes").first()
+
+
+@receiver(post_save, sender=Recipe)
+def count_saved_recipe(sender, instance, created, **kwargs):
+    """Add a new recipe, or the change to a saved one, to the stats."""
+    saved = (instance.user_id, instance.__dict__.get("price"),
+             instance.__dict__.get("time_minutes"))
+    loaded = getattr(instance, "_stats_loaded", None)
+    instance._stats_loaded = saved
+    if created or loaded is None:
+        kitchen.record(instance.user_id,
+                       recipes=1,
+                       price=_price(saved[1]),
+                       time=int(saved[2]))
+    elif loaded[0] != saved[0]:
+        kitchen.record(loaded[0], **_recipe_change(instance, loaded, -1))
+        kitchen.record(saved[0], **_recipe_change(instance, saved, 1))
+    else:
+        # Deferred fields are None: neither loaded nor saved.
+        change = {}
+        if None not in (loaded[1], saved[1]):
+            change["price"] = _price(saved[1]) - _price(loaded[1])
+        if None not in (loaded[2], saved[2]):
+            change["time"] = int(saved[2]) - int(loaded[2])
+        if any(change.values()):
+            kitchen.record(instance.user_id, **change)
+
+
+@receiver(pre_delete, sender=Recipe)
+def count_deleted_recipe(sender, instance, **kwargs):
+    """Take a recipe and its tags/ingredients out of the stats."""
+    # Looked up now: the collector deletes links without m2m_changed.
+    values = (instance.user_id, instance.price, instance.time_minutes)
+    kitchen.record(instance.user_id, **_recipe_change(instance, values, -1))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def count_links(sender, instance, action, reverse, pk_set, **kwargs):
+    """Count recipes gaining or losing tags/ingredients in the stats."""
+    field, _, column = next(link for link in kitchen.LINKS.values()
+                            if link[1] is sender)
+    if action in ("post_add", "post_remove"):
+        sign = 1 if action == "post_add" else -1
+        if reverse:
+            changes = {instance.pk: sign * len(pk_set)}
+        else:
+            changes = dict.fromkeys(pk_set, sign)
+    elif action == "pre_clear":
+        links = sender.objects.filter(**{
+            instance._meta.model_name: instance
+        })
+        if reverse:
+            changes = {instance.pk: -links.count()}
+        else:
+            changes = dict.fromkeys(
+                links.values_list(f"{column}_id", flat=True), -1)
+    else:
+        return
+    if changes:
+        kitchen.record(instance.user_id, **{field: changes})
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def rename_in_stats(sender, instance, created, update_fields, **kwargs):
+    """Show a renamed tag/ingredient under its new name in the stats."""
+    if not created and (update_fields is None or "name" in update_fields):
+        kitchen.record_rename(sender, instance.user_id, instance.pk,
+                              instance.name)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def drop_from_stats(sender, instance, **kwargs):
+    """Remove a deleted tag/ingredient from the stats."""
+    kitchen.record_rename(sender, instance.user_id, instance.pk, None)
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def refresh_ingredient_bits(sender, instance, action, reverse, pk_set,
+                            **kwargs):
+    """Keep recipe ingredient bitsets in step with their links."""
+    if action == "pre_clear" and reverse:
+        # The affected recipes are only known before the rows go.
+        instance._bits_recipe_ids = list(
+            sender.objects.filter(ingredient=instance).values_list(
+                "recipe_id", flat=True))
+    elif action in ("post_add", "post_remove", "post_clear"):
+        if not reverse:
+            bits = bitsets.refresh([instance.pk])
+            instance.ingredient_bits = bits[instance.pk]
+        elif action == "post_clear":
+            bitsets.refresh(instance.__dict__.pop("_bits_recipe_ids", []))
+        else:
+            bitsets.refresh(pk_set)
+
+
+@receiver(pre_delete, sender=Ingredient)
+def find_recipes_of_ingredient(sender, instance, **kwargs):
+    """Remember the recipes whose bitsets lose the ingredient."""
+    instance._bits_recipe_ids = list(
+        Recipe.ingredients.through.objects.filter(
+            ingredient=instance).values_list("recipe_id", flat=True))
+
+
+@receiver(post_delete, sender=Ingredient)
+def clear_ingredient_bit(sender, instance, **kwargs):
+    """Clear a deleted ingredient's bit, which may be reused."""
+    bitsets.refresh(instance.__dict__.pop("_bits_recipe_ids", []))
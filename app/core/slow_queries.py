@@ -0,0 +1,226 @@
+"""
+Slow-query log with optional EXPLAIN capture.
+
+`SlowQueryMiddleware` wraps database execution during each request.
+Queries slower than SLOW_QUERY_MS are logged to the `core.slow_queries`
+logger and, when SLOW_QUERY_LOG names a file, appended to it as JSON
+lines for the `slow_query_report` command. Each record names the view,
+the project frames of the call stack and a fingerprint shared by all
+queries differing only in their parameters.
+
+A SLOW_QUERY_EXPLAIN_RATE share of slow SELECTs is explained with
+`EXPLAIN (ANALYZE, BUFFERS)` on PostgreSQL, `EXPLAIN QUERY PLAN` on
+SQLite. ANALYZE runs the query a second time, so keep the rate low.
+"""
+
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from core import query_hooks
+from core.middleware import HybridMiddleware
+
+logger = logging.getLogger(__name__)
+
+_request = ContextVar("slow_query_request", default=None)
+_write_lock = threading.Lock()
+
+_string = re.compile(r"'(?:[^']|'')*'")
+_number = re.compile(r"\b\d+(?:\.\d+)?\b")
+_placeholders = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_whitespace = re.compile(r"\s+")
+
+STACK_DEPTH = 5
+
+
+def normalize(sql):
+    """Replace literals and placeholders in `sql` with "?".
+
+    `IN` lists of any length become "(...)", so batches of different
+    sizes share a fingerprint.
+    """
+    sql = _string.sub("?", sql)
+    sql = sql.replace("%s", "?")
+    sql = _number.sub("?", sql)
+    sql = _placeholders.sub("(...)", sql)
+    return _whitespace.sub(" ", sql).strip()
+
+
+def fingerprint(sql):
+    """Return a short hash identifying the shape of `sql`."""
+    return hashlib.sha1(normalize(sql).encode()).hexdigest()[:16]
+
+
+def stack_summary(depth=STACK_DEPTH):
+    """Return the innermost project frames as "file:line in function"."""
+    root = str(settings.BASE_DIR)
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(root)
+        and "site-packages" not in frame.filename
+        and frame.filename != __file__
+    ]
+    return [
+        f"{frame.filename[len(root) + 1:]}:{frame.lineno} in {frame.name}"
+        for frame in frames[-depth:]
+    ]
+
+
+def explain(connection, sql, params):
+    """Return the plan of `sql` as text, or None if it can't be had."""
+    if connection.vendor == "postgresql":
+        statement = f"EXPLAIN (ANALYZE, BUFFERS) {sql}"
+    elif connection.vendor == "sqlite":
+        statement = f"EXPLAIN QUERY PLAN {sql}"
+    else:
+        return None
+    try:
+        # A savepoint keeps a failed EXPLAIN from breaking the
+        # transaction; the backend cursor skips the execute wrappers.
+        with transaction.atomic(using=connection.alias):
+            cursor = connection.create_cursor()
+            try:
+                cursor.execute(statement, params)
+                rows = cursor.fetchall()
+            finally:
+                cursor.close()
+    except DatabaseError:
+        logger.debug("Could not explain %s", sql, exc_info=True)
+        return None
+    return "\n".join(" ".join(str(value) for value in row) for row in rows)
+
+
+def write(record, path):
+    """Append `record` to the JSON lines file at `path`."""
+    line = json.dumps(record, default=str) + "\n"
+    with _write_lock, open(path, "a") as stream:
+        stream.write(line)
+
+
+def _view(request):
+    match = getattr(request, "resolver_match", None) if request else None
+    return match.view_name if match else None
+
+
+def record(connection, sql, params, duration, many=False):
+    """Log a slow query and append it to SLOW_QUERY_LOG."""
+    request = _request.get()
+    entry = {
+        "time": timezone.now().isoformat(),
+        "duration_ms": round(duration * 1000, 3),
+        "fingerprint": fingerprint(sql),
+        "sql": sql,
+        "many": many,
+        "view": _view(request),
+        "method": request.method if request else None,
+        "stack": stack_summary(),
+        "explain": None,
+    }
+    rate = settings.SLOW_QUERY_EXPLAIN_RATE
+    if (not many and rate and random.random() < rate
+            and sql.lstrip()[:6].upper() == "SELECT"):
+        entry["explain"] = explain(connection, sql, params)
+    logger.warning("Slow query (%.1f ms) in %s: %s",
+                   entry["duration_ms"],
+                   entry["view"] or "-",
+                   sql,
+                   extra={"slow_query": entry})
+    if settings.SLOW_QUERY_LOG:
+        write(entry, settings.SLOW_QUERY_LOG)
+    return entry
+
+
+class SlowQueryWrapper:
+    """`execute_wrapper` recording queries slower than `threshold_ms`."""
+
+    def __init__(self, threshold_ms):
+        self.threshold = threshold_ms / 1000
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration = time.perf_counter() - start
+        if duration >= self.threshold:
+            record(context["connection"], sql, params, duration, many)
+        return result
+
+
+class SlowQueryMiddleware(HybridMiddleware):
+    """Watch the queries of every request; off if SLOW_QUERY_MS is None."""
+
+    def __init__(self, get_response):
+        if settings.SLOW_QUERY_MS is None:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    @contextmanager
+    def watch(self, request):
+        token = _request.set(request)
+        try:
+            with query_hooks.hook(SlowQueryWrapper(settings.SLOW_QUERY_MS)):
+                yield
+        finally:
+            _request.reset(token)
+
+    def call(self, request):
+        with self.watch(request):
+            return self.get_response(request)
+
+    async def acall(self, request):
+        with self.watch(request):
+            return await self.get_response(request)
+
+
+def read(paths):
+    """Yield the records of the JSON lines files at `paths`."""
+    for path in paths:
+        with open(path) as stream:
+            for line in stream:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def aggregate(records):
+    """Group records by fingerprint, slowest total time first."""
+    groups = {}
+    for entry in records:
+        group = groups.setdefault(
+            entry["fingerprint"], {
+                "fingerprint": entry["fingerprint"],
+                "sql": normalize(entry["sql"]),
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "views": set(),
+                "stack": entry["stack"],
+                "explain": None,
+            })
+        group["count"] += 1
+        group["total_ms"] += entry["duration_ms"]
+        if entry["duration_ms"] >= group["max_ms"]:
+            group["max_ms"] = entry["duration_ms"]
+            group["stack"] = entry["stack"]
+        if entry.get("view"):
+            group["views"].add(entry["view"])
+        if entry.get("explain"):
+            group["explain"] = entry["explain"]
+    result = []
+    for group in groups.values():
+        group["total_ms"] = round(group["total_ms"], 3)
+        group["mean_ms"] = round(group["total_ms"] / group["count"], 3)
+        group["views"] = sorted(group["views"])
+        result.append(group)
+    result.sort(key=lambda group: group["total_ms"], reverse=True)
+    return result
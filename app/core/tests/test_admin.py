@@ -1,10 +1,18 @@
 """Tests for the Django admin modifications."""
 
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib import admin
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.test import Client
 
+from core.admin import EstimatedCountPaginator, estimated_count
+from core import bitsets
+from core.models import Recipe, Tag, Ingredient, KitchenStats
+
 
 class AdminSiteTests(TestCase):
     """Tests for Django admin."""
@@ -84,3 +92,150 @@ class AdminSiteTests(TestCase):
             print(f"Response content: {res.content}")
 
         self.assertEqual(res.status_code, 200)
+
+    def test_delete_user_page(self):
+        """Test deleting a user from the admin queues the deletion."""
+        url = reverse("admin:core_user_delete", args=[self.user.id])
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+
+        res = self.client.post(url, {"post": "yes"}, follow=True)
+
+        self.assertContains(res, "was queued")
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertIsNotNone(self.user.deletion_requested_at)
+
+    def test_queue_deletion_action(self):
+        """Test the user changelist queues selected users for deletion."""
+        url = reverse("admin:core_user_changelist")
+        data = {
+            "action": "request_deletions",
+            "_selected_action": self.user.id,
+        }
+
+        res = self.client.post(url, data)
+        self.assertContains(res, "Users: 1")
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.deletion_requested_at)
+
+        res = self.client.post(url, {**data, "apply": "yes"}, follow=True)
+        self.assertContains(res, "Queue selected users for deletion: 1 users")
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.deletion_requested_at)
+        self.assertNotContains(self.client.get(url),
+                               'value="delete_selected"')
+
+
+class LargeTableAdminTests(TestCase):
+    """Tests for the recipe, tag and ingredient admin pages."""
+
+    def setUp(self):
+        User = get_user_model()
+        self.admin = User.objects.create_superuser(email="admin@example.com",
+                                                   password="Ana",
+                                                   name="Test Admin")
+        self.client = Client()
+        self.client.force_login(self.admin)
+        for i in range(5):
+            user = User.objects.create_user(email=f"user{i}@example.com",
+                                            password="Ana")
+            recipe = Recipe.objects.create(user=user,
+                                           title=f"Soup {i}",
+                                           time_minutes=5,
+                                           price=Decimal("1.00"))
+            recipe.tags.add(Tag.objects.create(user=user, name=f"Tag {i}"))
+            Ingredient.objects.create(user=user, name=f"Salt {i}")
+
+    def test_changelists_do_not_query_per_row(self):
+        """Test the user is joined rather than fetched per row."""
+        for name in ("recipe", "tag", "ingredient"):
+            url = reverse(f"admin:core_{name}_changelist")
+            # Session, admin user, paginated count, page rows.
+            with self.assertNumQueries(4):
+                res = self.client.get(url)
+            self.assertEqual(res.status_code, 200)
+
+    def test_recipe_search(self):
+        """Test searching by title prefix and exact owner email."""
+        url = reverse("admin:core_recipe_changelist")
+
+        res = self.client.get(url, {"q": "Soup 3"})
+        self.assertContains(res, "Soup 3")
+        self.assertNotContains(res, "Soup 2")
+
+        res = self.client.get(url, {"q": "user1@example.com"})
+        self.assertContains(res, "Soup 1")
+        self.assertNotContains(res, "Soup 2")
+
+    def test_search_uses_one_kind_of_field(self):
+        """Test emails and prefixes are not ORed across the join."""
+        recipe_admin = admin.site._registry[Recipe]
+        queryset = Recipe.objects.all()
+
+        by_title, _ = recipe_admin.get_search_results(None, queryset, "So")
+        by_email, _ = recipe_admin.get_search_results(
+            None, queryset, "user1@example.com")
+
+        self.assertNotIn("email", str(by_title.query))
+        self.assertNotIn("title", str(by_email.query).split("WHERE")[1])
+        self.assertEqual(by_email.get().title, "Soup 1")
+        self.assertEqual(
+            list(admin.site._registry[get_user_model()].get_search_results(
+                None, get_user_model().objects.all(), "user1")[0]), [])
+
+    def test_change_page(self):
+        """Test the recipe change page renders with autocomplete widgets."""
+        recipe = Recipe.objects.first()
+        url = reverse("admin:core_recipe_change", args=[recipe.id])
+
+        res = self.client.get(url)
+
+        self.assertContains(res, "admin-autocomplete")
+        self.assertContains(res, 'name="tags"')
+        self.assertContains(res, 'name="recipeingredient_set-0-ingredient"')
+
+    def test_edit_ingredients_inline(self):
+        """Test the ingredient inline updates bitsets and stats."""
+        recipe = Recipe.objects.get(title="Soup 1")
+        salt = Ingredient.objects.get(name="Salt 1")
+        url = reverse("admin:core_recipe_change", args=[recipe.id])
+        prefix = "recipeingredient_set"
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(url, {
+                "title": recipe.title,
+                "user": recipe.user_id,
+                "time_minutes": recipe.time_minutes,
+                "price": recipe.price,
+                "tags": list(recipe.tags.values_list("id", flat=True)),
+                f"{prefix}-TOTAL_FORMS": 1,
+                f"{prefix}-INITIAL_FORMS": 0,
+                f"{prefix}-0-ingredient": salt.id,
+                f"{prefix}-0-quantity": "2.50",
+                f"{prefix}-0-unit": "g",
+            })
+
+        self.assertEqual(res.status_code, 302)
+        link = recipe.recipeingredient_set.get()
+        self.assertEqual((link.ingredient, link.quantity, link.unit),
+                         (salt, Decimal("2.50"), "g"))
+        recipe.refresh_from_db()
+        self.assertEqual(bitsets.decode(recipe.ingredient_bits),
+                         bitsets.to_int([salt.bit_index]))
+        stats = KitchenStats.objects.get(user=recipe.user)
+        self.assertEqual(stats.ingredients, {str(salt.id): ["Salt 1", 1]})
+
+    def test_estimated_count_paginator(self):
+        """Test large unfiltered tables use the row estimate."""
+        queryset = Recipe.objects.order_by("id")
+
+        with mock.patch("core.admin.estimated_count", return_value=10**7):
+            self.assertEqual(EstimatedCountPaginator(queryset, 100).count,
+                             10**7)
+        with mock.patch("core.admin.estimated_count", return_value=50):
+            self.assertEqual(EstimatedCountPaginator(queryset, 100).count, 5)
+
+    def test_estimated_count_unsupported(self):
+        """Test no estimate is made off PostgreSQL or when filtered."""
+        self.assertIsNone(estimated_count(Recipe.objects.all()))
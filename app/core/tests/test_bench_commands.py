@@ -0,0 +1,60 @@
+"""Smoke tests keeping the benchmark commands runnable."""
+
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.models import Recipe, Ingredient
+
+
+class BenchCommandTests(TestCase):
+    """Run each benchmark command on a tiny dataset.
+
+    `bench_servers` starts real servers and is left out.
+    """
+
+    def run_command(self, name, *args):
+        out = io.StringIO()
+        call_command(name, *args, stdout=out, stderr=io.StringIO())
+        return out.getvalue()
+
+    def test_bench_serializers(self):
+        out = self.run_command("bench_serializers", "--recipes", "20",
+                               "--repeat", "1")
+
+        self.assertIn("Outputs are byte-identical.", out)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bench_render(self):
+        out = self.run_command("bench_render", "--recipes", "10",
+                               "--iterations", "1")
+
+        self.assertIn("FastJSONRenderer", out)
+
+    def test_bench_logging(self):
+        out = self.run_command("bench_logging", "--requests", "5",
+                               "--stall-us", "0")
+
+        self.assertIn("queued", out)
+
+    def test_bench_pantry(self):
+        user = get_user_model().objects.create_user("user@example.com",
+                                                    "testpass123")
+        ingredients = [
+            Ingredient.objects.create(user=user, name=name)
+            for name in ("Rice", "Egg", "Leek")
+        ]
+        for i in range(3):
+            recipe = Recipe.objects.create(user=user,
+                                           title=f"Recipe {i}",
+                                           time_minutes=5,
+                                           price="1.00")
+            recipe.ingredients.add(*ingredients[i:])
+
+        out = self.run_command("bench_pantry", "--ingredients", "2",
+                               "--iterations", "1")
+
+        for match in ("any", "all", "only"):
+            self.assertIn(f"  {match}", out)
@@ -0,0 +1,66 @@
+"""Tests for the benchmark baseline comparison."""
+
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.benchmarking import Baseline
+
+RESULT = {"queries": 3, "time_ms": 10.0, "memory_kb": 100.0}
+
+
+class BaselineTests(SimpleTestCase):
+    """Test regressions are detected against the stored baseline."""
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".json")
+        with os.fdopen(fd, "w") as stream:
+            json.dump({"list": RESULT}, stream)
+        self.addCleanup(os.remove, self.path)
+
+    def baseline(self, **env):
+        with mock.patch.dict(os.environ, env):
+            return Baseline(self.path)
+
+    def test_query_regression_always_checked(self):
+        """Test extra queries fail even without BENCHMARK."""
+        problems = self.baseline().compare("list", dict(RESULT, queries=4))
+
+        self.assertEqual(len(problems), 1)
+        self.assertIn("4 queries", problems[0])
+
+    def test_timing_only_checked_when_enabled(self):
+        """Test slow results only fail with BENCHMARK set."""
+        slow = dict(RESULT, time_ms=20.0, memory_kb=101.0)
+
+        self.assertEqual(self.baseline().compare("list", slow), [])
+        problems = self.baseline(BENCHMARK="1").compare("list", slow)
+        self.assertEqual(len(problems), 1)
+        self.assertIn("time_ms", problems[0])
+
+    def test_threshold(self):
+        """Test the regression threshold is configurable."""
+        slow = dict(RESULT, time_ms=20.0)
+
+        baseline = self.baseline(BENCHMARK="1", BENCHMARK_THRESHOLD="1.5")
+        self.assertEqual(baseline.compare("list", slow), [])
+
+    def test_missing_baseline(self):
+        """Test a result without a baseline is reported."""
+        self.assertEqual(len(self.baseline().compare("detail", RESULT)), 1)
+
+    def test_update(self):
+        """Test updating records results and keeps old timings."""
+        baseline = self.baseline(BENCHMARK_UPDATE="1")
+
+        self.assertEqual(
+            baseline.compare("list", dict(RESULT, queries=2, time_ms=1.0)),
+            [])
+        baseline.save()
+
+        with open(self.path) as stream:
+            saved = json.load(stream)
+        self.assertEqual(saved["list"], dict(RESULT, queries=2))
@@ -0,0 +1,169 @@
+"""Tests for recipe ingredient bitsets."""
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import bitsets
+from core.models import Recipe, Ingredient
+
+
+class BitsetTests(SimpleTestCase):
+    """Test encoding and matching."""
+
+    def test_encode_round_trip(self):
+        bits = bitsets.to_int([0, 3, 17])
+
+        self.assertEqual(bits, 0b100000000000001001)
+        self.assertEqual(bitsets.encode(bits), b"\x09\x00\x02")
+        self.assertEqual(bitsets.decode(bitsets.encode(bits)), bits)
+        self.assertEqual(bitsets.encode(0), b"")
+        self.assertEqual(bitsets.decode(b""), 0)
+
+    def test_matches(self):
+        mask = 0b0110
+        self.assertTrue(bitsets.matches(0b0111, mask, bitsets.ALL))
+        self.assertFalse(bitsets.matches(0b0011, mask, bitsets.ALL))
+        self.assertTrue(bitsets.matches(0b0100, mask, bitsets.ONLY))
+        self.assertFalse(bitsets.matches(0b0101, mask, bitsets.ONLY))
+        self.assertFalse(bitsets.matches(0, mask, bitsets.ONLY))
+        self.assertTrue(bitsets.matches(0b1010, mask, bitsets.ANY))
+        self.assertFalse(bitsets.matches(0b1001, mask, bitsets.ANY))
+
+
+class RecipeBitsTests(TestCase):
+    """Test bitsets are kept in step with the ingredient links."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "user@example.com", "testpass123")
+        self.rice, self.egg, self.leek = (
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ("Rice", "Egg", "Leek"))
+        self.recipe = Recipe.objects.create(user=self.user,
+                                            title="Fried rice",
+                                            time_minutes=10,
+                                            price="2.00")
+
+    def stored(self, recipe):
+        return bitsets.decode(
+            Recipe.objects.values_list("ingredient_bits",
+                                       flat=True).get(id=recipe.id))
+
+    def expected(self, *ingredients):
+        return bitsets.to_int(obj.bit_index for obj in ingredients)
+
+    def test_bit_indexes_allocated_per_user(self):
+        """Test each user's ingredients get their own bits from 0."""
+        other = get_user_model().objects.create_user(
+            "other@example.com", "testpass123")
+        salt = Ingredient.objects.create(user=other, name="Salt")
+
+        self.assertEqual([self.rice.bit_index, self.egg.bit_index,
+                          self.leek.bit_index], [0, 1, 2])
+        self.assertEqual(salt.bit_index, 0)
+        self.assertEqual(list(Ingredient.allocate_bits(self.user.id, 2)),
+                         [3, 4])
+
+    def test_forward_changes(self):
+        """Test adding, removing and clearing a recipe's ingredients."""
+        self.recipe.ingredients.add(self.rice, self.egg)
+        self.assertEqual(self.stored(self.recipe),
+                         self.expected(self.rice, self.egg))
+        self.assertEqual(bitsets.decode(self.recipe.ingredient_bits),
+                         self.expected(self.rice, self.egg))
+
+        self.recipe.ingredients.remove(self.rice)
+        self.assertEqual(self.stored(self.recipe), self.expected(self.egg))
+
+        self.recipe.ingredients.clear()
+        self.assertEqual(self.stored(self.recipe), 0)
+
+    def test_reverse_changes(self):
+        """Test changing an ingredient's recipes."""
+        soup = Recipe.objects.create(user=self.user,
+                                     title="Soup",
+                                     time_minutes=30,
+                                     price="3.00")
+        self.leek.recipe_set.add(self.recipe, soup)
+        self.egg.recipe_set.add(soup)
+        self.assertEqual(self.stored(soup),
+                         self.expected(self.leek, self.egg))
+
+        self.leek.recipe_set.remove(soup)
+        self.assertEqual(self.stored(soup), self.expected(self.egg))
+
+        self.leek.recipe_set.clear()
+        self.assertEqual(self.stored(self.recipe), 0)
+
+    def test_delete_ingredient(self):
+        """Test a deleted ingredient's bit is cleared from recipes."""
+        self.recipe.ingredients.add(self.rice, self.egg)
+
+        self.rice.delete()
+
+        self.assertEqual(self.stored(self.recipe), self.expected(self.egg))
+
+    def test_stale_instance_keeps_bits(self):
+        """Test saving an instance loaded earlier keeps current bits."""
+        stale = Recipe.objects.get(id=self.recipe.id)
+        self.recipe.ingredients.add(self.leek)
+
+        stale.title = "Leek rice"
+        stale.save()
+
+        self.assertEqual(self.stored(self.recipe), self.expected(self.leek))
+
+    def test_serializer_writes_bits(self):
+        """Test the recipe API stores the bits of the ingredients set."""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse("recipe:recipe-detail", args=[self.recipe.id])
+
+        res = client.patch(url, {
+            "ingredients": [{"name": "Rice"}, {"name": "Chives"}],
+        }, format="json")
+
+        chives = Ingredient.objects.get(user=self.user, name="Chives")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(chives.bit_index, 3)
+        self.assertEqual(self.stored(self.recipe),
+                         self.expected(self.rice, chives))
+
+    def test_matching_ids(self):
+        """Test recipes are matched against a pantry."""
+        self.recipe.ingredients.add(self.rice, self.egg)
+        pantry = [self.rice.id, self.egg.id, self.leek.id]
+
+        self.assertEqual(
+            bitsets.matching_ids(self.user.id, pantry, bitsets.ONLY),
+            [self.recipe.id])
+        self.assertEqual(
+            bitsets.matching_ids(self.user.id, pantry, bitsets.ALL), [])
+        self.assertEqual(
+            bitsets.matching_ids(self.user.id, [self.rice.id, 0],
+                                 bitsets.ALL), [])
+        self.assertEqual(
+            bitsets.matching_ids(self.user.id, [self.leek.id, self.egg.id],
+                                 bitsets.ANY), [self.recipe.id])
+        self.assertEqual(
+            bitsets.matching_ids(self.user.id, [0], bitsets.ONLY), [])
+
+    def test_filter_matching_in_query(self):
+        """Test matching adds a predicate rather than an ID list."""
+        self.recipe.ingredients.add(self.rice)
+        recipes = Recipe.objects.filter(user=self.user)
+
+        with self.assertNumQueries(2):
+            matched = list(
+                bitsets.filter_matching(recipes, self.user.id,
+                                        [self.rice.id, self.egg.id],
+                                        bitsets.ONLY))
+
+        self.assertEqual(matched, [self.recipe])
+        sql = str(
+            bitsets.filter_matching(recipes, self.user.id, [self.rice.id],
+                                    bitsets.ALL).query)
+        self.assertIn(bitsets.SQLITE_FUNCTION, sql)
+        self.assertNotIn(" IN (", sql)
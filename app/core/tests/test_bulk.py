@@ -0,0 +1,235 @@
+"""Tests for set-based bulk operations and their admin actions."""
+
+import io
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.admin import helpers
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core import bulk
+from core.models import Recipe, Tag, Ingredient, Tombstone, OutboxEvent
+
+
+def create_recipe(user, title, ingredients=()):
+    recipe = Recipe.objects.create(user=user,
+                                   title=title,
+                                   time_minutes=5,
+                                   price=Decimal("1.00"))
+    recipe.ingredients.add(*ingredients)
+    return recipe
+
+
+class BulkOperationTests(TestCase):
+    """Test the bulk operations."""
+
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(email="user@example.com",
+                                             password="test123")
+        self.other = User.objects.create_user(email="other@example.com",
+                                              password="test123")
+        self.salt = Ingredient.objects.create(user=self.user, name="Salt")
+        self.salt2 = Ingredient.objects.create(user=self.user, name="salt")
+        self.salt3 = Ingredient.objects.create(user=self.user, name="Salt ")
+        self.soup = create_recipe(self.user, "Soup", [self.salt, self.salt2])
+        self.stew = create_recipe(self.user, "Stew", [self.salt3])
+        self.bread = create_recipe(self.user, "Bread", [self.salt2])
+        create_recipe(self.other, "Cake")
+
+    def test_merge_dry_run(self):
+        """Test a dry run counts without changing anything."""
+        queryset = Ingredient.objects.filter(user=self.user)
+
+        counts = bulk.merge(queryset, dry_run=True)
+
+        self.assertEqual(counts, {
+            "ingredients": 2,
+            "recipe links moved": 2,
+            "recipes": 3
+        })
+        self.assertEqual(Ingredient.objects.count(), 3)
+
+    def test_merge(self):
+        """Test duplicates are merged into the oldest row."""
+        queryset = Ingredient.objects.filter(user=self.user)
+
+        counts = bulk.merge(queryset)
+
+        self.assertEqual(counts["ingredients"], 2)
+        self.assertEqual(list(Ingredient.objects.all()), [self.salt])
+        for recipe in (self.soup, self.stew, self.bread):
+            self.assertEqual(list(recipe.ingredients.all()), [self.salt])
+        self.assertEqual(
+            Tombstone.objects.filter(model="ingredients").count(), 2)
+        events = OutboxEvent.objects.filter(aggregate="recipe",
+                                            event_type="updated")
+        self.assertCountEqual([(event.aggregate_id, event.payload)
+                               for event in events],
+                              [(recipe.id, {"id": recipe.id})
+                               for recipe in (self.soup, self.stew,
+                                              self.bread)])
+
+    def test_merge_requires_single_user(self):
+        """Test rows of different users cannot be merged."""
+        Ingredient.objects.create(user=self.other, name="Salt")
+
+        with self.assertRaises(bulk.MergeError):
+            bulk.merge(Ingredient.objects.filter(name="Salt"))
+
+    def test_merge_query_count_is_constant(self):
+        """Test merging runs the same statements however many rows."""
+        queryset = Ingredient.objects.filter(user=self.user)
+
+        # Includes deleting the merged rows' nutrition profiles and
+        # rebuilding the recipes' bitsets and the user's kitchen stats.
+        with self.assertNumQueries(23):
+            bulk.merge(queryset)
+
+    def test_delete_owned(self):
+        """Test bulk deleting recipes removes links and leaves tombstones."""
+        queryset = Recipe.objects.filter(user=self.user)
+
+        self.assertEqual(bulk.delete_owned(queryset, dry_run=True),
+                         {"recipes": 3})
+        self.assertEqual(bulk.delete_owned(queryset), {"recipes": 3})
+
+        self.assertEqual(Recipe.objects.count(), 1)
+        self.assertFalse(Recipe.ingredients.through.objects.exists())
+        self.assertEqual(Tombstone.objects.filter(user=self.user).count(), 3)
+
+    def test_deleted_recipe_images_removed(self):
+        """Test image files go once bulk deletes of recipes commit."""
+        Recipe.objects.filter(id=self.soup.id).update(
+            image="uploads/recipe/soup.jpg")
+        Recipe.objects.filter(id=self.stew.id).update(
+            image="uploads/recipe/stew.jpg")
+        storage = Recipe._meta.get_field("image").storage
+        users = get_user_model().objects.filter(id=self.user.id)
+
+        with mock.patch.object(storage, "delete") as delete:
+            with self.captureOnCommitCallbacks(execute=True):
+                bulk.delete_owned(Recipe.objects.filter(id=self.soup.id))
+            with self.captureOnCommitCallbacks(execute=True):
+                bulk.delete_users(users)
+
+        self.assertEqual(
+            [call.args[0] for call in delete.call_args_list],
+            ["uploads/recipe/soup.jpg", "uploads/recipe/stew.jpg"])
+
+    def test_deactivate_users(self):
+        """Test users are deactivated and their tokens revoked."""
+        Token.objects.create(user=self.user)
+        queryset = get_user_model().objects.filter(id=self.user.id)
+
+        counts = bulk.deactivate_users(queryset)
+
+        self.assertEqual(counts, {"tokens": 1, "users": 1})
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+
+    def test_delete_users(self):
+        """Test users are deleted with everything they own."""
+        queryset = get_user_model().objects.filter(id=self.user.id)
+
+        self.assertEqual(bulk.delete_users(queryset, dry_run=True), {
+            "users": 1,
+            "recipes": 3,
+            "tags": 0,
+            "ingredients": 3
+        })
+        counts = bulk.delete_users(queryset)
+
+        self.assertEqual(counts["users"], 1)
+        self.assertEqual(Recipe.objects.count(), 1)
+        self.assertFalse(Ingredient.objects.exists())
+
+
+class BulkAdminActionTests(TestCase):
+    """Test the admin actions preview before applying."""
+
+    def setUp(self):
+        User = get_user_model()
+        admin = User.objects.create_superuser(email="admin@example.com",
+                                              password="test123")
+        self.client.force_login(admin)
+        user = User.objects.create_user(email="user@example.com",
+                                        password="test123")
+        self.tags = [
+            Tag.objects.create(user=user, name=name)
+            for name in ("Vegan", "vegan")
+        ]
+        self.url = reverse("admin:core_tag_changelist")
+        self.data = {
+            "action": "merge",
+            helpers.ACTION_CHECKBOX_NAME: [tag.id for tag in self.tags],
+        }
+
+    def test_preview_then_apply(self):
+        """Test the first submit previews and the second applies."""
+        res = self.client.post(self.url, {**self.data, "index": 0})
+
+        self.assertContains(res, "Tags: 1")
+        self.assertEqual(Tag.objects.count(), 2)
+
+        res = self.client.post(self.url, {**self.data, "apply": "yes"})
+
+        self.assertEqual(res.status_code, 302)
+        self.assertEqual(list(Tag.objects.all()), [self.tags[0]])
+
+
+class MergeDuplicatesCommandTests(TestCase):
+    """Test the merge_duplicates command."""
+
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(email="user@example.com",
+                                             password="test123")
+        other = User.objects.create_user(email="other@example.com",
+                                         password="test123")
+        self.tomato = Ingredient.objects.create(user=self.user, name="Tomato")
+        tomatoes = Ingredient.objects.create(user=self.user, name="tomatoes")
+        Ingredient.objects.create(user=self.user, name="Basil")
+        # Same name for another user is not a duplicate.
+        Ingredient.objects.create(user=other, name="Tomato")
+        self.recipe = create_recipe(self.user, "Salad", [tomatoes])
+
+    def test_clusters(self):
+        """Test duplicates are grouped per user, oldest first."""
+        clusters = list(bulk.duplicate_clusters(Ingredient))
+
+        self.assertEqual(len(clusters), 1)
+        self.assertEqual(clusters[0][0], self.user.id)
+        self.assertEqual(clusters[0][1][0], self.tomato.id)
+
+    def test_dry_run(self):
+        """Test a dry run reports without merging."""
+        out = io.StringIO()
+
+        call_command("merge_duplicates", dry_run=True, stdout=out)
+
+        self.assertIn("Would merge 1 ingredients", out.getvalue())
+        self.assertEqual(Ingredient.objects.count(), 4)
+
+    def test_merge(self):
+        """Test duplicates are merged and recipes relinked."""
+        call_command("merge_duplicates",
+                     model=["ingredients"],
+                     stdout=io.StringIO())
+
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(list(self.recipe.ingredients.all()), [self.tomato])
+
+    def test_stats_rebuilt_once(self):
+        """Test kitchen stats are rebuilt once for all merged groups."""
+        Tag.objects.create(user=self.user, name="Quick")
+        Tag.objects.create(user=self.user, name="quick")
+
+        with mock.patch("core.kitchen.rebuild") as rebuild:
+            call_command("merge_duplicates", stdout=io.StringIO())
+
+        rebuild.assert_called_once_with([self.user.id])
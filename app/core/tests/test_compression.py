@@ -0,0 +1,132 @@
+"""Tests for the JSON renderer and the compression middleware."""
+
+import datetime
+import gzip
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import SimpleTestCase, RequestFactory, override_settings
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+
+from core import middleware
+from core.renderers import FastJSONRenderer
+
+
+def get_response(content, content_type="application/json", **headers):
+    """Return a view callable producing `content`."""
+
+    def view(request):
+        response = HttpResponse(content, content_type=content_type)
+        for key, value in headers.items():
+            response[key] = value
+        return response
+
+    return view
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """Test FastJSONRenderer output matches DRF's JSONRenderer."""
+
+    data = {
+        "id": 1,
+        "title": "Café  ",
+        "price": Decimal("5.25"),
+        "created": datetime.datetime(2024, 1, 2, 3, 4, 5,
+                                     tzinfo=datetime.timezone.utc),
+        "label": gettext_lazy("Recipe"),
+        "tags": [{"id": 1, "name": "Vegan"}],
+        "image": None,
+    }
+
+    def test_matches_json_renderer(self):
+        """Test output is byte-identical to the stdlib renderer."""
+        self.assertEqual(FastJSONRenderer().render(self.data),
+                         JSONRenderer().render(self.data))
+
+    def test_fallback_without_orjson(self):
+        """Test the stdlib renderer is used when orjson is missing."""
+        with patch("core.renderers.orjson", None):
+            self.assertEqual(FastJSONRenderer().render(self.data),
+                             JSONRenderer().render(self.data))
+
+    def test_indent_uses_stdlib(self):
+        """Test indented output is delegated to DRF."""
+        rendered = FastJSONRenderer().render(
+            {"id": 1}, "application/json; indent=2", {})
+
+        self.assertEqual(rendered, b'{\n  "id": 1\n}')
+
+
+@override_settings(COMPRESSION_MIN_SIZE=100)
+class CompressionMiddlewareTests(SimpleTestCase):
+    """Test response compression."""
+
+    body = b'{"title": "recipe"}' * 50
+
+    def test_gzip_above_threshold(self):
+        """Test large responses are gzip'd and ETags weakened."""
+        mw = middleware.CompressionMiddleware(
+            get_response(self.body, ETag='"abc"'))
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip")
+
+        with patch("core.middleware.brotli", None):
+            response = mw(request)
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), self.body)
+        self.assertEqual(response["ETag"], 'W/"abc"')
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    def test_small_response_not_compressed(self):
+        """Test responses under the threshold are left alone."""
+        mw = middleware.CompressionMiddleware(get_response(b"{}"))
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip")
+
+        response = mw(request)
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_secret_bearing_responses_not_compressed(self):
+        """Test HTML and responses setting the CSRF cookie are skipped."""
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip")
+        html = middleware.CompressionMiddleware(
+            get_response(self.body, content_type="text/html; charset=utf-8"))
+
+        def csrf_view(request):
+            response = get_response(self.body)(request)
+            response.set_cookie(settings.CSRF_COOKIE_NAME, "token")
+            return response
+
+        csrf = middleware.CompressionMiddleware(csrf_view)
+
+        self.assertFalse(html(request).has_header("Content-Encoding"))
+        self.assertFalse(csrf(request).has_header("Content-Encoding"))
+
+    def test_choose_encoding(self):
+        """Test Accept-Encoding negotiation and q-values."""
+        with patch("core.middleware.brotli", object()):
+            self.assertEqual(middleware.choose_encoding("gzip, br"), "br")
+            self.assertEqual(middleware.choose_encoding("gzip, br;q=0.5"),
+                             "gzip")
+            self.assertEqual(middleware.choose_encoding("*"), "br")
+        with patch("core.middleware.brotli", None):
+            self.assertEqual(middleware.choose_encoding("br"), None)
+        self.assertEqual(middleware.choose_encoding("gzip;q=0"), None)
+        self.assertEqual(middleware.choose_encoding(""), None)
+
+    def test_brotli(self):
+        """Test brotli is preferred when installed."""
+        if middleware.brotli is None:
+            self.skipTest("Brotli is not installed.")
+        mw = middleware.CompressionMiddleware(get_response(self.body))
+        request = RequestFactory().get("/",
+                                       HTTP_ACCEPT_ENCODING="gzip, br")
+
+        response = mw(request)
+
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(middleware.brotli.decompress(response.content),
+                         self.body)
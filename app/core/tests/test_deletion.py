@@ -0,0 +1,117 @@
+"""Tests for batched user deletion."""
+
+import io
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.deletion import delete_user, request_deletion
+from core.models import Recipe, Tag, Ingredient, Tombstone, OutboxEvent
+
+
+def create_user_with_recipes(email, num_recipes):
+    """Create a user owning recipes linked to tags and ingredients."""
+    user = get_user_model().objects.create_user(email=email,
+                                                password="test123")
+    tag = Tag.objects.create(user=user, name=f"{email} tag")
+    ingredient = Ingredient.objects.create(user=user, name=f"{email} salt")
+    for i in range(num_recipes):
+        recipe = Recipe.objects.create(user=user,
+                                       title=f"Recipe {i}",
+                                       time_minutes=5,
+                                       price=Decimal("1.00"),
+                                       image=f"uploads/recipe/{email}-{i}.jpg")
+        recipe.tags.add(tag)
+        recipe.ingredients.add(ingredient)
+    return user
+
+
+class DeleteUserTests(TestCase):
+    """Test deleting users and their data."""
+
+    def setUp(self):
+        self.user = create_user_with_recipes("user@example.com", 5)
+        self.other = create_user_with_recipes("other@example.com", 2)
+
+    def test_deletes_owned_rows_in_batches(self):
+        """Test rows are deleted in batches and progress is reported."""
+        progress = []
+        files = []
+
+        with self.captureOnCommitCallbacks(execute=True):
+            counts = delete_user(
+                self.user,
+                batch_size=2,
+                progress=lambda name, n: progress.append((name, n)),
+                cleanup_files=lambda storage, names: files.extend(names))
+
+        self.assertEqual(counts, {"recipe": 5, "tag": 1, "ingredient": 1})
+        self.assertEqual(progress[:3], [("recipes", 2), ("recipes", 4),
+                                        ("recipes", 5)])
+        self.assertEqual(len(files), 5)
+        self.assertFalse(
+            get_user_model().objects.filter(id=self.user.id).exists())
+        self.assertEqual(Recipe.tags.through.objects.count(), 2)
+        self.assertEqual(Recipe.objects.filter(user=self.other).count(), 2)
+
+    def test_no_tombstones_and_one_outbox_event(self):
+        """Test per-object signals are skipped for a deleted user."""
+        delete_user(self.user, cleanup_files=lambda storage, names: None)
+
+        self.assertFalse(Tombstone.objects.exists())
+        self.assertEqual(
+            list(OutboxEvent.objects.values_list("aggregate", "event_type")),
+            [("user", "deleted")])
+
+    def test_deleted_files_removed_from_storage(self):
+        """Test the default file cleanup deletes from storage."""
+        storage = Recipe._meta.get_field("image").storage
+
+        with mock.patch.object(storage, "delete") as delete:
+            with self.captureOnCommitCallbacks(execute=True):
+                delete_user(self.user)
+
+        self.assertEqual(delete.call_count, 5)
+
+    def test_api_delete_queues_deletion(self):
+        """Test the API deactivates the user and leaves the data."""
+        Token.objects.create(user=self.user)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse("user:user-detail", args=[self.user.id])
+
+        res = client.delete(url)
+
+        self.assertEqual(res.status_code, 204)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertIsNotNone(self.user.deletion_requested_at)
+        self.assertFalse(Token.objects.filter(user=self.user).exists())
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 5)
+
+    def test_delete_pending(self):
+        """Test only users who asked to be deleted are deleted."""
+        request_deletion(self.user)
+        out = io.StringIO()
+
+        call_command("delete_user", "--pending", stdout=out)
+
+        self.assertIn("Deleted 1 users.", out.getvalue())
+        self.assertFalse(
+            get_user_model().objects.filter(id=self.user.id).exists())
+        self.assertEqual(Recipe.objects.filter(user=self.other).count(), 2)
+
+    def test_command(self):
+        """Test the delete_user command."""
+        out = io.StringIO()
+
+        call_command("delete_user", "user@example.com", stdout=out)
+
+        self.assertIn("5 recipes", out.getvalue())
+        self.assertFalse(Recipe.objects.filter(user_id=self.user.id).exists())
@@ -0,0 +1,95 @@
+"""Tests for the gunicorn worker autotuning."""
+
+import importlib
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from app import gunicorn_config
+
+
+def write(root, path, content):
+    """Write a fake cgroup file under root."""
+    full_path = os.path.join(root, path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, "w") as f:
+        f.write(content)
+
+
+@patch("os.sched_getaffinity", return_value=set(range(8)))
+class GunicornConfigTests(SimpleTestCase):
+    """Test CPU and memory limit detection."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_cpu_limit_cgroup_v2(self, _):
+        """Test a v2 quota of 2.5 CPUs rounds up to 3."""
+        write(self.root, "cpu.max", "250000 100000\n")
+
+        self.assertEqual(gunicorn_config.cpu_limit(self.root), 3)
+
+    def test_cpu_limit_cgroup_v2_unlimited(self, _):
+        """Test an unlimited v2 quota falls back to the affinity mask."""
+        write(self.root, "cpu.max", "max 100000\n")
+
+        self.assertEqual(gunicorn_config.cpu_limit(self.root), 8)
+
+    def test_cpu_limit_cgroup_v1(self, _):
+        """Test the v1 CFS quota is honoured."""
+        write(self.root, "cpu/cpu.cfs_quota_us", "100000\n")
+        write(self.root, "cpu/cpu.cfs_period_us", "100000\n")
+
+        self.assertEqual(gunicorn_config.cpu_limit(self.root), 1)
+
+    def test_memory_limit(self, _):
+        """Test v2 and v1 memory limits."""
+        write(self.root, "memory.max", str(512 * 1024 * 1024))
+        self.assertEqual(gunicorn_config.memory_limit(self.root),
+                         512 * 1024 * 1024)
+
+        other = os.path.join(self.root, "v1")
+        write(other, "memory/memory.limit_in_bytes", str(1 << 30))
+        self.assertEqual(gunicorn_config.memory_limit(other), 1 << 30)
+
+    def test_worker_count_capped_by_memory(self, _):
+        """Test workers are limited by memory and threads make up for it."""
+        mb = 1024 * 1024
+        workers = gunicorn_config.worker_count(4, 300 * mb, 150 * mb)
+
+        self.assertEqual(workers, 2)
+        self.assertEqual(gunicorn_config.thread_count(4, workers), 5)
+        self.assertEqual(gunicorn_config.worker_count(4, None, 150 * mb), 9)
+        self.assertEqual(gunicorn_config.worker_count(4, 10 * mb, 150 * mb),
+                         1)
+
+    def test_metrics_dir_passed_to_app(self, _):
+        """Test loading the config leaves the environment alone."""
+        directory = os.path.join(self.root, "prometheus")
+        self.addCleanup(importlib.reload, gunicorn_config)
+
+        with patch.dict(os.environ, {"PROMETHEUS_MULTIPROC_DIR": directory}):
+            environ = dict(os.environ)
+            config = importlib.reload(gunicorn_config)
+            self.assertEqual(dict(os.environ), environ)
+
+        self.assertEqual(config.raw_env,
+                         [f"PROMETHEUS_MULTIPROC_DIR={directory}"])
+        self.assertFalse(os.path.exists(directory))
+
+    def test_metrics_dir_reset_on_starting(self, _):
+        """Test the master starts with an empty metrics directory."""
+        directory = os.path.join(self.root, "prometheus")
+
+        with patch.object(gunicorn_config, "_metrics_dir", directory):
+            gunicorn_config.on_starting(None)
+            write(directory, "counter_1.db", "")
+            gunicorn_config.on_starting(None)
+
+        self.assertEqual(os.listdir(directory), [])
@@ -0,0 +1,108 @@
+"""Tests for structured, queued logging."""
+
+import io
+import json
+import logging
+import sys
+
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from core import log
+
+
+def make_record(msg="Saved recipe %s", args=(1, ), **extra):
+    record = logging.makeLogRecord({
+        "name": "recipe.views",
+        "levelname": "INFO",
+        "levelno": logging.INFO,
+        "msg": msg,
+        "args": args,
+    })
+    record.__dict__.update(extra)
+    return record
+
+
+class JSONFormatterTests(SimpleTestCase):
+    """Test records are formatted as JSON objects."""
+
+    def test_format(self):
+        """Test message, request ID and extra fields are included."""
+        record = make_record(request_id="abc", view="recipe:recipe-list")
+
+        data = json.loads(log.JSONFormatter().format(record))
+
+        self.assertEqual(data["message"], "Saved recipe 1")
+        self.assertEqual(data["logger"], "recipe.views")
+        self.assertEqual(data["level"], "INFO")
+        self.assertEqual(data["request_id"], "abc")
+        self.assertEqual(data["view"], "recipe:recipe-list")
+        self.assertRegex(data["time"], r"^\d{4}-\d\d-\d\dT.*\+00:00$")
+        self.assertNotIn("exc", data)
+
+    def test_exception(self):
+        """Test tracebacks are included."""
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            record = make_record()
+            record.exc_info = sys.exc_info()
+
+        data = json.loads(log.JSONFormatter().format(record))
+
+        self.assertIn("ValueError: boom", data["exc"])
+
+
+class QueueHandlerTests(SimpleTestCase):
+    """Test records are written by the listener thread."""
+
+    def test_records_written(self):
+        """Test messages are rendered before being queued."""
+        stream = io.StringIO()
+        handler = log.queue_handler(stream=stream)
+        handler.addFilter(log.RequestIDFilter())
+        logger = logging.getLogger("core.tests.queued")
+        logger.addHandler(handler)
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        self.addCleanup(logger.removeHandler, handler)
+        args = ["first"]
+        token = log.request_id.set("req-1")
+        try:
+            logger.warning("Got %s", args)
+        finally:
+            log.request_id.reset(token)
+        # Changes after the call must not show up in the record.
+        args.append("second")
+        _, _, listener = log._listeners.pop()
+        listener.stop()
+
+        data = json.loads(stream.getvalue())
+        self.assertEqual(data["message"], "Got ['first']")
+        self.assertEqual(data["request_id"], "req-1")
+
+
+class RequestIDMiddlewareTests(SimpleTestCase):
+    """Test request IDs are set on responses."""
+
+    url = reverse("api_schema")
+
+    def test_generated(self):
+        """Test an ID is generated when none is sent."""
+        first = self.client.get(self.url)[log.REQUEST_ID_HEADER]
+        second = self.client.get(self.url)[log.REQUEST_ID_HEADER]
+
+        self.assertRegex(first, r"^[0-9a-f]{32}$")
+        self.assertNotEqual(first, second)
+
+    def test_forwarded(self):
+        """Test a well-formed incoming ID is kept."""
+        res = self.client.get(self.url, HTTP_X_REQUEST_ID="edge-42.a_b")
+
+        self.assertEqual(res[log.REQUEST_ID_HEADER], "edge-42.a_b")
+
+    def test_malformed_replaced(self):
+        """Test IDs that could forge log lines are replaced."""
+        res = self.client.get(self.url, HTTP_X_REQUEST_ID='x" "level')
+
+        self.assertNotEqual(res[log.REQUEST_ID_HEADER], 'x" "level')
@@ -0,0 +1,136 @@
+"""Tests for the Prometheus metrics."""
+
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+
+METRICS_URL = "/metrics"
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsTests(TestCase):
+    """Test metrics are recorded and exposed."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "user@example.com", "testpass123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_request_metrics(self):
+        """Test requests, latency and queries are recorded per view."""
+        view = "recipe:recipe-list"
+        before = {
+            "requests": sample("http_requests_total",
+                               view=view,
+                               method="GET",
+                               status="200"),
+            "latency": sample("http_request_duration_seconds_count",
+                              view=view,
+                              method="GET"),
+            "queries": sample("db_queries_per_request_sum", view=view),
+        }
+
+        self.client.get(RECIPES_URL)
+
+        self.assertEqual(
+            sample("http_requests_total", view=view, method="GET",
+                   status="200"), before["requests"] + 1)
+        self.assertEqual(
+            sample("http_request_duration_seconds_count",
+                   view=view,
+                   method="GET"), before["latency"] + 1)
+        self.assertGreater(sample("db_queries_per_request_sum", view=view),
+                           before["queries"])
+
+    def test_unresolved_paths_share_a_label(self):
+        """Test unknown paths don't create a series each."""
+        before = sample("http_requests_total",
+                        view="<unresolved>",
+                        method="GET",
+                        status="404")
+
+        self.client.get("/no-such-page-1/")
+        self.client.get("/no-such-page-2/")
+
+        self.assertEqual(
+            sample("http_requests_total",
+                   view="<unresolved>",
+                   method="GET",
+                   status="404"), before + 2)
+
+    def test_http_cache_hits(self):
+        """Test 304 responses to conditional requests count as hits."""
+        with self.settings(OPENAPI_SCHEMA_PATH=__file__):
+            res = self.client.get(reverse("api_schema"))
+            before = sample("http_cache_requests_total",
+                            view="api_schema",
+                            result="hit")
+            self.client.get(reverse("api_schema"),
+                            HTTP_IF_NONE_MATCH=res["ETag"])
+
+        self.assertEqual(
+            sample("http_cache_requests_total",
+                   view="api_schema",
+                   result="hit"), before + 1)
+
+    def test_image_upload_metrics(self):
+        """Test uploaded image sizes and durations are recorded."""
+        recipe = Recipe.objects.create(user=self.user,
+                                       title="Soup",
+                                       time_minutes=10,
+                                       price="5.00")
+        url = reverse("recipe:recipe-upload-image", args=[recipe.id])
+        count = sample("image_upload_duration_seconds_count")
+        size = sample("image_upload_bytes_sum")
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as image_file:
+            Image.new("RGB", (10, 10)).save(image_file, format="JPEG")
+            image_file.seek(0)
+            res = self.client.post(url, {"image": image_file},
+                                   format="multipart")
+        recipe.refresh_from_db()
+        recipe.image.delete()
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(sample("image_upload_duration_seconds_count"),
+                         count + 1)
+        self.assertGreater(sample("image_upload_bytes_sum"), size)
+
+    @override_settings(DEBUG=True)
+    def test_metrics_endpoint(self):
+        """Test metrics are served in the Prometheus text format."""
+        self.client.get(RECIPES_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res["Content-Type"].startswith("text/plain"))
+        self.assertIn(b'http_requests_total{method="GET",status="200",'
+                      b'view="recipe:recipe-list"}', res.content)
+        self.assertIn(b"db_connections_opened_total", res.content)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_token(self):
+        """Test the bearer token is required when configured."""
+        self.assertEqual(self.client.get(METRICS_URL).status_code, 403)
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION="Bearer sécret")
+        self.assertEqual(res.status_code, 403)
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION="Bearer secret")
+
+        self.assertEqual(res.status_code, 200)
+
+    @override_settings(METRICS_TOKEN="", DEBUG=False)
+    def test_metrics_closed_without_token(self):
+        """Test metrics are not served without a token outside DEBUG."""
+        self.assertEqual(self.client.get(METRICS_URL).status_code, 403)
@@ -135,3 +135,31 @@ class ModelTests(TestCase):
         self.assertEqual(
             file_path, f"uploads/recipe/{uuid}.jpg"
         )  # Checking that uuid replaces the name exmple.com with uuid
+
+    def test_normalize_name(self):
+        """Test names differing in case, spacing or plural share a key."""
+        for name in ("Tomato", "tomatoes", "  tomato ", "TOMATOES"):
+            self.assertEqual(models.normalize_name(name), "tomato")
+        self.assertEqual(models.normalize_name("Green  Beans"), "green bean")
+        self.assertEqual(models.normalize_name("Berries"), "berry")
+        self.assertEqual(models.normalize_name("Couscous"), "couscous")
+        self.assertEqual(models.normalize_name("Glass"), "glass")
+        for singular, plural in (("cookie", "cookies"), ("pie", "pies"),
+                                 ("brownie", "Brownies"),
+                                 ("cherry", "cherries")):
+            self.assertEqual(models.normalize_name(plural),
+                             models.normalize_name(singular))
+            self.assertEqual(models.normalize_name(singular), singular)
+
+    def test_normalized_name_kept_on_save(self):
+        """Test saving keeps the normalized name up to date."""
+        user = create_user()
+        ingredient = models.Ingredient.objects.create(user=user,
+                                                      name="Onions")
+        self.assertEqual(ingredient.normalized_name, "onion")
+
+        ingredient.name = "Red Onions"
+        ingredient.save(update_fields=["name"])
+
+        ingredient.refresh_from_db()
+        self.assertEqual(ingredient.normalized_name, "red onion")
@@ -0,0 +1,200 @@
+"""Tests for the transactional outbox."""
+
+import io
+import json
+import os
+import tempfile
+import threading
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import outbox
+from core.models import OutboxEvent, Recipe, Tag, Ingredient
+
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+class ListSink:
+    """Sink collecting events in memory."""
+
+    def __init__(self):
+        self.events = []
+
+    def send(self, events):
+        self.events.extend(events)
+
+
+class FailingSink:
+
+    def send(self, events):
+        raise OSError("sink down")
+
+
+class OutboxViewTests(TestCase):
+    """Test views write outbox events with their changes."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="test123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_recipe_create_update_delete(self):
+        """Test each recipe mutation records one event."""
+        res = self.client.post(RECIPES_URL, {
+            "title": "Soup",
+            "time_minutes": 10,
+            "price": "2.50",
+            "description": "Hot.",
+        },
+                               format="json")
+        recipe_id = res.data["id"]
+        url = reverse("recipe:recipe-detail", args=[recipe_id])
+        self.client.patch(url, {"title": "Stew"}, format="json")
+        self.client.delete(url)
+
+        events = list(
+            OutboxEvent.objects.order_by("id").values_list(
+                "aggregate", "aggregate_id", "event_type"))
+        self.assertEqual(events, [
+            ("recipe", recipe_id, "created"),
+            ("recipe", recipe_id, "updated"),
+            ("recipe", recipe_id, "deleted"),
+        ])
+        updated = OutboxEvent.objects.get(event_type="updated")
+        self.assertEqual(updated.payload["title"], "Stew")
+        self.assertEqual(updated.user_id, self.user.id)
+
+    def test_nested_tags_and_ingredients_created(self):
+        """Test tags and ingredients created with a recipe are recorded."""
+        Tag.objects.create(user=self.user, name="Vegan")
+
+        res = self.client.post(RECIPES_URL, {
+            "title": "Soup",
+            "time_minutes": 10,
+            "price": "2.50",
+            "description": "Hot.",
+            "tags": [{"name": "Vegan"}, {"name": "Quick"}],
+            "ingredients": [{"name": "Leek"}],
+        },
+                               format="json")
+
+        events = OutboxEvent.objects.filter(
+            event_type="created").exclude(aggregate="recipe")
+        quick = Tag.objects.get(name="Quick")
+        leek = Ingredient.objects.get(name="Leek")
+        self.assertEqual(res.status_code, 201)
+        self.assertCountEqual(
+            [(event.aggregate, event.aggregate_id, event.payload)
+             for event in events],
+            [("tag", quick.id, {"id": quick.id, "name": "Quick"}),
+             ("ingredient", leek.id, {"id": leek.id, "name": "Leek"})])
+
+    def test_tag_update_and_delete(self):
+        """Test tag changes are recorded."""
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        url = reverse("recipe:tag-detail", args=[tag.id])
+
+        self.client.patch(url, {"name": "Vegetarian"})
+        self.client.delete(url)
+
+        self.assertEqual(
+            list(OutboxEvent.objects.order_by("id").values_list(
+                "aggregate", "event_type")),
+            [("tag", "updated"), ("tag", "deleted")],
+        )
+
+    def test_failed_request_writes_no_event(self):
+        """Test invalid requests leave the outbox untouched."""
+        self.client.post(RECIPES_URL, {"title": "No price"}, format="json")
+
+        self.assertFalse(OutboxEvent.objects.exists())
+
+
+class RelayTests(TestCase):
+    """Test relaying events to sinks."""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            email="user@example.com", password="test123")
+        self.recipe = Recipe.objects.create(user=user,
+                                            title="Soup",
+                                            time_minutes=5,
+                                            price=Decimal("1.00"))
+
+    def test_relay_batches_in_order(self):
+        """Test events are delivered in ID order and marked delivered."""
+        for _ in range(3):
+            outbox.record(self.recipe, outbox.UPDATED)
+        sink = ListSink()
+
+        self.assertEqual(outbox.relay(sink, batch_size=2), 2)
+        self.assertEqual(outbox.relay(sink, batch_size=2), 1)
+        self.assertEqual(outbox.relay(sink, batch_size=2), 0)
+
+        ids = [event["id"] for event in sink.events]
+        self.assertEqual(ids, sorted(ids))
+        self.assertFalse(
+            OutboxEvent.objects.filter(delivered_at__isnull=True).exists())
+
+    def test_failed_delivery_keeps_events_pending(self):
+        """Test a failing sink leaves the batch for the next attempt."""
+        outbox.record(self.recipe, outbox.UPDATED)
+
+        with self.assertRaises(OSError):
+            outbox.relay(FailingSink())
+
+        self.assertTrue(
+            OutboxEvent.objects.filter(delivered_at__isnull=True).exists())
+
+    def test_relay_command_file_sink(self):
+        """Test the command drains the outbox into a JSON lines file."""
+        outbox.record(self.recipe, outbox.CREATED)
+        outbox.record(self.recipe, outbox.DELETED)
+        fd, path = tempfile.mkstemp(suffix=".jsonl")
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+
+        call_command("relay_outbox",
+                     sink=f"file:{path}",
+                     once=True,
+                     stderr=io.StringIO())
+
+        with open(path) as stream:
+            lines = [json.loads(line) for line in stream]
+        self.assertEqual([line["event_type"] for line in lines],
+                         ["created", "deleted"])
+
+    def test_http_sink(self):
+        """Test the HTTP sink posts batches as JSON arrays."""
+        received = []
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_POST(self):
+                length = int(self.headers["Content-Length"])
+                received.append(json.loads(self.rfile.read(length)))
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(("127.0.0.1", 0), Handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        outbox.record(self.recipe, outbox.UPDATED)
+
+        sink = outbox.get_sink(f"http://127.0.0.1:{server.server_port}/")
+        outbox.relay(sink)
+
+        self.assertEqual(len(received), 1)
+        self.assertEqual(received[0][0]["aggregate_id"], self.recipe.id)
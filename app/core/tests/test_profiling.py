@@ -0,0 +1,152 @@
+"""Tests for the per-request profiling middleware."""
+
+import asyncio
+import os
+import re
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import profiling
+from core.log import RequestIDMiddleware
+from core.metrics import MetricsMiddleware
+from core.profiling import ProfilingMiddleware
+from core.slow_queries import SlowQueryMiddleware
+from core.models import Recipe, Tag
+
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+class SectionTests(TestCase):
+    """Test timing sections outside of a request."""
+
+    def test_section_without_profile(self):
+        """Test sections do nothing when no request is profiled."""
+        with profiling.section("render"):
+            self.assertIsNone(profiling.current())
+
+    def test_nested_sections_counted_once(self):
+        """Test nested sections with the same name are not added twice."""
+        profile = profiling.Profile()
+        token = profiling._current.set(profile)
+        try:
+            with profiling.section("serialize"):
+                with profiling.section("serialize"):
+                    pass
+                outer = dict(profile.timings)
+        finally:
+            profiling._current.reset(token)
+        self.assertEqual(outer, {})
+        self.assertGreater(profile.timings["serialize"], 0)
+
+
+@override_settings(PROFILING_TOKEN="secret", PROFILING_SAMPLE_RATE=0)
+class ProfilingMiddlewareTests(TestCase):
+    """Test profiled API requests."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "user@example.com", "testpass123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        recipe = Recipe.objects.create(user=self.user,
+                                       title="Soup",
+                                       time_minutes=10,
+                                       price="5.00")
+        recipe.tags.add(Tag.objects.create(user=self.user, name="Vegan"))
+
+    def test_not_profiled_by_default(self):
+        """Test no Server-Timing header without the header or sampling."""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertNotIn("Server-Timing", res)
+
+    def test_wrong_token_ignored(self):
+        """Test a header not matching the token is ignored."""
+        res = self.client.get(RECIPES_URL, HTTP_X_PROFILE="guess")
+
+        self.assertNotIn("Server-Timing", res)
+
+        res = self.client.get(RECIPES_URL, HTTP_X_PROFILE="sécret")
+
+        self.assertEqual(res.status_code, 200)
+        self.assertNotIn("Server-Timing", res)
+
+    def test_profiled_with_token(self):
+        """Test the breakdown is returned and logged."""
+        with self.assertLogs("core.profiling", "INFO") as logs:
+            res = self.client.get(RECIPES_URL, HTTP_X_PROFILE="secret")
+
+        timing = res["Server-Timing"]
+        names = re.findall(r"(\w+);dur=", timing)
+        self.assertEqual(names, list(profiling.TIMINGS))
+        queries = int(re.search(r'desc="(\d+) queries"', timing).group(1))
+        self.assertGreater(queries, 0)
+        profile = logs.records[0].profile
+        self.assertEqual(profile["sql_count"], queries)
+        self.assertGreater(profile["serialize_ms"], 0)
+        self.assertGreater(profile["render_ms"], 0)
+        self.assertGreaterEqual(profile["total_ms"], profile["sql_ms"])
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sampled(self):
+        """Test sampled requests are profiled without the header."""
+        with self.assertLogs("core.profiling", "INFO"):
+            res = self.client.get(reverse("recipe:tag-list"))
+
+        self.assertIn("Server-Timing", res)
+
+    def test_dump(self):
+        """Test a cProfile dump is written when a directory is set."""
+        with tempfile.TemporaryDirectory() as directory:
+            with self.settings(PROFILING_DUMP_DIR=directory), \
+                    self.assertLogs("core.profiling", "INFO"):
+                self.client.get(RECIPES_URL, HTTP_X_PROFILE="secret")
+
+            dumps = os.listdir(directory)
+        self.assertEqual(len(dumps), 1)
+        self.assertTrue(dumps[0].endswith("-GET-api-recipe-recipes.prof"))
+
+
+@override_settings(PROFILING_TOKEN="secret", PROFILING_SAMPLE_RATE=0)
+class AsyncMiddlewareTests(TestCase):
+    """Test the request middleware when served async."""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user("user@example.com",
+                                                    "testpass123")
+        Recipe.objects.create(user=user,
+                              title="Soup",
+                              time_minutes=10,
+                              price="5.00")
+        self.token = Token.objects.create(user=user).key
+
+    def test_async_capable(self):
+        """Test the middleware stays async in an async chain."""
+
+        async def get_response(request):
+            return HttpResponse()
+
+        for middleware in (MetricsMiddleware, ProfilingMiddleware,
+                           RequestIDMiddleware, SlowQueryMiddleware):
+            self.assertTrue(
+                asyncio.iscoroutinefunction(middleware(get_response)))
+
+    async def test_queries_seen_from_event_loop(self):
+        """Test queries run via sync_to_async reach the profile."""
+        with self.assertLogs("core.profiling", "INFO") as logs:
+            # Extra arguments are raw ASGI header names in Django 3.2.
+            res = await AsyncClient().get(
+                reverse("recipe:async-recipe-list"), **{
+                    "authorization": f"Token {self.token}",
+                    "x-profile": "secret",
+                })
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res["X-Request-ID"])
+        self.assertGreater(logs.records[0].profile["sql_count"], 0)
@@ -0,0 +1,89 @@
+"""Tests for the pre-rendered OpenAPI schema."""
+
+import gzip
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from core.schema import load_schema
+
+SCHEMA_URL = reverse("api_schema")
+
+
+class SchemaViewTests(SimpleTestCase):
+    """Test rendering and serving the schema."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "schema.yml")
+        load_schema.cache_clear()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        load_schema.cache_clear()
+
+    def test_render_and_serve(self):
+        """Test the rendered file is served with an ETag."""
+        call_command("render_schema", file=self.path, stdout=StringIO())
+        with open(self.path, "rb") as f:
+            content = f.read()
+
+        with override_settings(OPENAPI_SCHEMA_PATH=self.path):
+            res = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, content)
+        self.assertIn(b"/api/recipe/recipes/", content)
+        self.assertTrue(res["ETag"])
+
+    def test_gzip_and_not_modified(self):
+        """Test gzip is used when accepted and ETags give a 304."""
+        with open(self.path, "wb") as f:
+            f.write(b"openapi: 3.0.3\n")
+
+        with override_settings(OPENAPI_SCHEMA_PATH=self.path):
+            res = self.client.get(SCHEMA_URL, HTTP_ACCEPT_ENCODING="gzip")
+            cached = self.client.get(SCHEMA_URL,
+                                     HTTP_IF_NONE_MATCH=res["ETag"])
+
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(res.content), b"openapi: 3.0.3\n")
+        self.assertEqual(cached.status_code, 304)
+
+    @override_settings(DEBUG=False)
+    def test_missing_file_without_debug(self):
+        """Test a missing schema is an error outside DEBUG."""
+        with override_settings(OPENAPI_SCHEMA_PATH=self.path):
+            res = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res.status_code, 503)
+
+    @override_settings(DEBUG=False)
+    def test_file_rendered_after_miss(self):
+        """Test a miss is not cached once the file is rendered."""
+        with override_settings(OPENAPI_SCHEMA_PATH=self.path):
+            missing = self.client.get(SCHEMA_URL)
+            with open(self.path, "wb") as f:
+                f.write(b"openapi: 3.0.3\n")
+            res = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(missing.status_code, 503)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, b"openapi: 3.0.3\n")
+
+    @override_settings(DEBUG=True)
+    def test_live_in_debug(self):
+        """Test the schema is generated live in DEBUG, file or not."""
+        with override_settings(OPENAPI_SCHEMA_PATH=self.path):
+            missing = self.client.get(SCHEMA_URL)
+            with open(self.path, "wb") as f:
+                f.write(b"openapi: 3.0.3\n")
+            stale = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(missing.status_code, 200)
+        self.assertIn(b"openapi", missing.content)
+        self.assertIn(b"/api/recipe/recipes/", stale.content)
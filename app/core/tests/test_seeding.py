@@ -0,0 +1,144 @@
+"""Tests for synthetic data generation and the load-test runner."""
+
+import io
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, SimpleTestCase
+
+from core import loadtest, seeding
+from core.loadtest import Step
+from core.management.commands.load_test import user_steps
+from core.models import Recipe, Tag, Ingredient
+
+
+class SeedTests(TestCase):
+    """Test the data generator."""
+
+    def test_seed_counts(self):
+        """Test the requested volumes are created and linked."""
+        totals = seeding.seed(3,
+                              recipes_per_user=4,
+                              tags_per_user=2,
+                              ingredients_per_user=5,
+                              tags_per_recipe=2,
+                              ingredients_per_recipe=3,
+                              users_per_batch=2)
+
+        self.assertEqual(totals, {
+            "users": 3,
+            "tags": 6,
+            "ingredients": 15,
+            "recipes": 12,
+            "links": 60
+        })
+        user = get_user_model().objects.get(email="seed-2@example.com")
+        self.assertTrue(user.check_password("seedpass123"))
+        recipe = Recipe.objects.filter(user=user).first()
+        self.assertEqual(recipe.tags.count(), 2)
+        self.assertEqual(set(recipe.ingredients.values_list("user_id",
+                                                            flat=True)),
+                         {user.id})
+        ingredient = Ingredient.objects.first()
+        self.assertTrue(ingredient.normalized_name)
+
+    def test_seed_is_reproducible(self):
+        """Test the same seed generates the same recipes."""
+        seeding.seed(1, recipes_per_user=5, prefix="a", random_seed=7)
+        seeding.seed(1, recipes_per_user=5, prefix="b", random_seed=7)
+
+        titles = [
+            list(
+                Recipe.objects.filter(
+                    user__email=f"{prefix}-0@example.com").order_by(
+                        "id").values_list("title", "time_minutes", "price"))
+            for prefix in ("a", "b")
+        ]
+        self.assertEqual(titles[0], titles[1])
+
+    def test_command(self):
+        """Test the seed_data command reports what it created."""
+        out = io.StringIO()
+
+        call_command("seed_data", users=2, recipes_per_user=3, stdout=out)
+
+        self.assertIn("Created 2 users", out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command("seed_data", users=2, stdout=io.StringIO())
+
+    def test_user_steps(self):
+        """Test scenario steps only use the user's own objects."""
+        seeding.seed(2, recipes_per_user=3, tags_per_user=2)
+        user = get_user_model().objects.get(email="seed-1@example.com")
+
+        steps = user_steps(user)
+
+        own = set(Recipe.objects.filter(user=user).values_list("id",
+                                                               flat=True))
+        details = [s for s in steps if s.name == "recipe detail"]
+        self.assertEqual({int(s.path.split("/")[-2])
+                          for s in details}, own)
+        tags = [s for s in steps if s.name == "recipe list by tag"]
+        self.assertEqual(len(tags), Tag.objects.filter(user=user).count())
+
+
+class ScenarioTests(SimpleTestCase):
+    """Test the scenario runner against a stub server."""
+
+    def setUp(self):
+        self.seen = []
+        seen = self.seen
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _reply(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                self.rfile.read(length)
+                seen.append((self.command, self.path))
+                status = 404 if self.path == "/missing/" else 200
+                self.send_response(status)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+            do_GET = do_PATCH = _reply
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.base_url = f"http://127.0.0.1:{server.server_port}"
+
+    def test_run_scenario(self):
+        """Test weighted steps are reported per name with errors."""
+        steps = [
+            Step("list", "GET", "/list/", None, 3),
+            Step("update", "PATCH", "/item/", {"a": 1}, 1),
+            Step("missing", "GET", "/missing/", None, 1),
+        ]
+
+        result = loadtest.run_scenario(self.base_url, [(steps, {})] * 2,
+                                       duration=0.3)
+
+        breakdown = result.breakdown()
+        self.assertGreater(breakdown["list"]["requests"],
+                           breakdown["update"]["requests"])
+        self.assertEqual(breakdown["missing"]["requests"], 0)
+        self.assertGreater(breakdown["missing"]["errors"], 0)
+        self.assertIn(("PATCH", "/item/"), self.seen)
+
+    def test_run_cycles_paths(self):
+        """Test the plain GET runner still cycles through its paths."""
+        result = loadtest.run(self.base_url, ["/a/", "/b/"],
+                              concurrency=1,
+                              duration=0.2)
+
+        self.assertGreater(result.requests, 1)
+        self.assertEqual(set(result.by_name), {"/a/", "/b/"})
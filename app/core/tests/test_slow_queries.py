@@ -0,0 +1,100 @@
+"""Tests for the slow-query log and report."""
+
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import slow_queries
+
+
+class FingerprintTests(SimpleTestCase):
+    """Test query normalization."""
+
+    def test_parameters_ignored(self):
+        """Test queries differing only in literals share a fingerprint."""
+        self.assertEqual(
+            slow_queries.fingerprint(
+                "SELECT * FROM t WHERE a = 'x' AND b = 1 AND c IN (%s, %s)"),
+            slow_queries.fingerprint(
+                "SELECT  *  FROM t WHERE a = 'y''z' AND b = 22 AND c IN (%s)"))
+
+    def test_shapes_differ(self):
+        """Test different queries get different fingerprints."""
+        self.assertNotEqual(
+            slow_queries.fingerprint("SELECT a FROM t WHERE b = %s"),
+            slow_queries.fingerprint("SELECT a FROM t WHERE c = %s"))
+
+    def test_normalize(self):
+        self.assertEqual(
+            slow_queries.normalize(
+                'SELECT "t1"."id" FROM "t1" WHERE "id" IN (%s, %s) '
+                "LIMIT 21"),
+            'SELECT "t1"."id" FROM "t1" WHERE "id" IN (...) LIMIT ?')
+
+
+@override_settings(SLOW_QUERY_MS=0, SLOW_QUERY_EXPLAIN_RATE=1)
+class SlowQueryLogTests(TestCase):
+    """Test slow queries are logged from requests."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "slow.jsonl")
+        user = get_user_model().objects.create_user("user@example.com",
+                                                    "testpass123")
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_queries_logged(self):
+        """Test queries over the threshold are logged with their view."""
+        with self.settings(SLOW_QUERY_LOG=self.path), \
+                self.assertLogs("core.slow_queries", "WARNING"):
+            self.client.get(reverse("recipe:recipe-list"))
+
+        records = list(slow_queries.read([self.path]))
+        self.assertTrue(records)
+        selects = [
+            entry for entry in records
+            if entry["sql"].startswith("SELECT")
+            and "core_recipe" in entry["sql"]
+        ]
+        entry = selects[0]
+        self.assertEqual(entry["view"], "recipe:recipe-list")
+        self.assertEqual(entry["method"], "GET")
+        self.assertTrue(entry["stack"])
+        self.assertIn("CORE_RECIPE", entry["explain"].upper())
+
+    @override_settings(SLOW_QUERY_MS=None)
+    def test_disabled(self):
+        """Test nothing is logged without a threshold."""
+        with self.settings(SLOW_QUERY_LOG=self.path):
+            self.client.get(reverse("recipe:recipe-list"))
+
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_report(self):
+        """Test the report groups queries by fingerprint."""
+        with self.settings(SLOW_QUERY_LOG=self.path), \
+                self.assertLogs("core.slow_queries", "WARNING"):
+            self.client.get(reverse("recipe:recipe-list"))
+            self.client.get(reverse("recipe:recipe-list"))
+        out = StringIO()
+
+        call_command("slow_query_report", self.path, "--json", stdout=out)
+
+        groups = json.loads(out.getvalue())
+        counts = [group["count"] for group in groups]
+        self.assertEqual(sum(counts),
+                         len(list(slow_queries.read([self.path]))))
+        self.assertIn(2, counts)
+        totals = [group["total_ms"] for group in groups]
+        self.assertEqual(totals, sorted(totals, reverse=True))
@@ -0,0 +1,45 @@
+"""Tests for the startup helpers."""
+
+from unittest.mock import patch
+
+from django.http import HttpResponse
+from django.test import SimpleTestCase, RequestFactory, override_settings
+
+from core import startup
+from core.apps import CoreConfig
+import core
+
+
+class StartupTests(SimpleTestCase):
+    """Test lazy views and URL resolver warming."""
+
+    @patch("core.startup.import_string")
+    def test_lazy_view_imports_on_first_request(self, patched_import):
+        """Test the view class is imported once, when first called."""
+        patched_import.return_value.as_view.return_value = (
+            lambda request: HttpResponse("ok"))
+        view = startup.lazy_view("some.module.View", url_name="x")
+        patched_import.assert_not_called()
+
+        request = RequestFactory().get("/")
+        view(request)
+        view(request)
+
+        patched_import.assert_called_once_with("some.module.View")
+        patched_import.return_value.as_view.assert_called_once_with(
+            url_name="x")
+
+    def test_warm_url_resolver(self):
+        """Test warming populates the resolver's reverse lookups."""
+        resolver = startup.warm_url_resolver()
+
+        self.assertTrue(resolver._populated)
+        self.assertIn("api_root", resolver.reverse_dict)
+
+    @override_settings(WARM_URLCONF_ON_STARTUP=True)
+    @patch("core.startup.warm_url_resolver")
+    def test_ready_warms_when_enabled(self, patched_warm):
+        """Test CoreConfig.ready warms the resolver when configured."""
+        CoreConfig("core", core).ready()
+
+        patched_warm.assert_called_once()
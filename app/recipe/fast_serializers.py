@@ -0,0 +1,163 @@
+"""
+Read-only serializers for hot list endpoints.
+
+A `FastSerializer` mirrors the output of a DRF `ModelSerializer` but
+builds plain dicts straight from `.values()` rows and one query per
+nested many-to-many field. The field plan is compiled once per class
+from the DRF serializer's fields.
+"""
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import QuerySet
+from rest_framework import serializers
+
+from core import profiling
+from recipe.serializers import RecipeSerializer
+
+# Keeps `IN (...)` lists under SQLite's bound parameter limit.
+IN_BATCH_SIZE = 900
+
+# Fields whose to_representation is a no-op for values read from the DB.
+_IDENTITY_FIELDS = (
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.BooleanField,
+)
+
+
+def _converter(field):
+    """Return a value converter for a scalar DRF field, or None."""
+    if type(field) in _IDENTITY_FIELDS:
+        return None
+    return field.to_representation
+
+
+class FastSerializer:
+    """Serialize model rows with the output of `serializer_class`."""
+
+    serializer_class = None
+
+    def __init__(self, source, context=None, fields=None):
+        self.source = source
+        self.context = context or {}
+        self.fields = fields
+
+    @classmethod
+    def get_plan(cls):
+        """Compile and cache the field plan for this class."""
+        plan = cls.__dict__.get("_plan")
+        if plan is None:
+            plan = cls._compile(cls.serializer_class)
+            cls._plan = plan
+        return plan
+
+    @classmethod
+    def _compile(cls, serializer_class):
+        """Return [(name, kind, column, extra)] for the serializer."""
+        serializer = serializer_class()
+        model = serializer.Meta.model
+        plan = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            model_field = model._meta.get_field(field.source)
+            if isinstance(field, serializers.ListSerializer):
+                child_plan = cls._compile(type(field.child))
+                plan.append((name, "m2m", model_field, child_plan))
+            elif isinstance(field, serializers.FileField):
+                plan.append((name, "file", model_field.attname,
+                             model_field.storage))
+            elif isinstance(field, serializers.ModelSerializer) or isinstance(
+                    field, serializers.SerializerMethodField):
+                raise ImproperlyConfigured(
+                    f"{cls.__name__} cannot compile field {name!r}.")
+            else:
+                plan.append(
+                    (name, "scalar", model_field.attname, _converter(field)))
+        return plan
+
+    def _selected_plan(self):
+        plan = self.get_plan()
+        if self.fields is None:
+            return plan
+        return [entry for entry in plan if entry[0] in self.fields]
+
+    def _rows(self, columns):
+        """Return the source as a list of {column: value} dicts."""
+        if isinstance(self.source, QuerySet):
+            return list(
+                self.source.prefetch_related(None).values(*columns))
+        return [{column: getattr(obj, column)
+                 for column in columns}
+                for obj in self.source]
+
+    def _related(self, model_field, child_plan, ids):
+        """Return {pk: [child dicts]} for a many-to-many field."""
+        through = model_field.remote_field.through
+        source_name = model_field.m2m_field_name()
+        target_name = model_field.m2m_reverse_field_name()
+        lookups = [
+            f"{target_name}__{column}" for _, _, column, _ in child_plan
+        ]
+        related = {pk: [] for pk in ids}
+        for start in range(0, len(ids), IN_BATCH_SIZE):
+            # Nested items come out in the order of the through table's
+            # (source, target) unique index, as with `instance.tags.all()`.
+            rows = through.objects.filter(**{
+                f"{source_name}__in": ids[start:start + IN_BATCH_SIZE]
+            }).order_by(f"{source_name}_id",
+                        f"{target_name}_id").values_list(
+                            f"{source_name}_id", *lookups)
+            for row in rows:
+                item = {}
+                for (name, _, _, convert), value in zip(child_plan, row[1:]):
+                    item[name] = (value if convert is None or value is None
+                                  else convert(value))
+                related[row[0]].append(item)
+        return related
+
+    @property
+    def data(self):
+        with profiling.section("serialize"):
+            return self._serialize()
+
+    def _serialize(self):
+        plan = self._selected_plan()
+        columns = ["pk"] + [
+            column for _, kind, column, _ in plan if kind != "m2m"
+        ]
+        rows = self._rows(columns)
+        ids = [row["pk"] for row in rows]
+        related = {
+            name: self._related(model_field, child_plan, ids)
+            for name, kind, model_field, child_plan in plan
+            if kind == "m2m"
+        }
+        request = self.context.get("request")
+
+        result = []
+        for row in rows:
+            item = {}
+            for name, kind, column, extra in plan:
+                if kind == "scalar":
+                    value = row[column]
+                    item[name] = (value if extra is None or value is None
+                                  else extra(value))
+                elif kind == "m2m":
+                    item[name] = related[name][row["pk"]]
+                elif row[column]:
+                    # Instances hold a FieldFile, `.values()` the name.
+                    url = extra.url(getattr(row[column], "name",
+                                            row[column]))
+                    item[name] = (request.build_absolute_uri(url)
+                                  if request is not None else url)
+                else:
+                    item[name] = None
+            result.append(item)
+        return result
+
+
+class RecipeListSerializer(FastSerializer):
+    """Fast, read-only equivalent of `RecipeSerializer` for lists."""
+
+    serializer_class = RecipeSerializer
@@ -0,0 +1,119 @@
+"""
+Nutrition and ingredient cost totals of recipes.
+
+Totals for any number of recipes are computed from one query with NumPy:
+amounts are converted to grams through an ingredients x units
+conversion matrix, multiplied by their ingredient's row of the
+ingredients x nutrients matrix of the `NutritionProfile` table, and
+summed per recipe.
+
+Amounts that can't be converted (no quantity, no profile, or pieces of
+an ingredient without a piece weight) are left out and the recipe's
+totals are marked incomplete.
+"""
+
+import numpy as np
+
+from core.models import RecipeIngredient
+
+Unit = RecipeIngredient.Unit
+
+# Per 100 g in the profile table, in this order in the result.
+NUTRIENTS = ("calories", "protein", "fat", "carbohydrates", "price")
+
+UNITS = tuple(Unit.values)
+UNIT_INDEX = {unit: index for index, unit in enumerate(UNITS)}
+
+_GRAMS = {
+    Unit.GRAM: 1,
+    Unit.KILOGRAM: 1000,
+    Unit.MILLIGRAM: 0.001,
+    Unit.OUNCE: 28.349523125,
+    Unit.POUND: 453.59237,
+}
+_MILLILITRES = {
+    Unit.MILLILITRE: 1,
+    Unit.LITRE: 1000,
+    Unit.TEASPOON: 4.92892159375,
+    Unit.TABLESPOON: 14.78676478125,
+    Unit.CUP: 240,
+}
+# Grams and millilitres per unit; zero for units of the other kind.
+MASS = np.array([_GRAMS.get(unit, 0) for unit in UNITS], dtype=float)
+VOLUME = np.array([_MILLILITRES.get(unit, 0) for unit in UNITS], dtype=float)
+PIECE = np.array([unit == Unit.PIECE for unit in UNITS])
+
+_PROFILE = tuple(f"ingredient__nutrition__{name}"
+                 for name in NUTRIENTS + ("density", "piece_weight"))
+
+
+def conversion_matrix(density, piece_weight):
+    """Return grams per unit, one row per ingredient, one column per unit.
+
+    NaN marks conversions that can't be made.
+    """
+    pieces = np.where(PIECE, piece_weight[:, None], 0.0)
+    return MASS + np.outer(density, VOLUME) + pieces
+
+
+def empty():
+    """Return the totals of a recipe without ingredients."""
+    return {
+        **dict.fromkeys(NUTRIENTS, 0.0),
+        "weight": 0.0,
+        "complete": True,
+    }
+
+
+def compute(rows, recipe_ids):
+    """Return {recipe_id: totals} from link rows with their profiles.
+
+    Each row is (recipe_id, ingredient_id, quantity, unit, *profile) with
+    the profile fields in `_PROFILE` order, None when missing.
+    """
+    result = {pk: empty() for pk in recipe_ids}
+    if not rows:
+        return result
+    columns = list(zip(*rows))
+    recipes, recipe_index = np.unique(np.array(columns[0]),
+                                      return_inverse=True)
+    _, first, ingredient_index = np.unique(np.array(columns[1]),
+                                           return_index=True,
+                                           return_inverse=True)
+    # None becomes NaN.
+    quantity = np.array(columns[2], dtype=float)
+    unit_index = np.array([UNIT_INDEX.get(unit, -1) for unit in columns[3]])
+    profile = np.array(columns[4:], dtype=float).T[first]
+    per_gram = profile[:, :len(NUTRIENTS)] / 100
+    density, piece_weight = profile[:, -2], profile[:, -1]
+
+    grams = quantity * conversion_matrix(density, piece_weight)[
+        ingredient_index, unit_index]
+    known = (unit_index >= 0) & ~np.isnan(grams) & ~np.isnan(
+        per_gram[ingredient_index, 0])
+
+    # Summed per link, so memory grows with the links rather than with
+    # recipes x ingredients.
+    rows = recipe_index[known]
+    totals = np.zeros((len(recipes), len(NUTRIENTS)))
+    np.add.at(totals, rows, grams[known, None] *
+              np.nan_to_num(per_gram[ingredient_index[known]]))
+    weights = np.bincount(rows, weights=grams[known], minlength=len(recipes))
+    missing = np.bincount(recipe_index[~known], minlength=len(recipes))
+
+    for row, pk in enumerate(recipes.tolist()):
+        result[pk] = {
+            **dict(zip(NUTRIENTS, totals[row].tolist())),
+            "weight": float(weights[row]),
+            "complete": not missing[row],
+        }
+    return result
+
+
+def totals(recipe_ids):
+    """Return {recipe_id: totals} for the recipes, with one query."""
+    recipe_ids = list(recipe_ids)
+    rows = RecipeIngredient.objects.filter(
+        recipe_id__in=recipe_ids).values_list("recipe_id", "ingredient_id",
+                                              "quantity", "unit", *_PROFILE)
+    return compute(list(rows), recipe_ids)
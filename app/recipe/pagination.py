@@ -0,0 +1,157 @@
+"""
+Keyset pagination for recipe lists.
+
+Pages continue from the sort key of the last row of the previous page
+(`WHERE (price, id) > (last price, last id)`) instead of skipping rows
+with OFFSET, so every page is a short index range scan however deep the
+client pages. The queryset's ordering must end with a unique field.
+"""
+
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def after(ordering, values):
+    """Return a filter for rows sorting after `values` in `ordering`.
+
+    Written as `a >= x AND (a > x OR ...)` so the leading column can
+    bound the index scan.
+    """
+    condition = None
+    for field, value in reversed(list(zip(ordering, values))):
+        name = field.lstrip("-")
+        op = "lt" if field.startswith("-") else "gt"
+        strict = Q(**{f"{name}__{op}": value})
+        condition = strict if condition is None else Q(
+            **{f"{name}__{op}e": value}) & (strict | condition)
+    return condition
+
+
+class KeysetPagination(BasePagination):
+    """Opt-in keyset pagination, used when a `limit` is given."""
+
+    limit_query_param = "limit"
+    cursor_query_param = "cursor"
+    max_limit = 1000
+    invalid_cursor_message = "Invalid cursor."
+
+    def get_limit(self, request):
+        value = request.query_params.get(self.limit_query_param)
+        if value is None:
+            return None
+        try:
+            limit = int(value)
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            raise ValidationError(
+                {self.limit_query_param: "Must be a positive integer."})
+        return min(limit, self.max_limit)
+
+    def encode_cursor(self, values):
+        data = json.dumps(list(values), default=str).encode()
+        return base64.urlsafe_b64encode(data).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (binascii.Error, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.fields):
+            raise NotFound(self.invalid_cursor_message)
+        # Values go into SQL comparisons, so they must be valid for
+        # their column, as if they were being saved.
+        try:
+            values = [
+                field.to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+            for field, value in zip(self.fields, values):
+                if value is None:
+                    raise ValueError(value)
+                field.run_validators(value)
+        except (DjangoValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return the page as a sliced queryset, or None if unpaginated."""
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.request = request
+        self.ordering = queryset.query.order_by
+        self.fields = [
+            queryset.model._meta.get_field(field.lstrip("-"))
+            for field in self.ordering
+        ]
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(
+                after(self.ordering, self.decode_cursor(cursor)))
+        # The keys of the last row and whether another row follows.
+        edge = list(
+            queryset.values_list(*(field.lstrip("-")
+                                   for field in self.ordering))
+            [self.limit - 1:self.limit + 1])
+        self.next_values = edge[0] if len(edge) == 2 else None
+        return queryset[:self.limit]
+
+    def get_next_link(self):
+        if self.next_values is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(),
+                                   self.cursor_query_param,
+                                   self.encode_cursor(self.next_values))
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "oneOf": [
+                schema,
+                {
+                    "type": "object",
+                    "properties": {
+                        "next": {
+                            "type": "string",
+                            "format": "uri",
+                            "nullable": True,
+                        },
+                        "results": schema,
+                    },
+                },
+            ],
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.limit_query_param,
+                "required": False,
+                "in": "query",
+                "description": ("Number of results per page. Results are "
+                                "only paginated when this is given."),
+                "schema": {
+                    "type": "integer"
+                },
+            },
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Cursor from the previous page's `next`.",
+                "schema": {
+                    "type": "string"
+                },
+            },
+        ]
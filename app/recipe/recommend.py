@@ -0,0 +1,116 @@
+"""
+Recipe recommendations from shared ingredients.
+
+Each user's recipes are loaded into a sparse recipe x ingredient matrix
+in CSR form: `indices` holds the column of every ingredient link, with
+the links of recipe `i` at `indices[indptr[i]:indptr[i + 1]]`. Pantry
+coverage and Jaccard similarity for all recipes are then a handful of
+NumPy operations over the links instead of one query per recipe.
+
+Matrices are cached per user, keyed on when their `KitchenStats` row
+last changed: every recipe and ingredient change already updates that
+row, so a changed kitchen simply misses the cache.
+"""
+
+import numpy as np
+from django.core.cache import cache
+
+from core.models import KitchenStats, RecipeIngredient
+
+CACHE_TIMEOUT = 60 * 60
+
+
+class RecipeMatrix:
+    """Which ingredients each of a user's recipes uses."""
+
+    def __init__(self, recipe_ids, ingredient_ids, indptr, indices):
+        self.recipe_ids = recipe_ids
+        self.ingredient_ids = ingredient_ids
+        self.indptr = indptr
+        self.indices = indices
+        # Row of every link, and the number of links of every row.
+        self.counts = np.diff(indptr)
+        self.rows = np.repeat(np.arange(len(recipe_ids)), self.counts)
+
+    @classmethod
+    def from_links(cls, links):
+        """Build the matrix from (recipe_id, ingredient_id) pairs."""
+        pairs = np.array(links, dtype=np.int64).reshape(-1, 2)
+        recipe_ids, rows = np.unique(pairs[:, 0], return_inverse=True)
+        ingredient_ids, columns = np.unique(pairs[:, 1],
+                                            return_inverse=True)
+        order = np.argsort(rows, kind="stable")
+        indptr = np.zeros(len(recipe_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(recipe_ids)),
+                  out=indptr[1:])
+        return cls(recipe_ids, ingredient_ids, indptr, columns[order])
+
+    @classmethod
+    def build(cls, user_id):
+        """Load the matrix of the user's recipes with one query."""
+        links = RecipeIngredient.objects.filter(
+            recipe__user_id=user_id).values_list("recipe_id",
+                                                 "ingredient_id")
+        return cls.from_links(list(links))
+
+    def _column_mask(self, ingredient_ids):
+        return np.isin(self.ingredient_ids, np.asarray(ingredient_ids))
+
+    def _matches(self, mask):
+        """Return how many ingredients in `mask` each recipe uses."""
+        return np.bincount(self.rows[mask[self.indices]],
+                           minlength=len(self.recipe_ids))
+
+    def can_make(self, pantry, max_missing=None, limit=20):
+        """Rank recipes by the share of their ingredients in `pantry`.
+
+        Returns [(recipe_id, coverage, missing)] for recipes using at
+        least one pantry ingredient, best covered first.
+        """
+        matched = self._matches(self._column_mask(pantry))
+        missing = self.counts - matched
+        keep = matched > 0
+        if max_missing is not None:
+            keep &= missing <= max_missing
+        rows = np.flatnonzero(keep)
+        coverage = matched[rows] / self.counts[rows]
+        # Best coverage, then most matched, then newest.
+        order = np.lexsort(
+            (-self.recipe_ids[rows], -matched[rows], -coverage))[:limit]
+        return list(
+            zip(self.recipe_ids[rows[order]].tolist(),
+                coverage[order].tolist(), missing[rows[order]].tolist()))
+
+    def similar(self, recipe_id, limit=10):
+        """Return [(recipe_id, similarity)] by Jaccard index, best first.
+
+        Recipes sharing no ingredient with `recipe_id` are left out.
+        """
+        row = np.searchsorted(self.recipe_ids, recipe_id)
+        if row == len(self.recipe_ids) or self.recipe_ids[row] != recipe_id:
+            return []
+        mask = np.zeros(len(self.ingredient_ids), dtype=bool)
+        mask[self.indices[self.indptr[row]:self.indptr[row + 1]]] = True
+        shared = self._matches(mask)
+        shared[row] = 0
+        rows = np.flatnonzero(shared)
+        similarity = shared[rows] / (self.counts[rows] + self.counts[row] -
+                                     shared[rows])
+        order = np.lexsort((-self.recipe_ids[rows], -similarity))[:limit]
+        return list(
+            zip(self.recipe_ids[rows[order]].tolist(),
+                similarity[order].tolist()))
+
+
+def matrix(user_id):
+    """Return the user's matrix, from the cache when it is current."""
+    version = KitchenStats.objects.filter(user_id=user_id).values_list(
+        "updated_at", flat=True).first()
+    if version is None:
+        return RecipeMatrix.build(user_id)
+    key = f"recipe-matrix:{user_id}:{version.timestamp()}"
+    result = cache.get(key)
+    if result is None:
+        result = RecipeMatrix.build(user_id)
+        cache.set(key, result, CACHE_TIMEOUT)
+    return result
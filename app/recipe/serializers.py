@@ -1,16 +1,27 @@
 #
 """Serializers foe recipe APIs."""
 
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
+from core import bitsets, kitchen, outbox
 from core.models import Ingredient  # Ensure the import is not missing
+from core.profiling import ProfiledSerializerMixin
 
 from core.models import (
     Tag,
     Recipe,
+    RecipeIngredient,
+    normalize_name,
 )
+from recipe import nutrition
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(ProfiledSerializerMixin,
+                           serializers.ModelSerializer):
     """Serializer fro ingredients."""
 
     class Meta:
@@ -19,7 +30,25 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ["id"]
 
 
-class TagSerializer(serializers.ModelSerializer):
+class RecipeIngredientSerializer(IngredientSerializer):
+    """Ingredient nested in a recipe, with the amount used."""
+
+    quantity = serializers.DecimalField(max_digits=8,
+                                        decimal_places=2,
+                                        min_value=Decimal(0),
+                                        required=False,
+                                        allow_null=True,
+                                        write_only=True)
+    unit = serializers.ChoiceField(choices=RecipeIngredient.Unit.choices,
+                                   required=False,
+                                   allow_blank=True,
+                                   write_only=True)
+
+    class Meta(IngredientSerializer.Meta):
+        fields = IngredientSerializer.Meta.fields + ["quantity", "unit"]
+
+
+class TagSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     """Serializer for tags."""
 
     class Meta:
@@ -33,11 +62,31 @@ class TagSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeTagSerializer(TagSerializer):
+    """Tag nested in a recipe; existing tags are matched by name."""
+
+    class Meta(TagSerializer.Meta):
+        # Reusing an existing tag name must not fail the unique check.
+        extra_kwargs = {"name": {"validators": []}}
+
+
+class DynamicFieldsMixin:
+    """Let callers restrict the serialized fields with `fields=`."""
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class RecipeSerializer(ProfiledSerializerMixin, DynamicFieldsMixin,
+                       serializers.ModelSerializer):
     """Serializer for recipes."""
 
-    tags = TagSerializer(many=True, required=False)
-    ingredients = IngredientSerializer(many=True, required=False)
+    tags = RecipeTagSerializer(many=True, required=False)
+    ingredients = RecipeIngredientSerializer(many=True, required=False)
     image = serializers.ImageField(required=False, allow_null=False)
 
     class Meta:
@@ -61,39 +110,121 @@ class RecipeSerializer(serializers.ModelSerializer):
                 return value
             return value
 
-    def _get_or_create_tags(self, tags, recipe):
-        """Handle getting ot creating tags as needed."""
-        auth_user = self.context["request"].user
-        for tag in tags:
-            tag_obj, _ = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,
-                # name=tag['name']
-            )
-
-            recipe.tags.add(tag_obj)
+    def _get_or_create(self, model, items):
+        """Return {normalized name: object} for the named items.
 
-    def _get_or_create_ingredients(self, ingredients, recipe):
-        """Handle getting or creating ingredients as needed."""
+        Missing objects are created. Names are matched on their
+        normalized form, so "tomatoes" reuses an existing "Tomato".
+        Tag names are unique across users, so a name taken by another
+        user is a validation error. Created objects get an outbox event.
+        """
         auth_user = self.context["request"].user
-        for ingredient in ingredients:
-            ingredient_obj, _ = Ingredient.objects.get_or_create(
-                user=auth_user,
-                **ingredient,
-                # name=ingredient['name']
-            )
-
-            recipe.ingredients.add(ingredient_obj)
+        names = {}
+        for item in items:
+            names.setdefault(normalize_name(item["name"]), item["name"])
+        found = {}
+        for obj in model.objects.filter(
+                user=auth_user, normalized_name__in=names).order_by("id"):
+            found.setdefault(obj.normalized_name, obj)
+        missing = [key for key in names if key not in found]
+        extra = [{}] * len(missing)
+        if missing and model is Ingredient:
+            # One allocation for all the new ingredients' bits.
+            extra = [{
+                "bit_index": index
+            } for index in Ingredient.allocate_bits(auth_user.pk,
+                                                    len(missing))]
+        for key, kwargs in zip(missing, extra):
+            try:
+                found[key] = model.objects.create(user=auth_user,
+                                                  name=names[key],
+                                                  **kwargs)
+            except IntegrityError:
+                # Callers run in a transaction, which this rolls back.
+                raise serializers.ValidationError({
+                    str(model._meta.verbose_name_plural):
+                    f"The name {names[key]!r} is already taken."
+                })
+            outbox.record(found[key], outbox.CREATED, {
+                "id": found[key].pk,
+                "name": found[key].name
+            })
+        return {key: found[key] for key in names}
+
+    def _set_related(self, recipe, field_name, model, items):
+        """Point a M2M field at the items, touching only changed rows."""
+        manager = getattr(recipe, field_name)
+        found = self._get_or_create(model, items)
+        wanted = [obj.pk for obj in found.values()]
+        current = set(
+            manager.through.objects.filter(**{
+                manager.source_field_name: recipe
+            }).values_list(f"{manager.target_field_name}_id", flat=True))
+
+        stale = current.difference(wanted)
+        missing = [pk for pk in wanted if pk not in current]
+        if stale:
+            manager.remove(*stale)
+        if missing:
+            manager.add(*missing)
+
+    def _set_ingredients(self, recipe, items):
+        """Link the ingredients with their amounts, touching changed rows.
+
+        The last amount given for an ingredient wins.
+        """
+        found = self._get_or_create(Ingredient, items)
+        wanted = {}
+        for item in items:
+            pk = found[normalize_name(item["name"])].pk
+            wanted[pk] = (item.get("quantity"), item.get("unit", ""))
+        recipe.ingredient_bits = bitsets.encode(
+            bitsets.to_int(obj.bit_index for obj in found.values()))
+        links = {
+            link.ingredient_id: link
+            for link in RecipeIngredient.objects.filter(recipe=recipe)
+        }
+
+        stale = [link.pk for pk, link in links.items() if pk not in wanted]
+        changed, missing = [], []
+        for pk, (quantity, unit) in wanted.items():
+            link = links.get(pk)
+            if link is None:
+                missing.append(
+                    RecipeIngredient(recipe=recipe,
+                                     ingredient_id=pk,
+                                     quantity=quantity,
+                                     unit=unit))
+            elif (link.quantity, link.unit) != (quantity, unit):
+                link.quantity, link.unit = quantity, unit
+                changed.append(link)
+        if stale:
+            RecipeIngredient.objects.filter(pk__in=stale).delete()
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ["quantity", "unit"])
+        if missing:
+            RecipeIngredient.objects.bulk_create(missing)
+        if stale or changed or missing:
+            # Direct writes send no m2m_changed for `touch_recipes`, the
+            # bitsets and the kitchen stats.
+            Recipe.objects.filter(pk=recipe.pk).update(
+                updated_at=timezone.now(),
+                ingredient_bits=recipe.ingredient_bits)
+        if stale or missing:
+            counts = dict.fromkeys(links.keys() - wanted.keys(), -1)
+            counts.update((link.ingredient_id, 1) for link in missing)
+            kitchen.record(recipe.user_id, ingredients=counts)
 
     def create(self, validated_data):
         """Create a recipe."""
         tags_data = validated_data.pop("tags", [])
         ingredients_data = validated_data.pop("ingredients", [])
         image = validated_data.pop("image", None)
-        recipe = Recipe.objects.create(**validated_data)
+        with transaction.atomic():
+            recipe = Recipe.objects.create(**validated_data)
 
-        self._get_or_create_tags(tags_data, recipe)
-        self._get_or_create_ingredients(ingredients_data, recipe)
+            self._set_related(recipe, "tags", Tag, tags_data)
+            self._set_ingredients(recipe, ingredients_data)
 
         if image:
             recipe.image = image
@@ -102,26 +233,69 @@ class RecipeSerializer(serializers.ModelSerializer):
         return recipe
 
     def update(self, instance, validated_data):
-        """Update a recipe."""
+        """Update a recipe, saving it once and diffing tags/ingredients."""
         tags_data = validated_data.pop("tags", None)
         ingredients_data = validated_data.pop("ingredients", None)
 
-        instance = super().update(instance, validated_data)
+        # No savepoint: callers roll back the whole transaction on error.
+        with transaction.atomic(savepoint=False):
+            if tags_data is not None:
+                self._set_related(instance, "tags", Tag, tags_data)
+            if ingredients_data is not None:
+                self._set_ingredients(instance, ingredients_data)
+
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            if validated_data:
+                instance.save(update_fields=list(validated_data) +
+                              ["updated_at"])
 
-        if tags_data is not None:
-            instance.tags.clear()
-            instance.save()
-            self._get_or_create_tags(tags_data, instance)
+        return instance
 
-        if ingredients_data is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients_data, instance)
 
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
+class NutritionSerializer(serializers.Serializer):
+    """Nutrition and ingredient cost totals of a recipe."""
 
-        instance.save()
-        return instance
+    calories = serializers.FloatField(help_text="kcal")
+    protein = serializers.FloatField(help_text="Grams.")
+    fat = serializers.FloatField(help_text="Grams.")
+    carbohydrates = serializers.FloatField(help_text="Grams.")
+    cost = serializers.DecimalField(max_digits=10,
+                                    decimal_places=2,
+                                    source="price")
+    weight = serializers.FloatField(help_text="Grams.")
+    complete = serializers.BooleanField(
+        help_text="False when some amounts could not be converted.")
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        for name in ("calories", "protein", "fat", "carbohydrates", "weight"):
+            data[name] = round(data[name], 1)
+        return data
+
+
+class RecipeNutritionSerializer(NutritionSerializer):
+    """Nutrition totals with the recipe ID, for the bulk endpoint."""
+
+    id = serializers.IntegerField()
+
+
+class RecipeMatchSerializer(serializers.Serializer):
+    """Recipe with how much of it a pantry covers."""
+
+    recipe = RecipeSerializer()
+    coverage = serializers.FloatField(
+        help_text="Share of the recipe's ingredients in the pantry.")
+    missing = serializers.IntegerField(
+        help_text="Number of the recipe's ingredients not in the pantry.")
+
+
+class SimilarRecipeSerializer(serializers.Serializer):
+    """Recipe with how similar its ingredients are to another's."""
+
+    recipe = RecipeSerializer()
+    similarity = serializers.FloatField(
+        help_text="Jaccard index of the two ingredient sets.")
 
 
 class RecipeDetailSerializer(RecipeSerializer):
@@ -129,9 +303,54 @@ class RecipeDetailSerializer(RecipeSerializer):
 
     description = serializers.CharField()
     image = serializers.ImageField(required=False)
+    nutrition = serializers.SerializerMethodField()
 
     class Meta(RecipeSerializer.Meta):
-        fields = RecipeSerializer.Meta.fields + ("description", "image")
+        fields = RecipeSerializer.Meta.fields + ("description", "image",
+                                                 "nutrition")
+
+    @extend_schema_field(NutritionSerializer)
+    def get_nutrition(self, obj):
+        return NutritionSerializer(nutrition.totals([obj.pk])[obj.pk]).data
+
+
+class SyncDeletedSerializer(serializers.Serializer):
+    """IDs of objects deleted since the sync token."""
+
+    recipes = serializers.ListField(child=serializers.IntegerField())
+    tags = serializers.ListField(child=serializers.IntegerField())
+    ingredients = serializers.ListField(child=serializers.IntegerField())
+
+
+class SyncSerializer(serializers.Serializer):
+    """Serializer for the delta sync response."""
+
+    token = serializers.CharField()
+    recipes = RecipeSerializer(many=True)
+    tags = TagSerializer(many=True)
+    ingredients = IngredientSerializer(many=True)
+    deleted = SyncDeletedSerializer()
+
+
+class KitchenCountSerializer(serializers.Serializer):
+    """Tag or ingredient with the number of recipes using it."""
+
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    recipes = serializers.IntegerField()
+
+
+class KitchenStatsSerializer(serializers.Serializer):
+    """Summary of the user's recipes."""
+
+    recipe_count = serializers.IntegerField()
+    average_price = serializers.DecimalField(max_digits=7,
+                                             decimal_places=2,
+                                             allow_null=True)
+    average_time_minutes = serializers.FloatField(allow_null=True)
+    top_tags = KitchenCountSerializer(many=True)
+    top_ingredients = KitchenCountSerializer(many=True)
+    updated_at = serializers.DateTimeField()
 
 
 class RecipeImageSerializer(serializers.ModelSerializer):
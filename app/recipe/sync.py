@@ -0,0 +1,82 @@
+"""
+Delta sync for offline-first clients.
+
+A sync token encodes the point a client has synced up to: a timestamp
+for `updated_at` and the highest tombstone ID seen. Timestamps come
+from the app server's clock when a row is written, not from when its
+transaction commits, so changes are re-sent for an overlap window of
+`SYNC_OVERLAP_SECONDS` before the token and clients must apply them
+idempotently.
+
+That window is the bound on what delta sync guarantees: a change whose
+transaction commits more than the overlap after its `updated_at`, or
+stamped by a server whose clock is behind by more than the overlap, can
+be left out of every delta. Requests are cut off by the worker timeout
+well within the default, and long-running jobs writing synced rows
+(bulk admin actions, seeding) must keep their transactions shorter or
+ask clients for a full sync.
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from core.models import Tombstone
+from core.signals import SYNC_MODELS
+
+
+class InvalidToken(ValueError):
+    """The sync token could not be parsed."""
+
+
+def make_token(when, tombstone_id):
+    """Return the token for a point in time and tombstone ID."""
+    micros = int(when.timestamp() * 1000000)
+    return f"{micros}-{tombstone_id}"
+
+
+def parse_token(token):
+    """Return (datetime, tombstone_id) for a token."""
+    try:
+        micros, tombstone_id = (int(part) for part in token.split("-"))
+        when = datetime.fromtimestamp(micros / 1000000, tz=dt_timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        raise InvalidToken(token)
+    return when, tombstone_id
+
+
+def changes_since(user, token=None):
+    """Return the user's changes since `token` (everything if None)."""
+    now = timezone.now()
+    last_tombstone = Tombstone.objects.filter(user=user).aggregate(
+        last=Max("id"))["last"] or 0
+
+    querysets = {
+        name: model.objects.filter(user=user)
+        for model, name in SYNC_MODELS.items()
+    }
+    deleted = {name: [] for name in SYNC_MODELS.values()}
+    if token:
+        since, since_tombstone = parse_token(token)
+        cutoff = since - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS)
+        querysets = {
+            name: queryset.filter(updated_at__gte=cutoff)
+            for name, queryset in querysets.items()
+        }
+        tombstones = Tombstone.objects.filter(
+            Q(id__gt=since_tombstone) | Q(deleted_at__gte=cutoff),
+            user=user,
+            id__lte=last_tombstone,
+        ).values_list("model", "object_id")
+        for name, object_id in tombstones:
+            deleted[name].append(object_id)
+
+    return {
+        "token": make_token(now, last_tombstone),
+        "recipes": querysets["recipes"].order_by("id"),
+        "tags": querysets["tags"].order_by("id"),
+        "ingredients": querysets["ingredients"].order_by("id"),
+        "deleted": deleted,
+    }
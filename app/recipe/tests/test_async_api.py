@@ -0,0 +1,128 @@
+"""Tests for the async recipe read endpoints."""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.serializers import (
+    RecipeSerializer,
+    RecipeDetailSerializer,
+    TagSerializer,
+    IngredientSerializer,
+)
+
+ASYNC_RECIPES_URL = reverse("recipe:async-recipe-list")
+ASYNC_TAGS_URL = reverse("recipe:async-tag-list")
+ASYNC_INGREDIENTS_URL = reverse("recipe:async-ingredient-list")
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        "title": "Sample recipe title",
+        "time_minutes": 22,
+        "price": Decimal("5.25"),
+        "description": "Sample description",
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicAsyncRecipeAPITest(TestCase):
+    """Test unauthenticated async API requests."""
+
+    def test_auth_required(self):
+        """Test a token is required."""
+        res = self.client.get(ASYNC_RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_invalid_token(self):
+        """Test an unknown token is rejected."""
+        res = self.client.get(ASYNC_RECIPES_URL,
+                              HTTP_AUTHORIZATION="Token invalid")
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateAsyncRecipeAPITest(TestCase):
+    """Test authenticated async API requests."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="test123", name="Test User")
+        token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    def test_list_matches_sync_endpoint(self):
+        """Test the async list returns the same data as the viewset."""
+        recipe = create_recipe(self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name="Vegan"))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name="Salt"))
+        create_recipe(self.user, title="Second")
+        other = get_user_model().objects.create_user(
+            email="other@example.com", password="test123")
+        create_recipe(other)
+
+        res = self.client.get(ASYNC_RECIPES_URL)
+
+        recipes = Recipe.objects.filter(user=self.user).order_by("-id")
+        serializer = RecipeSerializer(recipes, many=True)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), serializer.data)
+
+    def test_filter_by_tags(self):
+        """Test filtering async list by tag IDs."""
+        r1 = create_recipe(self.user, title="Curry")
+        create_recipe(self.user, title="Fish")
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        r1.tags.add(tag)
+
+        res = self.client.get(ASYNC_RECIPES_URL, {"tags": str(tag.id)})
+
+        self.assertEqual([r["id"] for r in res.json()], [r1.id])
+
+    def test_detail(self):
+        """Test retrieving one recipe and 404 for other users' recipes."""
+        recipe = create_recipe(self.user)
+        other = get_user_model().objects.create_user(
+            email="other@example.com", password="test123")
+        other_recipe = create_recipe(other)
+
+        res = self.client.get(
+            reverse("recipe:async-recipe-detail", args=[recipe.id]))
+        missing = self.client.get(
+            reverse("recipe:async-recipe-detail", args=[other_recipe.id]))
+
+        self.assertEqual(res.json(), RecipeDetailSerializer(recipe).data)
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tags_and_ingredients(self):
+        """Test the async tag and ingredient lists."""
+        Tag.objects.create(user=self.user, name="Vegan")
+        Tag.objects.create(user=self.user, name="Dessert")
+        Ingredient.objects.create(user=self.user, name="Salt")
+
+        tags_res = self.client.get(ASYNC_TAGS_URL)
+        ingredients_res = self.client.get(ASYNC_INGREDIENTS_URL)
+
+        tags = Tag.objects.all().order_by("-name")
+        ingredients = Ingredient.objects.all().order_by("-name")
+        self.assertEqual(tags_res.json(),
+                         TagSerializer(tags, many=True).data)
+        self.assertEqual(ingredients_res.json(),
+                         IngredientSerializer(ingredients, many=True).data)
+
+    def test_write_not_allowed(self):
+        """Test the async endpoints are read only."""
+        res = self.client.post(ASYNC_TAGS_URL, {"name": "Vegan"})
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
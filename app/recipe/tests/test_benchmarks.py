@@ -0,0 +1,90 @@
+"""
+Regression benchmarks for the recipe and user API endpoints.
+
+Each endpoint is measured against datasets of several sizes and compared
+to `benchmarks.json`; see `core.benchmarking` for the environment
+variables controlling the checks. Query counts must also stay flat as
+the dataset grows.
+"""
+
+import os
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import seeding
+from core.benchmarking import Baseline, env_flag, measure
+from core.models import Recipe, Tag
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "benchmarks.json")
+# Recipes per user; the largest scale only runs for full benchmarks.
+SCALES = (10, 100, 1000) if env_flag("BENCHMARK") else (10, 100)
+
+
+def endpoints(user):
+    """Return {name: path} of the endpoints benchmarked for `user`."""
+    recipe = Recipe.objects.filter(user=user).order_by("id").first()
+    tag = Tag.objects.filter(user=user).order_by("id").first()
+    recipes_url = reverse("recipe:recipe-list")
+    return {
+        "recipe-list": recipes_url,
+        "recipe-list-fields": f"{recipes_url}?fields=id,title,price",
+        "recipe-list-by-tag": f"{recipes_url}?tags={tag.id}",
+        "recipe-detail": reverse("recipe:recipe-detail", args=[recipe.id]),
+        "tag-list": reverse("recipe:tag-list"),
+        "ingredient-list": reverse("recipe:ingredient-list"),
+        "sync": reverse("recipe:sync"),
+        "user-me": reverse("user:me"),
+    }
+
+
+class EndpointBenchmarks(TestCase):
+    """Compare endpoint query counts, latency and memory to the baseline."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.baseline = Baseline(BASELINE_PATH)
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls.baseline.update:
+            cls.baseline.save()
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        for scale in SCALES:
+            seeding.seed(1,
+                         recipes_per_user=scale,
+                         prefix=f"bench-{scale}",
+                         users_per_batch=1)
+
+    def test_endpoints(self):
+        """Test no endpoint regressed against the baseline."""
+        problems = []
+        queries = {}
+        for scale in SCALES:
+            user = get_user_model().objects.get(
+                email=f"bench-{scale}-0@example.com")
+            client = APIClient()
+            client.force_authenticate(user)
+            for name, path in endpoints(user).items():
+                res = client.get(path)
+                self.assertEqual(res.status_code, status.HTTP_200_OK, path)
+
+                result = measure(lambda: client.get(path))
+                problems += self.baseline.compare(f"{name}@{scale}", result)
+                queries.setdefault(name, {})[scale] = result["queries"]
+
+        # An N+1 adds a query per row. Batched IN lookups legitimately add
+        # one per few hundred rows, so allow one extra query per 100.
+        smallest = SCALES[0]
+        for name, by_scale in queries.items():
+            if any(count > by_scale[smallest] + scale // 100
+                   for scale, count in by_scale.items()):
+                problems.append(f"{name}: queries grow with data {by_scale}")
+        self.assertFalse(problems, "\n".join(problems))
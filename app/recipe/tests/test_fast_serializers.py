@@ -0,0 +1,69 @@
+"""Tests for the fast read-only recipe serializer."""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, RequestFactory
+
+from core.models import Recipe, Tag, Ingredient
+from core.renderers import FastJSONRenderer
+from recipe.fast_serializers import RecipeListSerializer
+from recipe.serializers import RecipeSerializer
+
+
+class RecipeListSerializerTests(TestCase):
+    """Test RecipeListSerializer matches RecipeSerializer."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="test123")
+        vegan = Tag.objects.create(user=self.user, name="Vegan")
+        quick = Tag.objects.create(user=self.user, name="Quick")
+        salt = Ingredient.objects.create(user=self.user, name="Salt")
+        r1 = Recipe.objects.create(user=self.user,
+                                   title="Soup",
+                                   time_minutes=10,
+                                   price=Decimal("5"),
+                                   description=None,
+                                   image="uploads/recipe/soup.jpg")
+        r1.tags.add(vegan, quick)
+        r1.ingredients.add(salt)
+        Recipe.objects.create(user=self.user,
+                              title="Toast",
+                              time_minutes=3,
+                              price=Decimal("1.50"),
+                              link="http://example.com")
+        self.queryset = Recipe.objects.order_by("-id")
+
+    def render(self, data):
+        return FastJSONRenderer().render(data)
+
+    def test_byte_identical_output(self):
+        """Test output renders to the same bytes as RecipeSerializer."""
+        request = RequestFactory().get("/")
+        context = {"request": request}
+
+        expected = RecipeSerializer(self.queryset, many=True,
+                                    context=context).data
+        fast = RecipeListSerializer(self.queryset, context=context).data
+
+        self.assertEqual(self.render(fast), self.render(expected))
+
+    def test_instances_source(self):
+        """Test a list of model instances gives the same output."""
+        expected = RecipeSerializer(self.queryset, many=True).data
+        fast = RecipeListSerializer(list(self.queryset)).data
+
+        self.assertEqual(self.render(fast), self.render(expected))
+
+    def test_query_count_independent_of_rows(self):
+        """Test one query for rows plus one per nested field."""
+        for i in range(5):
+            recipe = Recipe.objects.create(user=self.user,
+                                           title=f"Extra {i}",
+                                           time_minutes=1,
+                                           price=Decimal("1"))
+            recipe.tags.add(*Tag.objects.all())
+
+        with self.assertNumQueries(3):
+            RecipeListSerializer(self.queryset).data
@@ -0,0 +1,161 @@
+"""Tests for the materialized kitchen stats."""
+
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import bulk, kitchen
+from core.models import Recipe, Tag, Ingredient, KitchenStats
+
+RECIPES_URL = reverse("recipe:recipe-list")
+STATS_URL = reverse("recipe:stats")
+
+
+def detail_url(recipe_id):
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+def stats_row(user):
+    stats = KitchenStats.objects.get(user=user)
+    return (stats.recipe_count, stats.price_total, stats.time_total,
+            stats.tags, stats.ingredients)
+
+
+class KitchenStatsTests(TestCase):
+    """Test the stats are maintained and served."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "user@example.com", "testpass123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self, price, time_minutes, tags=(), ingredients=()):
+        payload = {
+            "title": "Curry",
+            "time_minutes": time_minutes,
+            "price": price,
+            "description": "Spicy.",
+            "tags": [{"name": name} for name in tags],
+            "ingredients": [{"name": name} for name in ingredients],
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(RECIPES_URL, payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return res.data["id"]
+
+    def assert_matches_rebuild(self):
+        """Test the incrementally kept row equals a full recount."""
+        kept = stats_row(self.user)
+        kitchen.rebuild([self.user.id])
+        self.assertEqual(kept, stats_row(self.user))
+
+    def test_new_user_has_empty_stats(self):
+        """Test the endpoint is a single row lookup."""
+        with self.assertNumQueries(1):
+            res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["recipe_count"], 0)
+        self.assertIsNone(res.data["average_price"])
+        self.assertEqual(res.data["top_tags"], [])
+
+    def test_concurrent_rebuild(self):
+        """Test a row inserted by a concurrent rebuild is not an error."""
+        KitchenStats.objects.all().delete()
+
+        def insert_first(stats, **kwargs):
+            KitchenStats.objects.create(user=self.user)
+            return create(stats, **kwargs)
+
+        create = KitchenStats.objects.bulk_create
+        with mock.patch.object(KitchenStats.objects,
+                               "bulk_create",
+                               side_effect=insert_first):
+            res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(KitchenStats.objects.filter(user=self.user).count(),
+                         1)
+
+    def test_summary(self):
+        """Test averages and most used tags and ingredients."""
+        self.create_recipe("4.00", 10, ["Vegan", "Quick"], ["Rice"])
+        self.create_recipe("6.50", 25, ["Vegan"], ["Rice", "Tofu"])
+        self.create_recipe("2.00", 40, ["Dinner"], ["Rice"])
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data["recipe_count"], 3)
+        self.assertEqual(res.data["average_price"], "4.17")
+        self.assertEqual(res.data["average_time_minutes"], 25.0)
+        self.assertEqual(
+            [(item["name"], item["recipes"]) for item in res.data["top_tags"]],
+            [("Vegan", 2), ("Dinner", 1), ("Quick", 1)])
+        self.assertEqual(res.data["top_ingredients"][0]["name"], "Rice")
+        self.assertEqual(res.data["top_ingredients"][0]["recipes"], 3)
+        self.assert_matches_rebuild()
+
+    def test_changes_applied(self):
+        """Test updates, deletions and renames keep the totals right."""
+        first = self.create_recipe("4.00", 10, ["Vegan"], ["Rice", "Tofu"])
+        second = self.create_recipe("6.00", 20, ["Vegan", "Quick"], ["Rice"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(detail_url(first), {
+                "price": "5.00",
+                "time_minutes": 15,
+                "tags": [{"name": "Quick"}],
+                "ingredients": [{"name": "Tofu"}, {"name": "Beans"}],
+            }, format="json")
+        self.assert_matches_rebuild()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tag = Tag.objects.get(user=self.user, name="Quick")
+            tag.name = "Fast"
+            tag.save()
+            Ingredient.objects.get(user=self.user, name="Rice").delete()
+            self.client.delete(detail_url(second))
+        self.assert_matches_rebuild()
+        self.assertEqual(stats_row(self.user)[:4], (1, Decimal("5.00"), 15, {
+            str(tag.id): ["Fast", 1]
+        }))
+
+    def test_applied_after_commit(self):
+        """Test changes wait for the transaction to commit."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            Recipe.objects.create(user=self.user,
+                                  title="Toast",
+                                  time_minutes=5,
+                                  price="1.00")
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(stats_row(self.user)[0], 0)
+
+    def test_bulk_delete_rebuilds(self):
+        """Test bulk operations that skip signals rebuild the stats."""
+        self.create_recipe("4.00", 10, ["Vegan"])
+        self.create_recipe("6.00", 20, ["Vegan"])
+
+        bulk.delete_owned(Tag.objects.filter(user=self.user))
+
+        self.assertEqual(stats_row(self.user)[:4],
+                         (2, Decimal("10.00"), 30, {}))
+
+    def test_rebuild_command(self):
+        """Test the command recomputes users without a stats row."""
+        self.create_recipe("4.00", 10, ["Vegan"])
+        KitchenStats.objects.all().delete()
+        out = StringIO()
+
+        call_command("rebuild_kitchen_stats", "--batch-size", "1", stdout=out)
+
+        self.assertIn("Rebuilt 1 users.", out.getvalue())
+        self.assertEqual(stats_row(self.user)[0], 1)
@@ -0,0 +1,210 @@
+"""Tests for recipe nutrition and cost totals."""
+
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Ingredient,
+    NutritionProfile,
+    RecipeIngredient,
+)
+from recipe import nutrition
+
+RECIPES_URL = reverse("recipe:recipe-list")
+NUTRITION_URL = reverse("recipe:recipe-nutrition")
+
+
+def detail_url(recipe_id):
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+def row(recipe_id, ingredient_id, quantity, unit, calories=100.0,
+        price="1.00", density=1.0, piece_weight=None):
+    """Return a link row with a profile of 100 kcal and 1.00 per 100 g."""
+    return (recipe_id, ingredient_id, quantity, unit, calories, 10.0, 5.0,
+            20.0, Decimal(price), density, piece_weight)
+
+
+class ComputeTests(SimpleTestCase):
+    """Test the vectorized totals."""
+
+    def test_units_converted(self):
+        """Test masses, volumes and pieces are converted to grams."""
+        totals = nutrition.compute([
+            row(1, 10, Decimal("1"), "kg"),
+            row(1, 11, Decimal("2"), "tbsp", density=0.5),
+            row(1, 12, Decimal("3"), "", piece_weight=50),
+        ], [1])[1]
+
+        grams = 1000 + 2 * 14.78676478125 * 0.5 + 150
+        self.assertAlmostEqual(totals["weight"], grams)
+        self.assertAlmostEqual(totals["calories"], grams)
+        self.assertAlmostEqual(totals["protein"], grams / 10)
+        self.assertAlmostEqual(totals["price"], grams / 100)
+        self.assertTrue(totals["complete"])
+
+    def test_many_recipes(self):
+        """Test each recipe only sums its own ingredients."""
+        totals = nutrition.compute([
+            row(1, 10, Decimal("100"), "g"),
+            row(2, 10, Decimal("200"), "g"),
+            row(2, 11, Decimal("1"), "l", calories=50),
+        ], [1, 2, 3])
+
+        self.assertAlmostEqual(totals[1]["calories"], 100)
+        self.assertAlmostEqual(totals[2]["calories"], 200 + 500)
+        self.assertEqual(totals[3], nutrition.empty())
+
+    def test_incomplete(self):
+        """Test unconvertible amounts are skipped and flagged."""
+        no_profile = (1, 12, Decimal("5"), "g") + (None, ) * 7
+        totals = nutrition.compute([
+            row(1, 10, Decimal("100"), "g"),
+            row(1, 11, Decimal("2"), ""),
+            row(1, 13, None, "g"),
+            no_profile,
+        ], [1])[1]
+
+        self.assertAlmostEqual(totals["calories"], 100)
+        self.assertFalse(totals["complete"])
+
+
+class NutritionAPITests(TestCase):
+    """Test amounts and totals through the recipe API."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "user@example.com", "testpass123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.rice = Ingredient.objects.create(user=self.user, name="Rice")
+        NutritionProfile.objects.create(ingredient=self.rice,
+                                        calories=130,
+                                        protein=2.7,
+                                        price=Decimal("0.40"))
+        self.egg = Ingredient.objects.create(user=self.user, name="Egg")
+        NutritionProfile.objects.create(ingredient=self.egg,
+                                        calories=155,
+                                        piece_weight=50,
+                                        price=Decimal("0.60"))
+
+    def create_recipe(self, ingredients):
+        payload = {
+            "title": "Fried rice",
+            "time_minutes": 20,
+            "price": "5.00",
+            "description": "Rice with eggs.",
+            "ingredients": ingredients,
+        }
+        res = self.client.post(RECIPES_URL, payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return Recipe.objects.get(id=res.data["id"])
+
+    def test_detail_nutrition(self):
+        """Test the detail includes totals computed from the amounts."""
+        recipe = self.create_recipe([
+            {"name": "Rice", "quantity": "200", "unit": "g"},
+            {"name": "eggs", "quantity": "2"},
+        ])
+
+        res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.data["nutrition"], {
+            "calories": 415.0,
+            "protein": 5.4,
+            "fat": 0.0,
+            "carbohydrates": 0.0,
+            "cost": "1.40",
+            "weight": 300.0,
+            "complete": True,
+        })
+        link = RecipeIngredient.objects.get(recipe=recipe,
+                                            ingredient=self.egg)
+        self.assertEqual((link.quantity, link.unit), (Decimal("2.00"), ""))
+
+    def test_update_amounts(self):
+        """Test changing an amount only updates that link."""
+        recipe = self.create_recipe([
+            {"name": "Rice", "quantity": "200", "unit": "g"},
+            {"name": "Egg", "quantity": "2"},
+        ])
+        before = Recipe.objects.get(id=recipe.id).updated_at
+
+        res = self.client.patch(detail_url(recipe.id), {
+            "ingredients": [
+                {"name": "Rice", "quantity": "1", "unit": "kg"},
+                {"name": "Egg", "quantity": "2"},
+            ]
+        }, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["nutrition"]["calories"], 1300 + 155)
+        rice = RecipeIngredient.objects.get(recipe=recipe,
+                                            ingredient=self.rice)
+        self.assertEqual((rice.quantity, rice.unit), (Decimal("1.00"), "kg"))
+        self.assertGreater(Recipe.objects.get(id=recipe.id).updated_at,
+                           before)
+
+    def test_invalid_unit(self):
+        """Test unknown units are rejected."""
+        res = self.client.post(RECIPES_URL, {
+            "title": "Fried rice",
+            "time_minutes": 20,
+            "price": "5.00",
+            "description": "Rice.",
+            "ingredients": [{"name": "Rice", "quantity": "1", "unit": "pt"}],
+        }, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_endpoint(self):
+        """Test totals of many recipes take a fixed number of queries."""
+        first = self.create_recipe([{"name": "Rice", "quantity": "100",
+                                     "unit": "g"}])
+        second = self.create_recipe([{"name": "Egg"}])
+        other_user = get_user_model().objects.create_user(
+            "other@example.com", "testpass123")
+        Recipe.objects.create(user=other_user,
+                              title="Other",
+                              time_minutes=5,
+                              price="1.00")
+
+        # Recipe IDs, then the links with their profiles.
+        with self.assertNumQueries(2):
+            res = self.client.get(NUTRITION_URL)
+
+        self.assertEqual([item["id"] for item in res.data],
+                         [second.id, first.id])
+        self.assertEqual(res.data[1]["calories"], 130.0)
+        self.assertFalse(res.data[0]["complete"])
+
+        res = self.client.get(NUTRITION_URL, {"ids": str(first.id)})
+
+        self.assertEqual([item["id"] for item in res.data], [first.id])
+
+    def test_bulk_endpoint_limit(self):
+        """Test too many matching recipes are rejected."""
+        first = self.create_recipe([{"name": "Rice"}])
+        self.create_recipe([{"name": "Egg"}])
+
+        with mock.patch("recipe.views.NUTRITION_LIMIT", 1):
+            res = self.client.get(NUTRITION_URL)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("ids", res.data)
+
+            res = self.client.get(NUTRITION_URL, {"ids": str(first.id)})
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_bulk_endpoint_invalid_ids(self):
+        """Test IDs that are not integers are rejected."""
+        res = self.client.get(NUTRITION_URL, {"ids": "1,a"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("ids", res.data)
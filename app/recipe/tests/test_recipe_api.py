@@ -6,14 +6,18 @@ import os
 from PIL import Image
 
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
+from unittest import skipUnless
 from unittest.mock import patch
 
 from core.models import Recipe, Tag, Ingredient
 
+from recipe.pagination import KeysetPagination
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 RECIPES_URL = reverse("recipe:recipe-list")
@@ -220,6 +224,45 @@ class PrivateRecipeAPITest(TestCase):
         self.assertIn(ingredient2, recipe.ingredients.all())
         self.assertNotIn(ingredient1, recipe.ingredients.all())
 
+    def test_update_reuses_ingredient_by_normalized_name(self):
+        """Test "tomatoes" links the user's existing "Tomato"."""
+        tomato = Ingredient.objects.create(user=self.user, name="Tomato")
+        recipe = create_recipe(user=self.user)
+
+        payload = {"ingredients": [{"name": " tomatoes"}, {"name": "TOMATO"}]}
+        res = self.client.patch(detail_url(recipe.id), payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(recipe.ingredients.all()), [tomato])
+        self.assertEqual(Ingredient.objects.count(), 1)
+
+    def test_tag_name_taken_by_other_user(self):
+        """Test a tag name owned by another user is a validation error."""
+        other = get_user_model().objects.create_user("other@example.com",
+                                                     "testpass123")
+        create_tag(user=other, name="Vegan")
+        payload = {
+            "title": "Salad",
+            "time_minutes": 5,
+            "price": "3.00",
+            "description": "Leaves.",
+            "tags": [{"name": "Vegan"}],
+        }
+
+        res = self.client.post(RECIPES_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("tags", res.data)
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
+        recipe = create_recipe(user=self.user)
+        res = self.client.patch(detail_url(recipe.id),
+                                {"tags": [{"name": "Vegan"}]},
+                                format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(recipe.tags.exists())
+
     def test_create_recipe_with_ingredients_and_tags(self):
         """Test creating a recipe with ingredients and tags."""
         ingredient = create_ingredient(user=self.user, name="Cabbab")
@@ -293,6 +336,223 @@ class PrivateRecipeAPITest(TestCase):
         self.assertNotIn(s3.data, res.data)
         print(res.data)
 
+    def test_filter_by_price_and_time(self):
+        """Test price ranges and a maximum time."""
+        cheap = create_recipe(user=self.user, price=Decimal("2.00"))
+        quick = create_recipe(user=self.user,
+                              price=Decimal("6.00"),
+                              time_minutes=10)
+        create_recipe(user=self.user, price=Decimal("9.00"))
+
+        res = self.client.get(RECIPES_URL, {"price_max": "6"})
+        self.assertEqual([item["id"] for item in res.data],
+                         [quick.id, cheap.id])
+
+        res = self.client.get(RECIPES_URL, {
+            "price_min": "5.50",
+            "time_max": "15"
+        })
+        self.assertEqual([item["id"] for item in res.data], [quick.id])
+
+        res = self.client.get(RECIPES_URL, {"time_max": "soon"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("time_max", res.data)
+
+    def test_filter_by_ingredients_match(self):
+        """Test recipes using all of, or only, the given ingredients."""
+        rice, egg, leek = (create_ingredient(user=self.user, name=name)
+                           for name in ("Rice", "Egg", "Leek"))
+        plain = create_recipe(user=self.user, title="Rice")
+        fried = create_recipe(user=self.user, title="Fried rice")
+        soup = create_recipe(user=self.user, title="Soup")
+        plain.ingredients.add(rice)
+        fried.ingredients.add(rice, egg)
+        soup.ingredients.add(egg, leek)
+        create_recipe(user=self.user, title="Water")
+        pantry = f"{rice.id},{egg.id}"
+
+        def ids(match):
+            res = self.client.get(RECIPES_URL, {
+                "ingredients": pantry,
+                "ingredients_match": match,
+            })
+            return sorted(item["id"] for item in res.data)
+
+        self.assertEqual(ids("any"), [plain.id, fried.id, soup.id])
+        self.assertEqual(ids("all"), [fried.id])
+        self.assertEqual(ids("only"), [plain.id, fried.id])
+
+        res = self.client.get(RECIPES_URL, {
+            "ingredients": pantry,
+            "ingredients_match": "some",
+        })
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("ingredients_match", res.data)
+
+    def test_ordering(self):
+        """Test sorting by a whitelisted field with ties broken by ID."""
+        first = create_recipe(user=self.user, price=Decimal("4.00"))
+        second = create_recipe(user=self.user, price=Decimal("3.00"))
+        third = create_recipe(user=self.user, price=Decimal("4.00"))
+
+        res = self.client.get(RECIPES_URL, {"ordering": "price"})
+        self.assertEqual([item["id"] for item in res.data],
+                         [second.id, first.id, third.id])
+
+        res = self.client.get(RECIPES_URL, {"ordering": "-price"})
+        self.assertEqual([item["id"] for item in res.data],
+                         [third.id, first.id, second.id])
+
+        res = self.client.get(RECIPES_URL, {"ordering": "user__password"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_keyset_pagination(self):
+        """Test pages follow each other without gaps or repeats."""
+        prices = ["3.00", "1.00", "3.00", "2.00", "3.00"]
+        for price in prices:
+            create_recipe(user=self.user, price=Decimal(price))
+        params = {"ordering": "-price", "limit": 2}
+
+        seen, url, pages = [], RECIPES_URL, 0
+        while url:
+            res = self.client.get(url, params if pages == 0 else None)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            seen.extend(item["price"] for item in res.data["results"])
+            url, pages = res.data["next"], pages + 1
+
+        self.assertEqual(seen, sorted(prices, reverse=True))
+        self.assertEqual(pages, 3)
+
+        res = self.client.get(RECIPES_URL, {"limit": 2, "cursor": "bad"})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_keyset_cursor_values_validated(self):
+        """Test cursors with values unfit for the ordering are rejected."""
+        create_recipe(user=self.user)
+        paginator = KeysetPagination()
+        for ordering, values in (
+            ("price", ["abc", 1]),
+            ("price", [{"a": 1}, 1]),
+            ("price", ["NaN", 1]),
+            ("price", ["1e30", 1]),
+            ("price", [None, 1]),
+            ("time_minutes", [[1], 1]),
+            ("title", ["x" * 300, 1]),
+            ("id", [{"a": 1}]),
+        ):
+            res = self.client.get(RECIPES_URL, {
+                "ordering": ordering,
+                "limit": 2,
+                "cursor": paginator.encode_cursor(values),
+            })
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND,
+                             (ordering, values))
+
+        res = self.client.get(RECIPES_URL, {
+            "ordering": "price",
+            "limit": 2,
+            "cursor": paginator.encode_cursor(["1.50", 0]),
+        })
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @skipUnless(connection.vendor == "sqlite", "Checks SQLite plans.")
+    def test_sorted_list_uses_index(self):
+        """Test filtered, sorted pages are read in index order."""
+        create_recipe(user=self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(RECIPES_URL, {
+                "price_max": "10",
+                "ordering": "-price",
+                "limit": 10,
+            })
+
+        page_sql = [
+            query["sql"] for query in queries
+            if 'FROM "core_recipe"' in query["sql"]
+        ]
+        with connection.cursor() as cursor:
+            for sql in page_sql:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                plan = " ".join(row[-1] for row in cursor.fetchall())
+                self.assertIn("core_recipe_user_id_4dae59_idx", plan)
+                self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_list_sparse_fields(self):
+        """Test `fields` limits the output and skips nested queries."""
+        create_recipe(user=self.user,
+                      title="Curry",
+                      tags=[{"name": "Vegan"}],
+                      ingredients=[{"name": "Rice"}])
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, {"fields": "id,title"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(res.data[0]), ["id", "title"])
+        self.assertEqual(res.data[0]["title"], "Curry")
+
+    def test_list_expand(self):
+        """Test `expand` adds only the requested nested fields."""
+        create_recipe(user=self.user,
+                      tags=[{"name": "Vegan"}],
+                      ingredients=[{"name": "Rice"}])
+
+        with self.assertNumQueries(2):
+            res = self.client.get(RECIPES_URL, {"expand": "tags"})
+
+        self.assertEqual(res.data[0]["tags"][0]["name"], "Vegan")
+        self.assertNotIn("ingredients", res.data[0])
+        self.assertIn("description", res.data[0])
+
+    def test_detail_sparse_fields(self):
+        """Test `fields` and `expand` on the detail endpoint."""
+        recipe = create_recipe(user=self.user,
+                               tags=[{"name": "Vegan"}],
+                               ingredients=[{"name": "Rice"}])
+
+        res = self.client.get(detail_url(recipe.id), {
+            "fields": "title",
+            "expand": "ingredients"
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(res.data), {"title", "ingredients"})
+        self.assertEqual(res.data["ingredients"][0]["name"], "Rice")
+
+        res = self.client.get(detail_url(recipe.id), {"fields": "title,"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {"title": recipe.title})
+
+    def test_partial_update_tags_query_count(self):
+        """Test a one-tag PATCH only touches the changed through rows."""
+        recipe = create_recipe(user=self.user,
+                               tags=[{"name": "Vegan"}, {"name": "Quick"}],
+                               ingredients=[{"name": "Rice"}])
+        create_tag(user=self.user, name="Dinner")
+        payload = {"tags": [{"name": "Vegan"}, {"name": "Dinner"}]}
+
+        # Load recipe, savepoint, look up tags, read current through
+        # rows, delete one (+ touch), check and insert one (+ touch),
+        # save once, render tags, ingredients and nutrition, write the
+        # outbox event, release.
+        with self.assertNumQueries(15):
+            res = self.client.patch(detail_url(recipe.id),
+                                    payload,
+                                    format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertCountEqual(recipe.tags.values_list("name", flat=True),
+                              ["Vegan", "Dinner"])
+        self.assertEqual(recipe.ingredients.count(), 1)
+
+    def test_unknown_field_rejected(self):
+        """Test unknown field names return a 400."""
+        res = self.client.get(RECIPES_URL, {"fields": "title,secret"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
 
 class ImageUploadTests(TestCase):
     """Tests for the image upload API"""
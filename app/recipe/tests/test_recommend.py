@@ -0,0 +1,144 @@
+"""Tests for ingredient based recipe recommendations."""
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredient
+from recipe import recommend
+from recipe.recommend import RecipeMatrix
+
+CAN_MAKE_URL = reverse("recipe:recipe-can-make")
+
+
+def similar_url(recipe_id):
+    return reverse("recipe:recipe-similar", args=[recipe_id])
+
+
+class RecipeMatrixTests(SimpleTestCase):
+    """Test the vectorized scores."""
+
+    # Recipe 1 uses ingredients 10-12, recipe 2 uses 10-11, recipe 3
+    # uses 12-15 and recipe 4 only 15.
+    matrix = RecipeMatrix.from_links([
+        (3, 12), (1, 10), (2, 10), (1, 11), (3, 13), (1, 12), (2, 11),
+        (3, 14), (3, 15), (4, 15),
+    ])
+
+    def test_can_make(self):
+        """Test recipes are ranked by coverage, then matches."""
+        self.assertEqual(self.matrix.can_make([10, 11, 12]), [
+            (1, 1.0, 0),
+            (2, 1.0, 0),
+            (3, 0.25, 3),
+        ])
+        self.assertEqual(self.matrix.can_make([10, 11], max_missing=0),
+                         [(2, 1.0, 0)])
+        self.assertEqual(self.matrix.can_make([99]), [])
+
+    def test_similar(self):
+        """Test recipes are ranked by Jaccard similarity."""
+        similar = self.matrix.similar(1)
+
+        self.assertEqual([pk for pk, _ in similar], [2, 3])
+        self.assertAlmostEqual(similar[0][1], 2 / 3)
+        self.assertAlmostEqual(similar[1][1], 1 / 6)
+        self.assertEqual(self.matrix.similar(4), [(3, 0.25)])
+        self.assertEqual(self.matrix.similar(99), [])
+
+    def test_empty(self):
+        matrix = RecipeMatrix.from_links([])
+
+        self.assertEqual(matrix.can_make([1]), [])
+        self.assertEqual(matrix.similar(1), [])
+
+
+class RecommendationAPITests(TestCase):
+    """Test the recommendation actions."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            "user@example.com", "testpass123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.rice, self.egg, self.leek = (
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ("Rice", "Egg", "Leek"))
+
+    def create_recipe(self, title, *ingredients):
+        recipe = Recipe.objects.create(user=self.user,
+                                       title=title,
+                                       time_minutes=10,
+                                       price="2.00")
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.ingredients.add(*ingredients)
+        return recipe
+
+    def test_can_make(self):
+        """Test recipes are listed with their coverage."""
+        fried_rice = self.create_recipe("Fried rice", self.rice, self.egg)
+        omelette = self.create_recipe("Omelette", self.egg, self.leek)
+
+        res = self.client.get(CAN_MAKE_URL, {
+            "ingredients": f"{self.rice.id},{self.egg.id}",
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([(item["recipe"]["id"], item["coverage"],
+                           item["missing"]) for item in res.data],
+                         [(fried_rice.id, 1.0, 0), (omelette.id, 0.5, 1)])
+        self.assertEqual(res.data[0]["recipe"]["title"], "Fried rice")
+
+        res = self.client.get(CAN_MAKE_URL, {
+            "ingredients": str(self.egg.id),
+            "max_missing": 0,
+        })
+        self.assertEqual(res.data, [])
+
+        res = self.client.get(CAN_MAKE_URL)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(CAN_MAKE_URL, {"ingredients": "rice"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("ingredients", res.data)
+
+    def test_similar(self):
+        """Test similar recipes of the user are returned."""
+        fried_rice = self.create_recipe("Fried rice", self.rice, self.egg)
+        omelette = self.create_recipe("Omelette", self.egg, self.leek)
+        self.create_recipe("Leek soup", self.leek)
+
+        res = self.client.get(similar_url(fried_rice.id))
+
+        self.assertEqual([item["recipe"]["id"] for item in res.data],
+                         [omelette.id])
+        self.assertAlmostEqual(res.data[0]["similarity"], 1 / 3)
+
+        other = get_user_model().objects.create_user(
+            "other@example.com", "testpass123")
+        other_recipe = Recipe.objects.create(user=other,
+                                             title="Other",
+                                             time_minutes=5,
+                                             price="1.00")
+        res = self.client.get(similar_url(other_recipe.id))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_matrix_cached_until_changed(self):
+        """Test the matrix is reused until the user's recipes change."""
+        recipe = self.create_recipe("Fried rice", self.rice)
+        recommend.matrix(self.user.id)
+
+        with self.assertNumQueries(1):
+            cached = recommend.matrix(self.user.id)
+        self.assertEqual(cached.can_make([self.egg.id]), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.ingredients.add(self.egg)
+
+        self.assertEqual(
+            recommend.matrix(self.user.id).can_make([self.egg.id]),
+            [(recipe.id, 0.5, 1)])
@@ -0,0 +1,141 @@
+"""Tests for the delta sync API."""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Tombstone
+from recipe import sync
+
+SYNC_URL = reverse("recipe:sync")
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        "title": "Sample recipe title",
+        "time_minutes": 22,
+        "price": Decimal("5.25"),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def backdate(model, **filters):
+    """Move `updated_at` an hour into the past."""
+    model.objects.filter(**filters).update(updated_at=timezone.now() -
+                                           timedelta(hours=1))
+
+
+@override_settings(SYNC_OVERLAP_SECONDS=0)
+class SyncAPITest(TestCase):
+    """Test the sync endpoint."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="test123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sync(self, token=None):
+        params = {"since": token} if token else {}
+        res = self.client.get(SYNC_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_auth_required(self):
+        """Test authentication is required."""
+        res = APIClient().get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_full_sync_without_token(self):
+        """Test all of the user's objects are returned without a token."""
+        other = get_user_model().objects.create_user(
+            email="other@example.com", password="test123")
+        recipe = create_recipe(self.user)
+        create_recipe(other)
+        Tag.objects.create(user=self.user, name="Vegan")
+
+        data = self.sync()
+
+        self.assertEqual([r["id"] for r in data["recipes"]], [recipe.id])
+        self.assertEqual(len(data["tags"]), 1)
+        self.assertEqual(data["deleted"]["recipes"], [])
+        self.assertTrue(data["token"])
+
+    def test_delta_only_returns_changes(self):
+        """Test only objects changed after the token are returned."""
+        unchanged = create_recipe(self.user, title="Old")
+        changed = create_recipe(self.user, title="Changed")
+        backdate(Recipe, user=self.user)
+        token = self.sync()["token"]
+
+        changed.title = "Changed again"
+        changed.save()
+        data = self.sync(token)
+
+        ids = [r["id"] for r in data["recipes"]]
+        self.assertIn(changed.id, ids)
+        self.assertNotIn(unchanged.id, ids)
+
+    def test_deleted_objects_are_reported(self):
+        """Test tombstones are returned for deleted objects."""
+        recipe = create_recipe(self.user)
+        token = self.sync()["token"]
+
+        recipe_id = recipe.id
+        recipe.delete()
+        data = self.sync(token)
+
+        self.assertEqual(data["deleted"]["recipes"], [recipe_id])
+        self.assertTrue(
+            Tombstone.objects.filter(user=self.user,
+                                     object_id=recipe_id).exists())
+
+    def test_tag_change_touches_recipe(self):
+        """Test changing a recipe's tags marks the recipe as changed."""
+        recipe = create_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name="Quick")
+        backdate(Recipe, user=self.user)
+        backdate(Tag, user=self.user)
+        token = self.sync()["token"]
+
+        recipe.tags.add(tag)
+        data = self.sync(token)
+
+        self.assertEqual([r["id"] for r in data["recipes"]], [recipe.id])
+        self.assertEqual(data["tags"], [])
+
+    def test_invalid_token(self):
+        """Test a malformed token is rejected."""
+        res = self.client.get(SYNC_URL, {"since": "not-a-token"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        for token in ("99999999999999999999-1", "-1-1", "1-"):
+            res = self.client.get(SYNC_URL, {"since": token})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(SYNC_OVERLAP_SECONDS=5)
+    def test_late_commits_within_overlap(self):
+        """Test rows stamped before the token are re-sent up to the bound."""
+        late = create_recipe(self.user, title="Late")
+        too_late = create_recipe(self.user, title="Too late")
+        token = self.sync()["token"]
+        since, _ = sync.parse_token(token)
+        # As if their transactions committed only after the token.
+        Recipe.objects.filter(id=late.id).update(updated_at=since -
+                                                 timedelta(seconds=4))
+        Recipe.objects.filter(id=too_late.id).update(
+            updated_at=since - timedelta(seconds=6))
+
+        data = self.sync(token)
+
+        self.assertEqual([r["id"] for r in data["recipes"]], [late.id])
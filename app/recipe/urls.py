@@ -3,6 +3,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from recipe import views
+from recipe import async_views
 
 app_name = "recipe"
 
@@ -15,4 +16,17 @@ router.register(r"ingredients", views.IngredientViewSet)
 # Define the URL patterns
 urlpatterns = [
     path("", include(router.urls)),
+    path("sync/", views.SyncView.as_view(), name="sync"),
+    path("stats/", views.KitchenStatsView.as_view(), name="stats"),
+    # Async read-only variants, served natively when running under ASGI.
+    path("async/recipes/",
+         async_views.recipe_list,
+         name="async-recipe-list"),
+    path("async/recipes/<int:pk>/",
+         async_views.recipe_detail,
+         name="async-recipe-detail"),
+    path("async/tags/", async_views.tag_list, name="async-tag-list"),
+    path("async/ingredients/",
+         async_views.ingredient_list,
+         name="async-ingredient-list"),
 ]
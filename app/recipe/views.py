@@ -2,7 +2,10 @@
 Views for the RecipeApi.
 """
 
-from rest_framework import viewsets, mixins
+import logging
+
+from django.db import transaction
+from rest_framework import viewsets, mixins, views
 
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
@@ -10,6 +13,7 @@ from rest_framework.authentication import TokenAuthentication
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.exceptions import ValidationError
+from rest_framework.fields import DecimalField, IntegerField, ListField
 from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
@@ -17,11 +21,35 @@ from drf_spectacular.utils import (
     OpenApiTypes,
 )
 
-from core.models import Recipe, Tag, Ingredient
+from core import bitsets, kitchen, metrics, outbox
+from core.models import Recipe, Tag, Ingredient, KitchenStats
+from recipe import nutrition
+from recipe import recommend
 from recipe import serializers
+from recipe import sync
+from recipe.fast_serializers import RecipeListSerializer
+from recipe.pagination import KeysetPagination
 
+logger = logging.getLogger(__name__)
 
-@extend_schema_view(list=extend_schema(parameters=[
+
+FIELD_SELECTION_PARAMETERS = [
+    OpenApiParameter(
+        "fields",
+        OpenApiTypes.STR,
+        description=("Comma separated list of fields to return. Nested "
+                     "fields are only included when listed here or in "
+                     "`expand`."),
+    ),
+    OpenApiParameter(
+        "expand",
+        OpenApiTypes.STR,
+        description="Comma separated list of nested fields to include.",
+    ),
+]
+
+
+RECIPE_FILTER_PARAMETERS = [
     OpenApiParameter(
         "tags",
         OpenApiTypes.STR,
@@ -32,7 +60,44 @@ from recipe import serializers
         OpenApiTypes.STR,
         description="Comma separated list of IDs filter.",
     ),
-]))
+    OpenApiParameter(
+        "ingredients_match",
+        OpenApiTypes.STR,
+        enum=["any", "all", "only"],
+        description=("Whether recipes must use any of `ingredients` "
+                     "(default), all of them, or only them."),
+    ),
+    OpenApiParameter("price_min", OpenApiTypes.DECIMAL),
+    OpenApiParameter("price_max", OpenApiTypes.DECIMAL),
+    OpenApiParameter("time_max",
+                     OpenApiTypes.INT,
+                     description="Longest `time_minutes` to include."),
+]
+
+ORDERING_FIELDS = ("price", "time_minutes", "title", "id")
+PRICE_PARAM = DecimalField(max_digits=5, decimal_places=2)
+TIME_PARAM = IntegerField(min_value=0)
+COUNT_PARAM = IntegerField(min_value=0)
+IDS_PARAM = ListField(child=IntegerField())
+# Most recipes the bulk nutrition endpoint totals in one request.
+NUTRITION_LIMIT = 1000
+LIMIT_PARAM = IntegerField(min_value=1, max_value=100)
+
+
+@extend_schema_view(
+    list=extend_schema(parameters=RECIPE_FILTER_PARAMETERS + [
+        OpenApiParameter(
+            "ordering",
+            OpenApiTypes.STR,
+            enum=[
+                prefix + name for name in ORDERING_FIELDS
+                for prefix in ("", "-")
+            ],
+            description="Sort field, descending with a `-`. Default `-id`.",
+        ),
+    ] + FIELD_SELECTION_PARAMETERS),
+    retrieve=extend_schema(parameters=FIELD_SELECTION_PARAMETERS),
+)
 class RecipeViewSet(viewsets.ModelViewSet):
     """View for manage recipe API."""
 
@@ -40,25 +105,143 @@ class RecipeViewSet(viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    # Nested fields that are left out when a field selection is given
+    # unless they are asked for.
+    expandable_fields = ("tags", "ingredients")
 
     def _params_to_ints(self, qs):
         """Convert a list of strings to integers."""
         return [int(str_id) for str_id in qs.split(",")]
 
+    def _get_param(self, name, field):
+        """Return a query parameter validated by a DRF field, or None."""
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            return field.run_validation(value)
+        except ValidationError as exc:
+            raise ValidationError({name: exc.detail})
+
+    def _get_ids(self, name):
+        """Return a comma separated query parameter of IDs, or None."""
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            return IDS_PARAM.run_validation(value.split(","))
+        except ValidationError as exc:
+            raise ValidationError({name: exc.detail})
+
+    def _get_ordering(self):
+        """Return the requested ordering, ending with the ID."""
+        value = self.request.query_params.get("ordering") or "-id"
+        name = value.lstrip("-")
+        if value.count("-") > 1 or name not in ORDERING_FIELDS:
+            raise ValidationError({"ordering": f"Cannot sort by {value!r}."})
+        if name == "id":
+            return (value, )
+        # Ties are broken by ID in the same direction, as indexed.
+        return (value, value[:-len(name)] + "id")
+
+    def _get_field_selection(self):
+        """Return the fields requested with `fields`/`expand`, or None."""
+        fields = self.request.query_params.get("fields")
+        expand = self.request.query_params.get("expand")
+        if fields is None and expand is None:
+            return None
+
+        available = list(self.get_serializer_class()().fields)
+        if fields:
+            selected = {name.strip() for name in fields.split(",")}
+            selected.discard("")
+        else:
+            selected = set(available) - set(self.expandable_fields)
+        expanded = {name.strip() for name in (expand or "").split(",")}
+        expanded.discard("")
+
+        unknown = (selected - set(available)) | (expanded -
+                                                 set(self.expandable_fields))
+        if unknown:
+            raise ValidationError(
+                {"fields": f"Unknown fields: {', '.join(sorted(unknown))}."})
+        selected |= expanded
+        return tuple(name for name in available if name in selected)
+
+    def _prune_queryset(self, queryset, fields):
+        """Load only the columns and relations the selection needs."""
+        model_fields = {f.name for f in Recipe._meta.concrete_fields}
+        columns = [name for name in fields if name in model_fields]
+        nested = [name for name in fields if name in self.expandable_fields]
+        return queryset.only(*columns).prefetch_related(*nested)
+
     def get_queryset(self):
         """Retrive recipes for authenticated user."""
         tags = self.request.query_params.get("tags")
         ingredients = self.request.query_params.get("ingredients")
         queryset = self.queryset
+        # Semi-joins rather than joins, so no DISTINCT is needed and the
+        # rows can be read in index order.
         if tags:
             tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            queryset = queryset.filter(
+                id__in=Recipe.tags.through.objects.filter(
+                    tag_id__in=tag_ids).values("recipe_id"))
         if ingredients:
             ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
-
-        return queryset.filter(
-            user=self.request.user).order_by("-id").distinct()
+            match = self.request.query_params.get(
+                "ingredients_match") or bitsets.ANY
+            if match not in bitsets.MATCHES:
+                raise ValidationError(
+                    {"ingredients_match": f"Unknown match {match!r}."})
+            if match == bitsets.ANY:
+                queryset = queryset.filter(
+                    id__in=Recipe.ingredients.through.objects.filter(
+                        ingredient_id__in=ingredient_ids).values("recipe_id"))
+            else:
+                # Set containment is a bitwise test per recipe.
+                queryset = bitsets.filter_matching(queryset,
+                                                   self.request.user.id,
+                                                   ingredient_ids, match)
+        price_min = self._get_param("price_min", PRICE_PARAM)
+        if price_min is not None:
+            queryset = queryset.filter(price__gte=price_min)
+        price_max = self._get_param("price_max", PRICE_PARAM)
+        if price_max is not None:
+            queryset = queryset.filter(price__lte=price_max)
+        time_max = self._get_param("time_max", TIME_PARAM)
+        if time_max is not None:
+            queryset = queryset.filter(time_minutes__lte=time_max)
+
+        queryset = queryset.filter(user=self.request.user).order_by(
+            *self._get_ordering())
+        if self.action == "retrieve":
+            fields = self._get_field_selection()
+            if fields is not None:
+                queryset = self._prune_queryset(queryset, fields)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        """List recipes using the fast read-only serializer."""
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = RecipeListSerializer(
+            queryset if page is None else page,
+            context=self.get_serializer_context(),
+            fields=self._get_field_selection())
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a recipe, honouring `fields` and `expand`."""
+        fields = self._get_field_selection()
+        if fields is None:
+            return super().retrieve(request, *args, **kwargs)
+        # `get_queryset()` loads only what the selection needs.
+        serializer = self.get_serializer(self.get_object(), fields=fields)
+        return Response(serializer.data)
 
     def get_serializer_class(self):
         """Return the serializer class for the request."""
@@ -70,6 +253,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return serializers.RecipeImageSerializer
         return self.serializer_class
 
+    @transaction.atomic
     def perform_create(self, serializer):
         """Create a new recipe with nested tags and ingredients."""
         tags_data = self.request.data.get("tags", [])
@@ -90,26 +274,111 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 "Ingredients must be a list of dictionaries with a 'name' key."
             })
 
+        # The serializer links tags and ingredients by normalized name.
         recipe = serializer.save(user=self.request.user)
-
-        tags = []
-        for tag in tags_data:
-            if isinstance(tag, dict) and "name" in tag:
-                tag_obj, _ = Tag.objects.get_or_create(user=self.request.user,
-                                                       name=tag["name"])
-                tags.append(tag_obj)
-
-        ingredients = []
-        for ingredient in ingredients_data:
-            if isinstance(ingredient, dict) and "name" in ingredient:
-                ingredient_obj, _ = Ingredient.objects.get_or_create(
-                    user=self.request.user, name=ingredient["name"])
-                ingredients.append(ingredient_obj)
-
-        recipe.tags.set(tags)
-        recipe.ingredients.set(ingredients)
-
-        print("Saved Recipe ID:", recipe.id)
+        outbox.record(recipe, outbox.CREATED, serializer.data)
+        logger.debug("Saved recipe %s", recipe.id)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "ids",
+                OpenApiTypes.STR,
+                description=(f"Comma separated list of recipe IDs. At "
+                             f"most {NUTRITION_LIMIT} recipes may match."),
+            ),
+            OpenApiParameter(
+                "tags",
+                OpenApiTypes.STR,
+                description="Comma separated list of IDs to filter.",
+            ),
+            OpenApiParameter(
+                "ingredients",
+                OpenApiTypes.STR,
+                description="Comma separated list of IDs filter.",
+            ),
+        ],
+        responses=serializers.RecipeNutritionSerializer(many=True),
+    )
+    @action(methods=["GET"],
+            detail=False,
+            url_path="nutrition",
+            pagination_class=None)
+    def nutrition(self, request):
+        """Return nutrition and cost totals of many recipes at once."""
+        queryset = self.filter_queryset(self.get_queryset())
+        ids = self._get_ids("ids")
+        if ids:
+            queryset = queryset.filter(id__in=ids)
+        recipe_ids = list(
+            queryset.values_list("id", flat=True)[:NUTRITION_LIMIT + 1])
+        if len(recipe_ids) > NUTRITION_LIMIT:
+            raise ValidationError({
+                "ids":
+                f"More than {NUTRITION_LIMIT} recipes match; narrow the "
+                "request with `ids` or filters."
+            })
+        totals = nutrition.totals(recipe_ids)
+        serializer = serializers.RecipeNutritionSerializer(
+            [{"id": pk, **totals[pk]} for pk in recipe_ids], many=True)
+        return Response(serializer.data)
+
+    def _recommendations(self, matches, names):
+        """Return recipes with their scores, in the order of `matches`."""
+        recipes = RecipeListSerializer(
+            Recipe.objects.filter(id__in=[match[0] for match in matches]),
+            context=self.get_serializer_context()).data
+        recipes = {recipe["id"]: recipe for recipe in recipes}
+        return Response([{
+            "recipe": recipes[match[0]],
+            **dict(zip(names, match[1:]))
+        } for match in matches if match[0] in recipes])
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "ingredients",
+                OpenApiTypes.STR,
+                required=True,
+                description="Comma separated list of IDs in the pantry.",
+            ),
+            OpenApiParameter(
+                "max_missing",
+                OpenApiTypes.INT,
+                description=("Leave out recipes needing more ingredients "
+                             "than this. 0 lists what can be made now."),
+            ),
+            OpenApiParameter("limit", OpenApiTypes.INT),
+        ],
+        responses=serializers.RecipeMatchSerializer(many=True),
+    )
+    @action(methods=["GET"],
+            detail=False,
+            url_path="can-make",
+            pagination_class=None)
+    def can_make(self, request):
+        """Return recipes ranked by how much of them the pantry covers."""
+        pantry = self._get_ids("ingredients")
+        if not pantry:
+            raise ValidationError(
+                {"ingredients": "List the ingredients you have."})
+        matches = recommend.matrix(request.user.id).can_make(
+            pantry,
+            max_missing=self._get_param("max_missing", COUNT_PARAM),
+            limit=self._get_param("limit", LIMIT_PARAM) or 20)
+        return self._recommendations(matches, ("coverage", "missing"))
+
+    @extend_schema(
+        parameters=[OpenApiParameter("limit", OpenApiTypes.INT)],
+        responses=serializers.SimilarRecipeSerializer(many=True),
+    )
+    @action(methods=["GET"], detail=True, pagination_class=None)
+    def similar(self, request, pk=None):
+        """Return the recipes sharing the most ingredients with this one."""
+        recipe = self.get_object()
+        matches = recommend.matrix(request.user.id).similar(
+            recipe.id, limit=self._get_param("limit", LIMIT_PARAM) or 10)
+        return self._recommendations(matches, ("similarity", ))
 
     @action(methods=["POST"], detail=True, url_path="upload_image")
     def upload_image(self, request, pk=None):
@@ -125,7 +394,13 @@ class RecipeViewSet(viewsets.ModelViewSet):
                                          partial=True)
 
         if serializer.is_valid():
-            serializer.save()
+            size = getattr(serializer.validated_data.get("image"), "size", 0)
+            with metrics.image_upload(size), transaction.atomic():
+                serializer.save()
+                outbox.record(recipe, outbox.UPDATED, {
+                    "id": recipe.id,
+                    "image": serializer.data["image"]
+                })
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -135,15 +410,22 @@ class RecipeViewSet(viewsets.ModelViewSet):
         # Check if the recipe data is valid
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        print(serializer.errors)
         self.perform_create(serializer)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @transaction.atomic
     def perform_update(self, serializer):
         """Update the recipe, ensuring the current user is linked."""
         instance = serializer.save(user=self.request.user)
+        outbox.record(instance, outbox.UPDATED, serializer.data)
         return instance
 
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        """Delete the recipe and record the deletion."""
+        outbox.record(instance, outbox.DELETED)
+        instance.delete()
+
 
 @extend_schema_view(list=extend_schema(parameters=[
     OpenApiParameter(
@@ -175,6 +457,16 @@ class BaseRecipeAttrViewSet(
         return queryset.filter(
             user=self.request.user).order_by("-name").distinct()
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        instance = serializer.save()
+        outbox.record(instance, outbox.UPDATED, serializer.data)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        outbox.record(instance, outbox.DELETED)
+        instance.delete()
+
 
 class TagViewSet(BaseRecipeAttrViewSet):
     """Manage tags in the database."""
@@ -190,3 +482,57 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
     queryset = Ingredient.objects.all()
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
+
+
+class SyncView(views.APIView):
+    """Return recipes, tags and ingredients changed since a sync token."""
+
+    serializer_class = serializers.SyncSerializer
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(parameters=[
+        OpenApiParameter(
+            "since",
+            OpenApiTypes.STR,
+            description=("Token from a previous sync. Omit it to fetch "
+                         "everything."),
+        )
+    ])
+    def get(self, request):
+        try:
+            changes = sync.changes_since(request.user,
+                                         request.query_params.get("since"))
+        except sync.InvalidToken:
+            raise ValidationError({"since": "Invalid sync token."})
+
+        context = {"request": request}
+        return Response({
+            "token":
+            changes["token"],
+            "recipes":
+            RecipeListSerializer(changes["recipes"], context=context).data,
+            "tags":
+            serializers.TagSerializer(changes["tags"], many=True).data,
+            "ingredients":
+            serializers.IngredientSerializer(changes["ingredients"],
+                                             many=True).data,
+            "deleted":
+            changes["deleted"],
+        })
+
+
+class KitchenStatsView(views.APIView):
+    """Return the user's recipe count, averages and most used items."""
+
+    serializer_class = serializers.KitchenStatsSerializer
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        # One row by primary key, kept up to date by `core.kitchen`.
+        stats = KitchenStats.objects.filter(user=request.user).first()
+        if stats is None:
+            kitchen.rebuild([request.user.id])
+            stats = KitchenStats.objects.get(user=request.user)
+        return Response(self.serializer_class(kitchen.summary(stats)).data)
@@ -11,6 +11,8 @@ from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 
+from core.deletion import request_deletion
+
 import logging
 
 logger = logging.getLogger(__name__)
@@ -43,7 +45,8 @@ class TokenViewSet(viewsets.ViewSet):
         """Authenticate and create a token for the user."""
         from user.views import CustomObtainAuthToken
 
-        logger.debug(f"Create user response from: {request.data}")
+        # Never the whole payload: it holds the password.
+        logger.debug("Token requested for %s", request.data.get("email"))
         return CustomObtainAuthToken.as_view()(request._request)
 
     @action(detail=False, methods=["delete"])
@@ -51,7 +54,7 @@ class TokenViewSet(viewsets.ViewSet):
         """Delete the user's token to log them uot."""
         if request.user.is_authenticated:
             request.user.auth_token.delete()
-            logger.debug(f"Token deleted for user: {request.user.email}")
+            logger.debug("Token deleted for user %s", request.user.pk)
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response({"detail": "Not authenticated"},
                         status=status.HTTP_403_FORBIDDEN)
@@ -79,6 +82,10 @@ class UserViewSet(viewsets.ModelViewSet):
         """Cretaer a new user."""
         serializer.save()
 
+    def perform_destroy(self, instance):
+        """Deactivate the user and queue their data for deletion."""
+        request_deletion(instance)
+
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage user in the authenticated user."""
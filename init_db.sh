@@ -25,5 +25,8 @@ except User.DoesNotExist:
     call_command('createsuperuser', username='admin', email='admin@example.com', password='changeme', interactive=False)
 EOF
 
-# Start the Django server
+# Start the server. DJANGO_SERVER=gunicorn runs the production config.
+if [ "$DJANGO_SERVER" = "gunicorn" ]; then
+  cd app && exec gunicorn -c python:app.gunicorn_config app.wsgi:application
+fi
 python manage.py runserver 0.0.0.0:8000